@@ -8,6 +8,18 @@ class Config:
     CLAUDE_MODEL = "claude-3-5-sonnet-20240620"
     MAX_TOKENS = 4096
 
+    # Shared Anthropic client (see services/llm_client.py)
+    LLM_CONNECT_TIMEOUT = 10.0
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "180"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_DELAY = 1.0
+    LLM_RETRY_MAX_DELAY = 30.0
+
+    # Offline request batches (see services/llm_batch.py): "anthropic" uses the
+    # Message Batches API, "local" runs the requests in-process
+    LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND", "anthropic")
+    LLM_BATCH_LOCAL_CONCURRENCY = int(os.getenv("LLM_BATCH_LOCAL_CONCURRENCY", "2"))
+
     # API Keys - fetched from environment variables for security
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     LMNT_API_KEY = os.getenv("LMNT_API_KEY")
@@ -17,6 +29,26 @@ class Config:
     # Using 'lily' as a default voice. A list of available voices can be fetched from the LMNT API.
     LMNT_VOICE = 'lily'
 
+    # Paper Fetching and Parsing
+    PAPER_MAX_BYTES = int(float(os.getenv("PAPER_MAX_MB", "50")) * 1024 * 1024)
+    PAPER_FETCH_TIMEOUT = (10, 60)  # (connect, read) seconds
+    PAPER_CHUNK_SIZE = 256 * 1024
+    # Documents with at least this many pages are parsed in a process pool
+    PAPER_PARALLEL_MIN_PAGES = 64
+    PAPER_PAGES_PER_TASK = 16
+    PAPER_PARSE_WORKERS = min(os.cpu_count() or 1, 8)
+    # Shared on-disk cache of fetched PDFs (used by both backends)
+    PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'media', 'pdf_cache'))
+    PDF_CACHE_MAX_BYTES = int(float(os.getenv("PDF_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+    # Cached PDFs younger than this are used without revalidating
+    PDF_CACHE_FRESH_SECONDS = int(os.getenv("PDF_CACHE_FRESH_SECONDS", "3600"))
+    PDF_FETCH_POOL_HOSTS = 8
+    PDF_FETCH_POOL_SIZE = 16
+    # Parsed paper models, keyed by PDF content hash (used by both backends)
+    PAPER_MODEL_DIR = os.getenv("PAPER_MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'media', 'paper_models'))
+    # Characters of paper text included in the script prompt
+    PAPER_PROMPT_CHARS = 15000
+
     # File Paths
     MEDIA_DIR = 'media'
     AUDIO_DIR = os.path.join(MEDIA_DIR, 'audio')
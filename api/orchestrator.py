@@ -1,5 +1,6 @@
 import logging
-from .services import paper_parser, ai_content_generator, audio_synthesizer
+from .config import Config
+from .services import paper_model, paper_parser, ai_content_generator, audio_synthesizer
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +17,13 @@ def process_research_paper(paper_url: str) -> dict:
     logger.info(f"Starting research paper processing for URL: {paper_url}")
     # Step 1: Fetch and parse the paper content
     logger.info("Parsing paper content...")
-    parser_result = paper_parser.parse_paper_from_url(paper_url)
+    parser_result = paper_parser.parse_paper_from_url(paper_url, max_chars=Config.PAPER_PROMPT_CHARS)
     if 'error' in parser_result:
         logger.error(f"Paper parsing failed: {parser_result['error']}")
         return parser_result
-    logger.info("Paper content parsed successfully.")
+    paper = parser_result['paper']
+    tokens = paper['tokens']['body'] if paper else paper_model.estimate_tokens(parser_result['text_content'])
+    logger.info(f"Paper content parsed successfully (~{tokens} tokens).")
     
     # Step 2: Generate video prompt and narration script from the content
     logger.info("Generating AI content...")
@@ -1,7 +1,7 @@
 import os
 import re
-import anthropic
 from ..config import Config
+from . import llm_client
 
 def generate_and_parse_script(text_content: str) -> dict:
     """
@@ -14,15 +14,13 @@ def generate_and_parse_script(text_content: str) -> dict:
         A dictionary containing the video prompt and narration lines, or an error.
     """
     try:
-        client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-
         prompt = f"""\n\nHuman: You are an expert science communicator, like Grant Sanderson of 3blue1brown. Your task is to analyze a research paper and generate two things:
 1. A detailed, scene-by-scene prompt for a generative text-to-video AI model like Google Veo. This prompt should describe a visually stunning, cinematic, and educational video that explains the paper's core concepts. Describe camera angles, lighting, and visual styles (e.g., 'photorealistic', 'sci-fi UI', 'abstract data visualization').
 2. A clear and insightful narration script that will be spoken over the video.
 
 Here is the content of the research paper:
 <research_paper>
-{text_content[:15000]}
+{text_content[:Config.PAPER_PROMPT_CHARS]}
 </research_paper>
 
 Structure your response as follows, using the exact tags:
@@ -51,7 +49,7 @@ Now, generate the <video_prompt> and <narration_script> for the provided researc
 
 Assistant:"""
 
-        message = client.messages.create(
+        message = llm_client.create_message_sync(
             model=Config.CLAUDE_MODEL,
             max_tokens=Config.MAX_TOKENS,
             messages=[
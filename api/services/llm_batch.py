@@ -0,0 +1,137 @@
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from ..config import Config
+from . import llm_client
+
+
+class MessageBatches:
+    """
+    Interface for submitting many messages.create requests as one offline batch.
+
+    Requests are keyed by a caller-chosen custom_id. Results come back as
+    ``{custom_id: {'text': ...}}`` or ``{custom_id: {'error': ...}}``.
+    """
+
+    async def submit(self, requests: Dict[str, Dict]) -> str:
+        """
+        Submits a batch.
+
+        Args:
+            requests: messages.create arguments (model, max_tokens, messages, ...) by custom_id.
+
+        Returns:
+            The batch id.
+        """
+        raise NotImplementedError
+
+    async def status(self, batch_id: str) -> Dict:
+        """
+        Returns ``{'ended': bool, 'counts': {...}}`` where counts has the
+        processing, succeeded, errored, canceled and expired request counts.
+        """
+        raise NotImplementedError
+
+    async def results(self, batch_id: str) -> Dict[str, Dict]:
+        """Returns the result of every request of an ended batch, by custom_id."""
+        raise NotImplementedError
+
+
+class AnthropicMessageBatches(MessageBatches):
+    """Message Batches API: cheaper, asynchronous processing within 24 hours."""
+
+    async def submit(self, requests: Dict[str, Dict]) -> str:
+        batch = await llm_client.get_async_client().messages.batches.create(
+            requests=[{'custom_id': custom_id, 'params': params} for custom_id, params in requests.items()]
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> Dict:
+        batch = await llm_client.get_async_client().messages.batches.retrieve(batch_id)
+        return {'ended': batch.processing_status == 'ended', 'counts': batch.request_counts.model_dump()}
+
+    async def results(self, batch_id: str) -> Dict[str, Dict]:
+        results = {}
+        async for entry in await llm_client.get_async_client().messages.batches.results(batch_id):
+            if entry.result.type == 'succeeded':
+                results[entry.custom_id] = {'text': entry.result.message.content[0].text}
+            elif entry.result.type == 'errored':
+                results[entry.custom_id] = {'error': str(entry.result.error)}
+            else:
+                results[entry.custom_id] = {'error': entry.result.type}
+        return results
+
+
+class LocalMessageBatches(MessageBatches):
+    """
+    In-process stand-in for the Message Batches API, for tests and local runs.
+
+    Requests are answered by ``responder`` (default: llm_client.create_message,
+    i.e. ordinary interactive requests), at most
+    Config.LLM_BATCH_LOCAL_CONCURRENCY at a time. Batches live in memory and
+    are lost when the process exits.
+    """
+
+    def __init__(self, responder: Optional[Callable[..., Awaitable[str]]] = None,
+                 concurrency: Optional[int] = None):
+        self.responder = responder or self._create_message_text
+        self._slots = asyncio.Semaphore(concurrency or Config.LLM_BATCH_LOCAL_CONCURRENCY)
+        self._batches: Dict[str, Dict] = {}
+
+    @staticmethod
+    async def _create_message_text(**params) -> str:
+        message = await llm_client.create_message(**params)
+        return message.content[0].text
+
+    async def _answer(self, batch: Dict, custom_id: str, params: Dict):
+        async with self._slots:
+            try:
+                batch['results'][custom_id] = {'text': await self.responder(**params)}
+            except Exception as e:
+                batch['results'][custom_id] = {'error': str(e)}
+
+    async def submit(self, requests: Dict[str, Dict]) -> str:
+        batch_id = f'local_{uuid.uuid4().hex}'
+        batch = {'size': len(requests), 'results': {}}
+        batch['tasks'] = [
+            asyncio.create_task(self._answer(batch, custom_id, params))
+            for custom_id, params in requests.items()
+        ]
+        self._batches[batch_id] = batch
+        return batch_id
+
+    async def status(self, batch_id: str) -> Dict:
+        batch = self._batches[batch_id]
+        results = batch['results'].values()
+        errored = sum(1 for result in results if 'error' in result)
+        return {
+            'ended': len(batch['results']) == batch['size'],
+            'counts': {
+                'processing': batch['size'] - len(batch['results']),
+                'succeeded': len(batch['results']) - errored,
+                'errored': errored,
+                'canceled': 0,
+                'expired': 0,
+            },
+        }
+
+    async def results(self, batch_id: str) -> Dict[str, Dict]:
+        batch = self._batches[batch_id]
+        await asyncio.gather(*batch['tasks'])
+        return dict(batch['results'])
+
+
+def create_message_batches(backend: Optional[str] = None) -> MessageBatches:
+    """
+    Builds the batch backend named by ``backend`` (default Config.LLM_BATCH_BACKEND).
+
+    Args:
+        backend: "anthropic" or "local".
+    """
+    backend = backend or Config.LLM_BATCH_BACKEND
+    if backend == 'anthropic':
+        return AnthropicMessageBatches()
+    if backend == 'local':
+        return LocalMessageBatches()
+    raise ValueError(f"Unsupported LLM batch backend: {backend}")
@@ -0,0 +1,178 @@
+import asyncio
+import random
+import threading
+import weakref
+from typing import AsyncIterator, Callable, Optional
+
+import anthropic
+from ..config import Config
+
+# One client (and connection pool) per event loop: httpx connections cannot move between loops
+_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+# Event loop thread that runs coroutines for synchronous callers (e.g. the Flask API)
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+# Errors that may be transient; is_retryable decides by status code
+RETRYABLE_ERRORS = (
+    anthropic.APIConnectionError,  # includes APITimeoutError
+    anthropic.APIStatusError,
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed request is worth retrying: network trouble, timeouts,
+    rate limits (429) and server errors, including 529 overloaded, which the
+    SDK raises as OverloadedError rather than InternalServerError.
+    """
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, anthropic.APIConnectionError)
+
+
+def get_async_client() -> anthropic.AsyncAnthropic:
+    """
+    Returns the shared AsyncAnthropic client for the running event loop.
+
+    Reusing it keeps the SDK's pool of keep-alive connections warm across
+    requests. Timeouts are explicit; retries are done by create_message, so
+    the SDK's own retries are turned off. Without Config.ANTHROPIC_API_KEY
+    the SDK reads ANTHROPIC_API_KEY from the environment when the client is
+    created.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = anthropic.AsyncAnthropic(
+                api_key=Config.ANTHROPIC_API_KEY,
+                max_retries=0,
+                timeout=anthropic.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT),
+            )
+            _clients[loop] = client
+        return client
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Exponential backoff with jitter, or the server's Retry-After when it sent one."""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), Config.LLM_RETRY_MAX_DELAY)
+    except ValueError:
+        pass
+    delay = Config.LLM_RETRY_BASE_DELAY * (2 ** attempt)
+    return min(delay, Config.LLM_RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+
+async def create_message(max_retries: Optional[int] = None, **kwargs) -> anthropic.types.Message:
+    """
+    Calls messages.create on the shared async client, retrying transient
+    failures (see is_retryable) with exponential backoff.
+
+    Args:
+        max_retries: Retries after the first attempt (default Config.LLM_MAX_RETRIES).
+        **kwargs: Passed to messages.create (model, max_tokens, messages, ...).
+    """
+    max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        try:
+            return await get_async_client().messages.create(**kwargs)
+        except RETRYABLE_ERRORS as e:
+            if not is_retryable(e) or attempt == max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"Claude request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                  f"({attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+
+def cache_usage(usage) -> dict:
+    """
+    Prompt-cache accounting for a message's usage.
+
+    Args:
+        usage: The ``usage`` of a Message (or of a stream's message snapshot).
+
+    Returns:
+        Dict with the uncached, cache-read and cache-written input tokens and
+        ``cache_hit_rate``, the share of input tokens served from the cache.
+    """
+    uncached = getattr(usage, 'input_tokens', None) or 0
+    read = getattr(usage, 'cache_read_input_tokens', None) or 0
+    written = getattr(usage, 'cache_creation_input_tokens', None) or 0
+    total = uncached + read + written
+    return {
+        'input_tokens': uncached,
+        'cache_read_input_tokens': read,
+        'cache_creation_input_tokens': written,
+        'cache_hit_rate': round(read / total, 4) if total else 0.0,
+    }
+
+
+async def stream_text(on_message: Optional[Callable] = None, max_retries: Optional[int] = None,
+                      on_start: Optional[Callable] = None, **kwargs) -> AsyncIterator[str]:
+    """
+    Streams a message from the shared async client, yielding text deltas.
+
+    Transient failures are retried like create_message as long as no text
+    has been yielded yet; after that they are raised, since the caller has
+    already consumed part of the response.
+
+    Args:
+        on_message: Called with the final Message (usage, stop reason) once the stream ends.
+        max_retries: Retries after the first attempt (default Config.LLM_MAX_RETRIES).
+        on_start: Called with the message snapshot when the first text arrives; its
+            usage already has the input and prompt-cache token counts, so this also
+            works for callers that stop reading before the end.
+        **kwargs: Passed to messages.stream (model, max_tokens, messages, ...).
+    """
+    max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        started = False
+        try:
+            async with get_async_client().messages.stream(**kwargs) as stream:
+                async for text in stream.text_stream:
+                    if not started and on_start:
+                        on_start(stream.current_message_snapshot)
+                    started = True
+                    yield text
+                message = await stream.get_final_message()
+            if on_message:
+                on_message(message)
+            return
+        except RETRYABLE_ERRORS as e:
+            if started or not is_retryable(e) or attempt == max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"Claude stream failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                  f"({attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-client-loop", daemon=True).start()
+        return _sync_loop
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine on the shared background event loop and waits for it.
+
+    For synchronous code paths; they share one client and connection pool
+    instead of building a client per call.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_sync_loop()).result()
+
+
+def create_message_sync(**kwargs) -> anthropic.types.Message:
+    """Blocking version of create_message for synchronous callers."""
+    return run_sync(create_message(**kwargs))
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+import fitz  # PyMuPDF
+from ..config import Config
+
+# Bump when the model layout or extraction heuristics change; old entries are ignored
+PAPER_MODEL_VERSION = 1
+
+# Sections from the first heading matching this onwards are back matter
+BACK_MATTER_RE = re.compile(r"^\s*(?:[A-Z]\.?|\d+\.?)?\s*(references|bibliography|acknowledge?ments?|appendix|appendices)\b", re.I)
+CAPTION_RE = re.compile(r"^\s*(fig\.?|figure|table)\s*\d+", re.I)
+HEADING_NUMBER_RE = re.compile(r"^\s*(\d+(\.\d+)*|[IVX]+)\.?\s+\S")
+MATH_FONT_RE = re.compile(r"CMMI|CMSY|CMEX|MSBM|Math|Symbol", re.I)
+EQUATION_NUMBER_RE = re.compile(r"=.*\(\d+\)\s*$")
+
+# A line is a heading candidate when its font is this much larger than body text
+HEADING_SIZE_RATIO = 1.12
+# Images drawn smaller than this (in points) are not listed as figures
+MIN_FIGURE_AREA = 120 * 120
+# Rough Claude tokenizer ratio, good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+
+# Document opened once per worker process by _init_worker
+_worker_doc = None
+_save_lock = threading.Lock()
+
+
+def _init_worker(pdf_content: bytes):
+    global _worker_doc
+    _worker_doc = fitz.open(stream=pdf_content, filetype="pdf")
+
+
+def _run_pages(page_fn: Callable, page_numbers: List[int]) -> list:
+    return [page_fn(_worker_doc[number]) for number in page_numbers]
+
+
+def iter_page_results(pdf_content: bytes, page_fn: Callable, workers: Optional[int] = None) -> Iterator:
+    """
+    Yields page_fn(page) for each page in order.
+
+    Documents with at least Config.PAPER_PARALLEL_MIN_PAGES pages are
+    processed across a process pool, a batch of pages per task, so page_fn
+    must be a module-level function. Closing the generator early cancels
+    the batches that have not started yet.
+    """
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        page_count = len(doc)
+        workers = workers or Config.PAPER_PARSE_WORKERS
+        if page_count < Config.PAPER_PARALLEL_MIN_PAGES or workers < 2:
+            for page in doc:
+                yield page_fn(page)
+            return
+
+    batch_size = Config.PAPER_PAGES_PER_TASK
+    batches = [list(range(start, min(start + batch_size, page_count)))
+               for start in range(0, page_count, batch_size)]
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                               initializer=_init_worker, initargs=(pdf_content,))
+    try:
+        futures = [pool.submit(_run_pages, page_fn, batch) for batch in batches]
+        for future in futures:
+            yield from future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _page_data(page: fitz.Page) -> dict:
+    """Text lines (with font size, boldness and math-font share) and figure boxes of a page."""
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        if block.get("type") != 0:
+            continue
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            text = "".join(span["text"] for span in spans).strip()
+            main = max(spans, key=lambda span: len(span["text"]))
+            math_chars = sum(len(span["text"].strip()) for span in spans if MATH_FONT_RE.search(span["font"]))
+            lines.append({
+                "text": text,
+                "size": round(main["size"], 1),
+                "bold": bool(main["flags"] & 16) or "bold" in main["font"].lower(),
+                "math": math_chars / max(len(text), 1),
+            })
+
+    images = []
+    for image in page.get_images(full=True):
+        try:
+            rects = page.get_image_rects(image[0])
+        except Exception:
+            continue
+        for rect in rects:
+            if rect.width * rect.height >= MIN_FIGURE_AREA:
+                images.append([round(value, 1) for value in rect])
+    return {"lines": lines, "images": images}
+
+
+def iter_page_data(pdf_content: bytes, workers: Optional[int] = None) -> Iterator[dict]:
+    """
+    Yields the data the paper model is built from (text lines and figure
+    boxes) page by page, in order; see iter_page_results.
+    """
+    return iter_page_results(pdf_content, _page_data, workers)
+
+
+def page_text(page: dict) -> str:
+    """Plain text of a page yielded by iter_page_data."""
+    return "\n".join(line["text"] for line in page["lines"])
+
+
+def build_paper_model(pdf_content: bytes, pages: Optional[List[dict]] = None) -> dict:
+    """
+    Parses a PDF into a structured paper model.
+
+    Returns a JSON-serializable dict with the document metadata, title,
+    abstract, sections (heading, text, start page, token estimate and a
+    back_matter flag for references/appendices), captions, equations,
+    figures (page, bounding box, area, caption), a page map (section and
+    character count per page) and token estimates.
+
+    Args:
+        pdf_content: The PDF bytes.
+        pages: Every page's iter_page_data result, if the caller already extracted them.
+    """
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        metadata = {key: value for key, value in (doc.metadata or {}).items() if value}
+        total_pages = len(doc)
+    if pages is None:
+        pages = list(iter_page_data(pdf_content))
+
+    sizes = Counter()
+    for page in pages:
+        for line in page["lines"]:
+            sizes[line["size"]] += len(line["text"])
+    body_size = sizes.most_common(1)[0][0] if sizes else 10.0
+
+    title = metadata.get("title", "").strip()
+    if not title and pages and pages[0]["lines"]:
+        largest = max(line["size"] for line in pages[0]["lines"])
+        title = " ".join(line["text"] for line in pages[0]["lines"] if line["size"] == largest)
+
+    sections = [{"heading": "", "text": [], "page": 1, "back_matter": False}]
+    captions, equations, page_map = [], [], []
+    body_pages = total_pages
+    for page_number, page in enumerate(pages, start=1):
+        page_map.append({"page": page_number, "section": len(sections) - 1,
+                         "chars": sum(len(line["text"]) for line in page["lines"])})
+        for line in page["lines"]:
+            text = line["text"]
+            if page_number == 1 and text in title:
+                continue
+            is_heading = len(text) < 120 and (
+                line["size"] >= body_size * HEADING_SIZE_RATIO
+                or (line["bold"] and HEADING_NUMBER_RE.match(text))
+            )
+            if is_heading:
+                back_matter = sections[-1]["back_matter"] or bool(BACK_MATTER_RE.match(text))
+                if back_matter and not sections[-1]["back_matter"]:
+                    body_pages = page_number
+                sections.append({"heading": text, "text": [], "page": page_number, "back_matter": back_matter})
+                continue
+            if CAPTION_RE.match(text):
+                captions.append({"page": page_number, "text": text})
+            if len(text) >= 3 and (line["math"] >= 0.5 or EQUATION_NUMBER_RE.search(text)):
+                equations.append({"page": page_number, "text": text})
+            sections[-1]["text"].append(text)
+
+    sections = [
+        {**section, "text": " ".join(section["text"]).strip()}
+        for section in sections if section["heading"] or section["text"]
+    ]
+    for section in sections:
+        section["tokens"] = estimate_tokens(section["heading"] + section["text"])
+
+    abstract = ""
+    for section in sections:
+        if section["heading"].strip().lower().startswith("abstract"):
+            abstract = section["text"]
+            break
+    if not abstract:
+        match = re.search(r"\babstract\b[\s.:—-]*(.{100,2500}?)(?=\s(?:1\.?|I\.?)?\s*Introduction\b|$)",
+                          " ".join(s["text"] for s in sections[:2]), re.I | re.S)
+        abstract = match.group(1).strip() if match else ""
+
+    figures = []
+    for page_number, page in enumerate(pages[:body_pages], start=1):
+        page_captions = [c["text"] for c in captions if c["page"] == page_number and c["text"].lower().startswith("fig")]
+        for index, bbox in enumerate(page["images"]):
+            figures.append({
+                "page": page_number,
+                "bbox": bbox,
+                "area": round((bbox[2] - bbox[0]) * (bbox[3] - bbox[1]), 1),
+                "caption": page_captions[index] if index < len(page_captions) else "",
+            })
+
+    return {
+        "version": PAPER_MODEL_VERSION,
+        "content_hash": content_hash(pdf_content),
+        "metadata": metadata,
+        "title": title,
+        "abstract": abstract,
+        "sections": sections,
+        "captions": captions,
+        "equations": equations,
+        "figures": figures,
+        "page_map": page_map,
+        "body_pages": body_pages,
+        "total_pages": total_pages,
+        "tokens": {
+            "total": sum(section["tokens"] for section in sections),
+            "body": sum(section["tokens"] for section in sections if not section["back_matter"]),
+        },
+    }
+
+
+def content_hash(pdf_content: bytes) -> str:
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+def _model_path(pdf_hash: str) -> str:
+    return os.path.join(Config.PAPER_MODEL_DIR, f"{pdf_hash}.v{PAPER_MODEL_VERSION}.json")
+
+
+def load_cached_paper_model(pdf_hash: str) -> Optional[dict]:
+    """The persisted model for a content hash, or None."""
+    try:
+        with open(_model_path(pdf_hash)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def get_paper_model(pdf_content: bytes, pages: Optional[List[dict]] = None) -> dict:
+    """
+    Returns the paper model for a PDF, parsing it only the first time its
+    content hash is seen and persisting the result in Config.PAPER_MODEL_DIR.
+
+    Args:
+        pdf_content: The PDF bytes.
+        pages: Every page's iter_page_data result, if the caller already extracted them.
+    """
+    pdf_hash = content_hash(pdf_content)
+    model = load_cached_paper_model(pdf_hash)
+    if model is not None:
+        return model
+
+    model = build_paper_model(pdf_content, pages)
+    path = _model_path(pdf_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _save_lock:
+        with open(tmp_path, 'w') as f:
+            json.dump(model, f)
+        os.replace(tmp_path, path)
+    return model
+
+
+def paper_text(model: dict, max_chars: Optional[int] = None, include_back_matter: bool = False) -> str:
+    """Renders a paper model as compact markdown-like text."""
+    parts = [f"# {model['title']}"] if model["title"] else []
+    if model["abstract"]:
+        parts.append(f"## Abstract\n{model['abstract']}")
+    for section in model["sections"]:
+        if section["back_matter"] and not include_back_matter:
+            continue
+        if section["heading"].strip().lower().startswith("abstract"):
+            continue
+        heading = f"## {section['heading']}\n" if section["heading"] else ""
+        parts.append(heading + section["text"])
+    captions = [caption["text"] for caption in model["captions"]
+                if include_back_matter or caption["page"] <= model["body_pages"]]
+    if captions:
+        parts.append("## Figure and table captions\n" + "\n".join(captions))
+    text = "\n\n".join(parts)
+    return text[:max_chars] if max_chars is not None else text
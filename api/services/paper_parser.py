@@ -1,27 +1,83 @@
+from typing import List, Optional, Tuple
+
 import requests
 import fitz  # PyMuPDF
+from . import paper_model, pdf_fetcher
+
+
+def download_pdf(paper_url: str, max_bytes: Optional[int] = None, timeout: Optional[tuple] = None) -> bytes:
+    """
+    Fetches a PDF through the shared on-disk cache (see pdf_fetcher).
+
+    Args:
+        paper_url: The public URL to the PDF.
+        max_bytes: Largest accepted response body (default Config.PAPER_MAX_BYTES).
+        timeout: (connect, read) timeouts in seconds (default Config.PAPER_FETCH_TIMEOUT).
+
+    Returns:
+        The PDF bytes.
+    """
+    return pdf_fetcher.fetch_pdf(paper_url, max_bytes, timeout)
 
-def parse_paper_from_url(paper_url: str) -> dict:
+
+def extract_pages(pdf_content: bytes, max_chars: Optional[int] = None,
+                  workers: Optional[int] = None) -> Tuple[List[dict], bool]:
+    """
+    Extracts pages in order (see paper_model.iter_page_data), stopping once
+    their text reaches max_chars; the remaining pages are never extracted.
+
+    Returns:
+        The page data and whether every page was extracted. A complete list
+        can build the paper model without extracting the pages again.
+    """
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        total_pages = len(doc)
+    pages = []
+    chars = 0
+    page_data = paper_model.iter_page_data(pdf_content, workers)
+    try:
+        for page in page_data:
+            pages.append(page)
+            chars += len(paper_model.page_text(page))
+            if max_chars is not None and chars >= max_chars and len(pages) < total_pages:
+                return pages, False
+    finally:
+        page_data.close()
+    return pages, True
+
+
+def parse_paper_from_url(paper_url: str, max_chars: Optional[int] = None) -> dict:
     """
     Fetches a PDF from a URL and extracts its text content.
 
+    The text is rendered from the paper model (see paper_model), which is
+    parsed once per PDF content hash and reused from disk afterwards. A
+    paper not parsed before is only extracted until max_chars of text were
+    read: if that ends before the last page, the text is the plain page
+    text and no model is built (the model needs every page); otherwise the
+    extracted pages build and cache the model.
+
     Args:
         paper_url: The public URL to the PDF.
+        max_chars: If given, stop extracting once this many characters were
+            read and truncate the text to this many characters.
 
     Returns:
-        A dictionary containing the text content or an error.
+        A dictionary containing the text content and the paper model (None
+        when extraction stopped early), or an error.
     """
     try:
-        response = requests.get(paper_url)
-        response.raise_for_status()
-        pdf_content = response.content
-
-        text_content = ""
-        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
-            for page in doc:
-                text_content += page.get_text()
-        
-        return {'success': True, 'text_content': text_content}
+        pdf_content = download_pdf(paper_url)
+        paper = paper_model.load_cached_paper_model(paper_model.content_hash(pdf_content))
+        if paper is None:
+            pages, complete = extract_pages(pdf_content, max_chars)
+            if not complete:
+                text_content = "\n".join(paper_model.page_text(page) for page in pages)[:max_chars]
+                return {'success': True, 'text_content': text_content, 'paper': None}
+            paper = paper_model.get_paper_model(pdf_content, pages)
+        text_content = paper_model.paper_text(paper, max_chars)
+
+        return {'success': True, 'text_content': text_content, 'paper': paper}
 
     except requests.exceptions.RequestException as e:
         return {'error': f"Failed to fetch paper: {e}"}
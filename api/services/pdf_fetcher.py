@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from ..config import Config
+
+_session = None
+_session_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+
+class PdfTooLargeError(requests.exceptions.RequestException):
+    """Raised when a PDF download exceeds the configured byte limit."""
+
+
+def _get_session() -> requests.Session:
+    """Process-wide session so repeated fetches reuse keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=Config.PDF_FETCH_POOL_HOSTS,
+                                  pool_maxsize=Config.PDF_FETCH_POOL_SIZE)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+class PdfCache:
+    """
+    LRU cache of downloaded PDFs on disk, bounded by a byte budget.
+
+    Each URL is stored as ``<key>.pdf`` next to a ``<key>.json`` holding its
+    validators (ETag, Last-Modified) and fetch time. Files are written
+    atomically, so several processes can share the same directory; the
+    metadata file's mtime is the recency used for eviction.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or Config.PDF_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.PDF_CACHE_MAX_BYTES
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, f"{key}.pdf"), os.path.join(self.root, f"{key}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """Cached metadata for url (with its 'path'), or None."""
+        pdf_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(pdf_path):
+            return None
+        return {**meta, 'path': pdf_path}
+
+    def touch(self, url: str, **updates):
+        """Mark url as recently used, optionally updating its metadata."""
+        pdf_path, meta_path = self._paths(url)
+        if updates:
+            meta = self.get(url)
+            if meta:
+                meta.pop('path')
+                self._write_meta(meta_path, {**meta, **updates})
+                return
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+    def put(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]) -> str:
+        """Store content for url and evict old entries; returns the PDF path."""
+        pdf_path, meta_path = self._paths(url)
+        tmp_path = f"{pdf_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, pdf_path)
+        self._write_meta(meta_path, {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': len(content),
+            'fetched_at': time.time(),
+        })
+        self.evict(keep=pdf_path)
+        return pdf_path
+
+    def _write_meta(self, meta_path: str, meta: dict):
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def evict(self, keep: Optional[str] = None):
+        """Drop least recently used entries (never ``keep``) until the cache fits its byte budget."""
+        with _evict_lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.root):
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(self.root, name)
+                pdf_path = meta_path[:-len('.json')] + '.pdf'
+                try:
+                    size = os.path.getsize(pdf_path)
+                    entries.append((os.path.getmtime(meta_path), size, pdf_path, meta_path))
+                    total += size
+                except OSError:
+                    continue
+            for _, size, pdf_path, meta_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if pdf_path == keep:
+                    continue
+                for path in (meta_path, pdf_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+
+def _download(response: requests.Response, max_bytes: int) -> bytes:
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise PdfTooLargeError(f"PDF is larger than {max_bytes} bytes")
+
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=Config.PAPER_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise PdfTooLargeError(f"PDF is larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def fetch_pdf_path(url: str, max_bytes: Optional[int] = None, timeout: Optional[tuple] = None,
+                   cache: Optional[PdfCache] = None) -> str:
+    """
+    Returns the path of a cached copy of the PDF at url, downloading it if needed.
+
+    Entries younger than Config.PDF_CACHE_FRESH_SECONDS are used without a
+    request. Older ones are revalidated with If-None-Match/If-Modified-Since
+    and only downloaded again when the server says they changed.
+
+    Args:
+        url: The public URL to the PDF.
+        max_bytes: Largest accepted response body (default Config.PAPER_MAX_BYTES).
+        timeout: (connect, read) timeouts in seconds (default Config.PAPER_FETCH_TIMEOUT).
+        cache: Cache to use (default: the shared cache in Config.PDF_CACHE_DIR).
+    """
+    max_bytes = max_bytes or Config.PAPER_MAX_BYTES
+    cache = cache or PdfCache()
+    cached = cache.get(url)
+    if cached and cached['size'] > max_bytes:
+        raise PdfTooLargeError(f"PDF is larger than {max_bytes} bytes")
+    if cached and time.time() - cached['fetched_at'] < Config.PDF_CACHE_FRESH_SECONDS:
+        cache.touch(url)
+        return cached['path']
+
+    headers = {}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    response = _get_session().get(url, headers=headers, stream=True,
+                                  timeout=timeout or Config.PAPER_FETCH_TIMEOUT)
+    try:
+        if cached and response.status_code == 304:
+            cache.touch(url, fetched_at=time.time())
+            return cached['path']
+        response.raise_for_status()
+        content = _download(response, max_bytes)
+        return cache.put(url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    finally:
+        response.close()
+
+
+def fetch_pdf(url: str, max_bytes: Optional[int] = None, timeout: Optional[tuple] = None,
+              cache: Optional[PdfCache] = None) -> bytes:
+    """Like fetch_pdf_path, but returns the PDF bytes."""
+    with open(fetch_pdf_path(url, max_bytes, timeout, cache), 'rb') as f:
+        return f.read()
@@ -3,6 +3,19 @@ import { NextRequest, NextResponse } from 'next/server'
 // Configuration for the manim backend server
 const MANIM_SERVER_URL = process.env.MANIM_SERVER_URL || 'http://127.0.0.1:8001'
 
+// Request headers forwarded so the backend can answer seeks (206) and revalidations (304)
+const FORWARDED_REQUEST_HEADERS = ['range', 'if-range', 'if-none-match']
+
+// Response headers passed back to the browser untouched
+const FORWARDED_RESPONSE_HEADERS = [
+  'content-type',
+  'content-length',
+  'content-range',
+  'accept-ranges',
+  'etag',
+  'cache-control',
+]
+
 export async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ jobId: string }> }
@@ -17,15 +30,20 @@ export async function GET(
       )
     }
 
-    console.log(`Attempting to download video for job: ${jobId}`)
-    console.log(`Manim server URL: ${MANIM_SERVER_URL}`)
+    const headers = new Headers()
+    for (const name of FORWARDED_REQUEST_HEADERS) {
+      const value = request.headers.get(name)
+      if (value) headers.set(name, value)
+    }
 
     // Forward the request directly to the manim backend server
     const manimResponse = await fetch(`${MANIM_SERVER_URL}/download/${jobId}`, {
       method: 'GET',
+      headers,
     })
 
-    if (!manimResponse.ok) {
+    // 206 (partial content), 304 (not modified) and 416 (bad range) are all valid answers
+    if (!manimResponse.ok && manimResponse.status !== 304 && manimResponse.status !== 416) {
       console.error(`Manim server responded with status: ${manimResponse.status}`)
       
       if (manimResponse.status === 404) {
@@ -50,21 +68,18 @@ export async function GET(
       )
     }
 
-    // Get the video content as a stream
-    const videoArrayBuffer = await manimResponse.arrayBuffer()
-    
-    console.log(`Successfully downloaded video: ${videoArrayBuffer.byteLength} bytes`)
-    
-    // Return the video with proper headers for inline viewing
-    return new NextResponse(videoArrayBuffer, {
-      status: 200,
-      headers: {
-        'Content-Type': 'video/mp4',
-        'Content-Length': videoArrayBuffer.byteLength.toString(),
-        'Accept-Ranges': 'bytes',
-        'Cache-Control': 'public, max-age=3600',
-        'Content-Disposition': `inline; filename="video_${jobId}.mp4"`,
-      },
+    const responseHeaders = new Headers({
+      'Content-Disposition': `inline; filename="video_${jobId}.mp4"`,
+    })
+    for (const name of FORWARDED_RESPONSE_HEADERS) {
+      const value = manimResponse.headers.get(name)
+      if (value) responseHeaders.set(name, value)
+    }
+
+    // Stream the body through instead of buffering the whole video
+    return new NextResponse(manimResponse.status === 304 ? null : manimResponse.body, {
+      status: manimResponse.status,
+      headers: responseHeaders,
     })
 
   } catch (error) {
@@ -77,4 +92,4 @@ export async function GET(
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+}
@@ -0,0 +1,60 @@
+import { NextRequest, NextResponse } from 'next/server'
+
+// Configuration for the manim backend server
+const MANIM_SERVER_URL = process.env.MANIM_SERVER_URL || 'http://127.0.0.1:8001'
+
+// Proxies the manim backend's Server-Sent Events stream for a job so the
+// browser receives progress pushes instead of polling for status.
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ jobId: string }> }
+) {
+  try {
+    const { jobId } = await params
+
+    if (!jobId) {
+      return NextResponse.json(
+        { error: 'Job ID is required' },
+        { status: 400 }
+      )
+    }
+
+    const headers: Record<string, string> = { Accept: 'text/event-stream' }
+    const lastEventId = request.headers.get('last-event-id')
+    if (lastEventId) {
+      headers['Last-Event-ID'] = lastEventId
+    }
+
+    const manimResponse = await fetch(`${MANIM_SERVER_URL}/jobs/${jobId}/events`, {
+      headers,
+      signal: request.signal,
+    })
+
+    if (!manimResponse.ok || !manimResponse.body) {
+      return NextResponse.json(
+        { error: manimResponse.status === 404 ? 'Job not found' : `Manim server error: ${manimResponse.status}` },
+        { status: manimResponse.status === 404 ? 404 : 502 }
+      )
+    }
+
+    return new Response(manimResponse.body, {
+      status: 200,
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache, no-transform',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no',
+      },
+    })
+
+  } catch (error) {
+    console.error('Error streaming job events:', error)
+    return NextResponse.json(
+      { 
+        error: 'Failed to stream job events',
+        details: error instanceof Error ? error.message : 'Unknown error'
+      },
+      { status: 500 }
+    )
+  }
+}
@@ -15,7 +15,7 @@ interface ManimJobResponse {
 
 interface ManimJobStatus {
   job_id: string
-  status: 'pending' | 'processing' | 'completed' | 'failed'
+  status: 'pending' | 'compressing' | 'processing' | 'completed' | 'failed'
   created_at: string
   completed_at?: string
   error?: string
@@ -230,6 +230,84 @@ export default function CopilotChat({ isOpen, onClose, initialContext, paperId,
     }
   }
 
+  const followJobEvents = (jobId: string, messageId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollJobStatus(jobId, messageId)
+      return
+    }
+
+    const source = new EventSource(`/api/video/events/${jobId}`)
+    let finished = false
+
+    const describeStage = (event: any): string => {
+      const clip = event.clip_index !== undefined ? ` ${event.clip_index + 1}/${event.total_clips}` : ''
+      switch (event.stage) {
+        case 'compressing': return 'Compressing PDF...'
+        case 'compressed': return `PDF compressed to ${event.compressed_mb}MB`
+        case 'config_generating': return 'Writing the video script...'
+        case 'config_generated': return `Script ready (${event.total_clips} clips)`
+        case 'clip_rendering': return `Rendering clip${clip}...`
+        case 'clip_rendered': return `Rendered clip${clip}`
+        case 'clip_repairing': return `Fixing clip${clip} (attempt ${event.attempt})...`
+        case 'clip_failed': return `Clip${clip} failed to render`
+        case 'voice_ready': return `Voice-over ready for clip${clip}`
+        case 'clip_muxed': return `Clip${clip} combined with audio`
+        case 'stitching': return 'Stitching the final video...'
+        default: return 'Generating video...'
+      }
+    }
+
+    const updateMessage = (status: string, message: string, completed = false) => {
+      setMessages(prev => prev.map(msg =>
+        msg.id === messageId
+          ? {
+              ...msg,
+              toolResult: {
+                ...msg.toolResult,
+                status,
+                message,
+                video: completed ? {
+                  ...msg.toolResult.video,
+                  status: 'completed',
+                  videoUrl: `/api/video/download/${jobId}`
+                } : msg.toolResult.video,
+                isLoading: status === 'pending' || status === 'processing'
+              }
+            }
+          : msg
+      ))
+    }
+
+    const handle = (raw: MessageEvent) => {
+      const event = JSON.parse(raw.data)
+      const job = event.stage === 'snapshot' ? event.job : null
+      const stage = job ? job.status : event.stage
+
+      if (stage === 'completed') {
+        finished = true
+        source.close()
+        updateMessage('completed', 'Video generation completed!', true)
+      } else if (stage === 'failed') {
+        finished = true
+        source.close()
+        updateMessage('failed', `Generation failed: ${job ? job.error : event.error}`)
+      } else if (!job) {
+        updateMessage('processing', describeStage(event))
+      }
+    }
+
+    ;['snapshot', 'compressing', 'compressed', 'processing', 'config_generating', 'config_generated', 'clip_rendering',
+      'clip_rendered', 'clip_repairing', 'clip_failed', 'voice_ready', 'voice_failed', 'clip_muxed',
+      'stitching', 'stitched', 'completed', 'failed'].forEach(stage => source.addEventListener(stage, handle))
+
+    source.onerror = () => {
+      // EventSource retries on its own; fall back to polling only if the stream is gone for good
+      if (!finished && source.readyState === EventSource.CLOSED) {
+        pollJobStatus(jobId, messageId)
+      }
+    }
+  }
+
   const pollJobStatus = async (jobId: string, messageId: string) => {
     const maxAttempts = 30 // 5 minutes with 10 second intervals
     let attempts = 0
@@ -259,14 +337,14 @@ export default function CopilotChat({ isOpen, onClose, initialContext, paperId,
                       status: 'completed',
                       videoUrl: job.video_path ? `/api/video/download/${jobId}` : null
                     } : msg.toolResult.video,
-                    isLoading: job.status === 'pending' || job.status === 'processing'
+                    isLoading: ['pending', 'compressing', 'processing'].includes(job.status)
                   }
                 }
               : msg
           ))
 
           // Continue polling if not finished
-          if (job.status === 'pending' || job.status === 'processing') {
+          if (['pending', 'compressing', 'processing'].includes(job.status)) {
             attempts++
             if (attempts < maxAttempts) {
               setTimeout(poll, 10000) // Poll every 10 seconds
@@ -448,9 +526,9 @@ export default function CopilotChat({ isOpen, onClose, initialContext, paperId,
             } : msg
           ))
 
-          // Start polling if we have a job ID and need polling
+          // Follow progress events if we have a job ID to track
           if (toolResult.jobId && toolResult.needsPolling) {
-            pollJobStatus(toolResult.jobId, loadingMessageId)
+            followJobEvents(toolResult.jobId, loadingMessageId)
           }
         } else {
           // For other tools, add a new message
@@ -0,0 +1,246 @@
+"""
+Offline batch video generation for whole reading lists.
+
+``POST /generate-video-batch`` creates a batch record plus one job per PDF
+in the manifest, with status "batched" (known to the job store but not yet
+in the render queue). ``BatchRunner`` then moves each batch along:
+
+1. "submitting": builds every job's config request -- the same request an
+   interactive job would stream, see ``config_gen.smart_docs_request``, but
+   referencing URL papers by URL -- and submits them as Message Batches
+   (``api/services/llm_batch.py``) of at most BATCH_MAX_SUBMIT_BYTES each.
+   After BATCH_SUBMIT_ATTEMPTS failed attempts the batch moves on without
+   the requests that could not be submitted;
+2. "generating": polls the Message Batches; once all have ended, stores
+   each response on its job as ``batch_config``. Papers whose request
+   failed (or was never submitted) simply have none and generate their
+   config interactively when they render;
+3. "rendering": feeds the jobs to the render queue at BATCH_PRIORITY, below
+   interactive jobs, keeping at most BATCH_MAX_QUEUED of them waiting so a
+   large batch never takes the queue slots interactive submissions need;
+4. "completed" once every job has completed or failed.
+
+Batch-level progress is published as "batch_progress" events under the
+batch id (the final one as "completed") and is part of the batch record
+returned by ``GET /batches/{batch_id}``.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from config_gen import smart_docs_request
+from job_queue import JobQueue
+from job_runner import job_payload
+from job_store import ACTIVE_BATCH_STATUSES, BATCHED_STATUS, JobStore
+import repo_path  # noqa: F401
+from api.services.llm_batch import MessageBatches
+
+# Render queue priority of batch jobs (interactive jobs use 0)
+BATCH_PRIORITY = -10
+
+# Batch jobs allowed to wait in the render queue at once
+BATCH_MAX_QUEUED = int(os.getenv("BATCH_MAX_QUEUED", "4"))
+
+# Seconds between batch status polls and render queue top-ups
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "15"))
+
+# Largest manifest accepted by POST /generate-video-batch
+MAX_BATCH_PAPERS = int(os.getenv("MAX_BATCH_PAPERS", "100"))
+
+# Largest encoded Message Batch submitted at once (the API limit is 256 MB)
+BATCH_MAX_SUBMIT_BYTES = int(os.getenv("BATCH_MAX_SUBMIT_BYTES", str(100 * 1024 * 1024)))
+
+# Failed submissions of a batch before its remaining jobs fall back to interactive configs
+BATCH_SUBMIT_ATTEMPTS = int(os.getenv("BATCH_SUBMIT_ATTEMPTS", "3"))
+
+
+class BatchRunner:
+    """Drives batches from config generation to rendered videos."""
+
+    def __init__(self, job_store: JobStore, queue: JobQueue, batches: MessageBatches,
+                 publish: Callable[..., object]):
+        self.job_store = job_store
+        self.queue = queue
+        self.batches = batches
+        self.publish = publish
+        self._wakeup = asyncio.Event()
+        self._last_progress: Dict[str, Dict] = {}
+
+    def create_batch(self, batch_id: str, jobs: List[Dict], prompt: str = "") -> Dict:
+        """Store a new batch and its jobs in one transaction; the runner takes it from there."""
+        batch = {
+            "batch_id": batch_id,
+            "status": "submitting",
+            "created_at": datetime.now().isoformat(),
+            "prompt": prompt,
+            "job_ids": [job["job_id"] for job in jobs],
+        }
+        self.job_store.create_batch(batch, [{**job, "status": BATCHED_STATUS, "batch_id": batch_id}
+                                            for job in jobs])
+        self.wake()
+        return batch
+
+    def progress(self, batch_id: str) -> Dict:
+        """Number of the batch's jobs by stage: batched, pending, processing, completed, failed."""
+        counts = {"total": 0, BATCHED_STATUS: 0, "pending": 0, "processing": 0, "completed": 0, "failed": 0}
+        for job in self.job_store.list_jobs(batch_id=batch_id):
+            status = "processing" if job["status"] == "compressing" else job["status"]
+            counts["total"] += 1
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def wake(self):
+        """Process batches now instead of at the next poll."""
+        self._wakeup.set()
+
+    async def run_forever(self):
+        """Poll batches until cancelled."""
+        while True:
+            await self.tick()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=BATCH_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def tick(self):
+        """Move every active batch one step along and top up the render queue."""
+        for batch in self.job_store.list_batches(ACTIVE_BATCH_STATUSES):
+            try:
+                if batch["status"] == "submitting":
+                    await self._submit(batch)
+                elif batch["status"] == "generating":
+                    await self._collect(batch)
+            except Exception as e:
+                print(f"⚠️  Batch {batch['batch_id']}: {batch['status']} step failed: {e}")
+                if batch["status"] == "submitting":
+                    self._submit_failed(batch["batch_id"], e)
+        self._feed_render_queue()
+        for batch in self.job_store.list_batches(("rendering",)):
+            self._report(batch)
+
+    async def _submit(self, batch: Dict):
+        """Submit the config requests of jobs not yet in a Message Batch, in size-capped chunks."""
+        batch_id = batch["batch_id"]
+        chunks = list(batch.get("llm_batches", []))
+        submitted = {job_id for chunk in chunks for job_id in chunk["job_ids"]}
+        requests: Dict[str, Dict] = {}
+        size = 0
+        for job in reversed(self.job_store.list_jobs(batch_id=batch_id, statuses=[BATCHED_STATUS])):
+            if job["job_id"] in submitted:
+                continue
+            try:
+                params = await smart_docs_request(job["pdf_source"], job.get("prompt", ""), url_source=True)
+            except Exception as e:
+                # Left without a batch config, the job generates its own when it renders
+                print(f"⚠️  Batch {batch_id}: could not prepare job {job['job_id']}: {e}")
+                continue
+            request_size = len(json.dumps(params))
+            if request_size > BATCH_MAX_SUBMIT_BYTES:
+                print(f"⚠️  Batch {batch_id}: request for job {job['job_id']} is too large "
+                      f"({request_size} bytes), it will be generated when the job renders")
+                continue
+            if size + request_size > BATCH_MAX_SUBMIT_BYTES:
+                await self._submit_chunk(batch_id, requests, chunks)
+                requests, size = {}, 0
+            requests[job["job_id"]] = params
+            size += request_size
+        if requests:
+            await self._submit_chunk(batch_id, requests, chunks)
+        self.job_store.update_batch(batch_id, status="generating" if chunks else "rendering",
+                                    submitted_at=datetime.now().isoformat())
+
+    async def _submit_chunk(self, batch_id: str, requests: Dict[str, Dict], chunks: List[Dict]):
+        """Submit one Message Batch and record it at once, so a retry never submits it twice."""
+        llm_batch_id = await self.batches.submit(requests)
+        chunks.append({"id": llm_batch_id, "job_ids": list(requests)})
+        self.job_store.update_batch(batch_id, llm_batches=chunks)
+        print(f"📦 Batch {batch_id}: submitted {len(requests)} config requests ({llm_batch_id})")
+
+    def _submit_failed(self, batch_id: str, error: Exception):
+        """Count a failed submission; give up on the unsubmitted requests after BATCH_SUBMIT_ATTEMPTS."""
+        batch = self.job_store.get_batch(batch_id)
+        attempts = batch.get("submit_attempts", 0) + 1
+        if attempts < BATCH_SUBMIT_ATTEMPTS:
+            self.job_store.update_batch(batch_id, submit_attempts=attempts, error=str(error))
+            return
+        # Whatever was submitted is still collected; the rest generate configs when they render
+        status = "generating" if batch.get("llm_batches") else "rendering"
+        self.job_store.update_batch(batch_id, status=status, submit_attempts=attempts, error=str(error))
+        print(f"⚠️  Batch {batch_id}: giving up on submitting after {attempts} attempts, "
+              "unsubmitted jobs will generate their configs when they render")
+
+    async def _collect(self, batch: Dict):
+        counts: Dict[str, int] = {}
+        ended = True
+        for chunk in batch["llm_batches"]:
+            try:
+                status = await self.batches.status(chunk["id"])
+            except LookupError:
+                # The local stand-in forgets its batches on restart: submit those jobs again
+                chunks = [other for other in batch["llm_batches"] if other["id"] != chunk["id"]]
+                self.job_store.update_batch(batch["batch_id"], status="submitting", llm_batches=chunks,
+                                            submit_attempts=0)
+                return
+            ended = ended and status["ended"]
+            for name, count in status["counts"].items():
+                counts[name] = counts.get(name, 0) + count
+        self.job_store.update_batch(batch["batch_id"], requests=counts)
+        self._report({**batch, "requests": counts})
+        if not ended:
+            return
+
+        for chunk in batch["llm_batches"]:
+            results = await self.batches.results(chunk["id"])
+            for job_id, result in results.items():
+                if "text" in result:
+                    self.job_store.update_job(job_id, batch_config=result["text"])
+                else:
+                    print(f"⚠️  Batch {batch['batch_id']}: config for job {job_id} failed ({result['error']}), "
+                          "it will be generated when the job renders")
+        self.job_store.update_batch(batch["batch_id"], status="rendering",
+                                    configs_ready_at=datetime.now().isoformat())
+        print(f"📦 Batch {batch['batch_id']}: configs ready, rendering")
+
+    def _feed_render_queue(self):
+        """Queue ready batch jobs, oldest batch first, up to BATCH_MAX_QUEUED waiting at once."""
+        rendering = self.job_store.list_batches(("rendering",))
+        waiting = sum(
+            len(self.job_store.list_jobs(batch_id=batch["batch_id"], statuses=["pending"]))
+            for batch in rendering
+        )
+        for batch in rendering:
+            if waiting >= BATCH_MAX_QUEUED:
+                return
+            ready = self.job_store.list_jobs(batch_id=batch["batch_id"], statuses=[BATCHED_STATUS],
+                                             include_artifacts=True)
+            for job in reversed(ready):  # list_jobs is newest first
+                if waiting >= BATCH_MAX_QUEUED:
+                    return
+                payload = job_payload(job["pdf_source"], job.get("prompt", ""), False, job.get("batch_config"))
+                self.queue.enqueue(job["job_id"], payload, BATCH_PRIORITY)
+                self.job_store.update_job(job["job_id"], status="pending")
+                waiting += 1
+
+    def _report(self, batch: Dict):
+        """Publish batch progress when it changed; complete the batch once no job is left to run."""
+        batch_id = batch["batch_id"]
+        progress = self.progress(batch_id)
+        if batch.get("requests"):
+            progress["requests"] = batch["requests"]
+        if progress == self._last_progress.get(batch_id):
+            return
+        self._last_progress[batch_id] = progress
+
+        if batch["status"] == "rendering" and progress["completed"] + progress["failed"] == progress["total"]:
+            self.job_store.update_batch(batch_id, status="completed", progress=progress,
+                                        completed_at=datetime.now().isoformat())
+            self.publish(batch_id, "completed", **progress)
+            self._last_progress.pop(batch_id, None)
+            print(f"✅ Batch {batch_id}: {progress['completed']}/{progress['total']} videos completed")
+            return
+        self.job_store.update_batch(batch_id, progress=progress)
+        self.publish(batch_id, "batch_progress", status=batch["status"], **progress)
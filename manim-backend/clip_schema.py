@@ -0,0 +1,114 @@
+"""
+Typed schema and tolerant parsing for the clips config.
+
+Claude's config is usually valid JSON, but not always: a ``// comment``, a
+trailing comma, a markdown fence or one clip with a missing field used to
+fail the whole job after the (paid) generation. ``load_json`` cleans up the
+common slips before giving up, and ``load_clip`` validates a single
+``clips[i]`` object against ``ClipConfig`` so one bad clip can be set aside
+-- and re-requested on its own -- while the others go on to render.
+"""
+
+import json
+import re
+from typing import Any, Dict, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+class ClipConfigError(ValueError):
+    """A clip object that could not be parsed or does not match ClipConfig."""
+
+
+class ClipConfig(BaseModel):
+    """One entry of the config's ``clips`` array."""
+
+    # Unknown keys are kept so nothing Claude added is silently lost
+    model_config = ConfigDict(extra="allow")
+
+    type: Literal["manim"] = "manim"
+    code: str = Field(min_length=1)
+    voice_over: str = ""
+    # Intended length in seconds, when the config states one
+    duration: Optional[float] = Field(default=None, gt=0, le=120)
+
+    @field_validator("voice_over", mode="before")
+    @classmethod
+    def _voice_over_text(cls, value):
+        return "" if value is None else value
+
+    @field_validator("code")
+    @classmethod
+    def _has_scene_class(cls, value):
+        if "class " not in value or "def construct" not in value:
+            raise ValueError("code must define a Scene class with a construct method")
+        return value
+
+
+def strip_comments(text: str) -> str:
+    """Remove ``//`` and ``/* */`` comments that are outside JSON strings."""
+    out = []
+    i = 0
+    in_string = False
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if char == "\\" and i + 1 < len(text):
+                out.append(text[i + 1])
+                i += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end == -1 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+            continue
+        else:
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def load_json(text: str) -> Any:
+    """``json.loads`` that also accepts fences, comments and trailing commas."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    cleaned = _TRAILING_COMMA_RE.sub(r"\1", strip_comments(_FENCE_RE.sub("", text)))
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        # Text around the JSON (e.g. an explanation): try the outermost object
+        start, end = cleaned.find("{"), cleaned.rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return json.loads(cleaned[start:end + 1])
+
+
+def load_clip(fragment: str) -> Dict:
+    """Parse and validate one clip object; raises ClipConfigError."""
+    try:
+        data = load_json(fragment)
+    except json.JSONDecodeError as e:
+        raise ClipConfigError(f"invalid JSON: {e}") from e
+    if isinstance(data, dict) and isinstance(data.get("clips"), list) and data["clips"]:
+        # A repair answer wrapped in the full config shape
+        data = data["clips"][0]
+    if not isinstance(data, dict):
+        raise ClipConfigError("clip is not a JSON object")
+    try:
+        return ClipConfig.model_validate(data).model_dump(exclude_none=True)
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'clip'}: {err['msg']}" for err in e.errors())
+        raise ClipConfigError(errors) from e
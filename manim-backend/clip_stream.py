@@ -0,0 +1,121 @@
+"""
+Incremental parsing of a streamed clips config.
+
+Claude writes the config as ``{"clips": [{...}, {...}, ...]}``. Rather than
+waiting for the closing brace, ``ClipStreamParser`` is fed the text as it
+arrives and hands back each ``clips[i]`` object as soon as its closing
+brace is seen, so the clip can be rendered while the rest is generated.
+Text before the JSON (e.g. a markdown fence) and comments are ignored.
+
+Every object is validated with ``clip_schema.load_clip``. Objects that fail
+are kept in ``broken`` with their position in the array, so they can be
+re-requested on their own instead of failing the whole config.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+from clip_schema import ClipConfigError, load_clip
+
+_CLIPS_KEY_RE = re.compile(r'"clips"\s*:\s*\[')
+
+
+class ClipStreamParser:
+    """Feed text chunks with ``feed``; get back the clips completed by each chunk."""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0            # next character to scan
+        self._in_array = False   # inside the clips array
+        self._done = False       # clips array closed
+        self._depth = 0          # brace/bracket depth inside the array
+        self._in_string = False
+        self._escaped = False
+        self._start = None       # offset of the current clip object
+        self.count = 0           # clip objects seen so far, valid or not
+        self.broken: List[Tuple[int, str, str]] = []  # (index, fragment, error)
+
+    def feed(self, chunk: str) -> List[Tuple[int, Dict]]:
+        """Add streamed text; returns ``(index, clip)`` for the valid clips completed by it."""
+        self.text += chunk
+        completed = []
+        if self._done:
+            return completed
+
+        if not self._in_array:
+            match = _CLIPS_KEY_RE.search(self.text, self._pos)
+            if not match:
+                # Keep scanning from just before the end: the key may be split across chunks
+                self._pos = max(self._pos, len(self.text) - 32)
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+
+        text = self.text
+        offset = self._pos
+        while offset < len(text):
+            char = text[offset]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                offset += 1
+                continue
+
+            if char == "/":
+                # Skip comments; wait for more text if one may be unfinished
+                if offset + 1 == len(text):
+                    break
+                if text[offset + 1] in "/*":
+                    end_mark = "\n" if text[offset + 1] == "/" else "*/"
+                    end = text.find(end_mark, offset + 2)
+                    if end == -1:
+                        break
+                    offset = end + len(end_mark)
+                    continue
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._start = offset
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0 and char == "]":
+                    self._done = True
+                    self._pos = offset + 1
+                    return completed
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    fragment = text[self._start:offset + 1]
+                    self._start = None
+                    clip = self._load(fragment)
+                    if clip is not None:
+                        completed.append((self.count - 1, clip))
+            offset += 1
+        self._pos = offset
+        return completed
+
+    def close(self):
+        """End of the stream: an unfinished clip object (e.g. cut off by max_tokens) is broken."""
+        if self._start is not None and not self._done:
+            self.count += 1
+            self.broken.append((self.count - 1, self.text[self._start:], "truncated clip object"))
+            self._start = None
+        self._done = True
+
+    def _load(self, fragment: str):
+        self.count += 1
+        try:
+            clip = load_clip(fragment)
+        except ClipConfigError as e:
+            self.broken.append((self.count - 1, fragment, str(e)))
+            return None
+        return clip
+
+    @property
+    def finished(self) -> bool:
+        """True once the clips array has been closed."""
+        return self._done
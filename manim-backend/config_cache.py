@@ -0,0 +1,106 @@
+"""
+Disk cache of Claude video-config responses.
+
+Generating the clips config is the slowest and most expensive stage, and
+re-runs (a retry after a failed stitch, the same paper and prompt submitted
+again) would ask Claude the same question. Responses are stored as one JSON
+file per key, where the key hashes everything the answer depends on: the
+PDF contents, the user prompt, the model, the prompt template version, the
+Manim docs snapshot and how the paper is sent. Entries expire after
+``CONFIG_CACHE_TTL_SECONDS`` and the least recently used ones are evicted
+once the directory grows past ``CONFIG_CACHE_MAX_MB``.
+
+Set ``CONFIG_CACHE_BYPASS=1`` (or pass ``use_cache=False``) to always ask
+Claude; fresh responses are still stored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+CONFIG_CACHE_DIR = os.getenv("CONFIG_CACHE_DIR", "config_cache")
+CONFIG_CACHE_TTL_SECONDS = int(os.getenv("CONFIG_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CONFIG_CACHE_MAX_BYTES = int(float(os.getenv("CONFIG_CACHE_MAX_MB", "50")) * 1024 * 1024)
+CONFIG_CACHE_BYPASS = os.getenv("CONFIG_CACHE_BYPASS", "false").lower() in ("1", "true", "yes")
+
+
+def cache_key(**parts) -> str:
+    """Stable key for the given key parts (any JSON-serializable values)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class ConfigResponseCache:
+    """TTL + size bounded store of config response texts, one file per key."""
+
+    def __init__(self, root: str = CONFIG_CACHE_DIR, ttl_seconds: int = CONFIG_CACHE_TTL_SECONDS,
+                 max_bytes: int = CONFIG_CACHE_MAX_BYTES):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached response text for ``key``, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # mtime is the LRU recency
+        except OSError:
+            pass
+        return entry["text"]
+
+    def put(self, key: str, text: str, **parts):
+        """Store ``text`` under ``key``; ``parts`` are kept alongside for inspection."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"created_at": time.time(), "parts": parts, "text": text}, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            entries = []
+            now = time.time()
+            for name in os.listdir(self.root):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # Not even used within the TTL, so certainly expired (get() checks created_at)
+                if now - stat.st_mtime > self.ttl_seconds:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,21 +1,41 @@
-import anthropic
+import asyncio
 import os
 import dotenv
 import base64
-import httpx
 import weave
+import hashlib
 import json
+import re
 from typing import Optional
 from smart_docs_loader import SmartManimDocsLoader
+from pdf_extract import extract_paper, has_enough_text, paper_content_blocks
+import repo_path  # noqa: F401
+from api.services import llm_client
+from api.services.pdf_fetcher import fetch_pdf
 
 # Load environment variables from .env file
 dotenv.load_dotenv()
 
-API_KEY = os.getenv("ANTHROPIC_API_KEY", "your_api_key_here")
+CONFIG_MODEL = "claude-3-5-sonnet-20241022"
 
-client = anthropic.Anthropic(
-    api_key=API_KEY
-)
+# Bump whenever the smart-docs prompt below changes, so cached configs are not reused
+PROMPT_TEMPLATE_VERSION = 2
+
+# Claude's request size limit
+MAX_REQUEST_BYTES = 32 * 1024 * 1024
+
+# Largest PDF sent as a base64 document: base64 grows it by 4/3 and the
+# smart-docs prompt (under 1 MB) shares the request. Larger papers given by
+# URL are referenced by their URL instead.
+MAX_DOCUMENT_BYTES = (MAX_REQUEST_BYTES - 2 * 1024 * 1024) * 3 // 4
+
+# Send extracted text + figures instead of the whole PDF (see pdf_extract.py)
+USE_PDF_EXTRACTION = os.getenv("CONFIG_PDF_EXTRACTION", "false").lower() in ("1", "true", "yes")
+
+# Tail of a failed render's error output sent with a scene repair request
+MAX_REPAIR_ERROR_CHARS = 4000
+
+_CODE_FENCE_RE = re.compile(r"^\s*```(?:python)?[ \t]*\n?|\n?[ \t]*```\s*$")
 
 def get_prompt():
     return f"""You are 3Blue1Brown himself - the master of mathematical visualization and educational content.
@@ -269,21 +289,115 @@ def load_manim_documentation() -> str:
 MANIM_DOCUMENTATION = load_manim_documentation()
 smart_docs_loader = SmartManimDocsLoader()
 
-@weave.op()
-def generate_video_config_with_smart_docs(pdf_path, user_prompt="", use_base64=False):
-    """Generate video configuration with smart documentation targeting"""
-    
-    # Get targeted documentation based on user prompt
-    targeted_docs = smart_docs_loader.get_targeted_documentation(user_prompt)
-    
-    # Create a dynamic prompt with targeted documentation
-    dynamic_prompt = f"""You are creating a simple, clean educational video from this research paper. 
-Generate a JSON for a 45-60 second video with exactly 4 clips that are visually clean and easy to follow.
 
-USER REQUEST: {user_prompt}
+def read_pdf_bytes(pdf_path):
+    """Raw PDF bytes from a URL (via the shared PDF cache) or a local file"""
+    if pdf_path.startswith('http'):
+        return fetch_pdf(pdf_path)
+    with open(pdf_path, "rb") as f:
+        return f.read()
+
+
+def extracted_paper_content(pdf_path):
+    """Text + figure content blocks for the paper, or None to fall back to the PDF document"""
+    try:
+        paper = extract_paper(pdf_bytes=read_pdf_bytes(pdf_path))
+    except Exception as e:
+        print(f"⚠️  PDF text extraction failed, sending the document instead: {e}")
+        return None
+    if not has_enough_text(paper):
+        print("⚠️  Too little text in PDF (scanned?), sending the document instead")
+        return None
+    blocks = paper_content_blocks(paper)
+    print(f"📝 Extracted {len(blocks[0]['text'])} chars and {len(paper['figures'])} figures "
+          f"from {paper['pages']}/{paper['total_pages']} pages")
+    return blocks
+
+
+def config_cache_key_parts(pdf_path, user_prompt="", use_base64=False, extract_text: Optional[bool] = None) -> dict:
+    """Everything the smart-docs config response depends on (see config_cache.py)"""
+    try:
+        pdf_hash = hashlib.sha256(read_pdf_bytes(pdf_path)).hexdigest()
+    except Exception as e:
+        print(f"⚠️  Could not hash PDF for the config cache, keying on its location: {e}")
+        pdf_hash = pdf_path
+    extract_text = extract_text if extract_text is not None else USE_PDF_EXTRACTION
+    return {
+        "pdf": pdf_hash,
+        "prompt": user_prompt,
+        "model": CONFIG_MODEL,
+        "template_version": PROMPT_TEMPLATE_VERSION,
+        "docs_version": smart_docs_loader.docs_version,
+        "paper_content": "extracted" if extract_text else "document",
+    }
+
+
+def base64_document_content(pdf_bytes: bytes) -> list:
+    """Content block inlining the PDF as a base64 document (at most MAX_DOCUMENT_BYTES)"""
+    return [{
+        "type": "document",
+        "source": {
+            "type": "base64",
+            "media_type": "application/pdf",
+            "data": base64.standard_b64encode(pdf_bytes).decode("utf-8")
+        }
+    }]
+
 
-TARGETED MANIM DOCUMENTATION:
-""" + targeted_docs + """
+def build_paper_content(pdf_path, use_base64=False, extract_text: Optional[bool] = None,
+                        url_source=False) -> list:
+    """Message content blocks carrying the paper: extracted text, a base64 document or its URL
+
+    With ``url_source`` a paper given by URL is always referenced by its URL
+    rather than inlined, keeping the request small (used for batches).
+    """
+    paper_content = None
+    if extract_text if extract_text is not None else USE_PDF_EXTRACTION:
+        paper_content = extracted_paper_content(pdf_path)
+
+    if paper_content is None and url_source and str(pdf_path).startswith(("http://", "https://")):
+        paper_content = [{
+            "type": "document",
+            "source": {
+                "type": "url",
+                "url": pdf_path
+            }
+        }]
+
+    if paper_content is None and use_base64:
+        # Load PDF from URL and encode as base64
+        pdf_bytes = read_pdf_bytes(pdf_path)
+        if len(pdf_bytes) <= MAX_DOCUMENT_BYTES:
+            paper_content = base64_document_content(pdf_bytes)
+        elif not str(pdf_path).startswith(("http://", "https://")):
+            raise ValueError(f"PDF is larger than {MAX_DOCUMENT_BYTES} bytes, too large to send to Claude")
+        else:
+            print(f"⚠️  PDF is larger than {MAX_DOCUMENT_BYTES} bytes, letting Claude fetch the URL")
+    elif paper_content is None:
+        try:
+            # Send cached bytes so Claude does not download the paper again
+            paper_content = base64_document_content(fetch_pdf(pdf_path, max_bytes=MAX_DOCUMENT_BYTES))
+        except Exception as e:
+            print(f"⚠️  Could not fetch PDF ({e}), letting Claude fetch the URL")
+
+    if paper_content is None:
+        # Use URL method
+        paper_content = [{
+            "type": "document",
+            "source": {
+                "type": "url",
+                "url": pdf_path
+            }
+        }]
+    return paper_content
+
+
+# Fixed smart-docs instructions. They go first in the system prompt so Claude's
+# prompt cache can reuse them (and the docs after them) across requests; only
+# the paper and the user request, in the user message, change per call.
+SMART_DOCS_INSTRUCTIONS = """You are creating a simple, clean educational video from a research paper.
+Generate a JSON for a 45-60 second video with exactly 4 clips that are visually clean and easy to follow.
+The paper and the user's request are in the user message; the Manim documentation targeted at the request follows these instructions.
 
 CRITICAL LAYOUT RULES:
 - Title text always goes at the TOP (y=2.5 to 3)
@@ -305,7 +419,7 @@ CRITICAL CODE REQUIREMENTS:
 - Create engaging, educational visualizations that enhance understanding
 - Keep total animation time to exactly 12 seconds
 - End every scene with self.wait(1)
-- Use the documentation examples above as reference for proper syntax
+- Use the documentation examples below as reference for proper syntax
 
 VOICE-OVER STYLE:
 - Conversational and clear
@@ -314,61 +428,138 @@ VOICE-OVER STYLE:
 - Natural pacing with pauses
 
 Return ONLY this JSON (no markdown, no explanation):
-{{
+{
     "clips": [
-        {{
+        {
             "type": "manim", 
             "code": "class SimpleScene(Scene):\\n    def construct(self):\\n        # Animation code here\\n        title = Text('Topic Title', font_size=48).to_edge(UP)\\n        self.play(Write(title))\\n        self.wait(1)\\n        # Add more elements here\\n        self.wait(1)",
             "voice_over": "Clear, concise narration matching the 12-second timing"
-        }}
+        }
     ]
-}}"""
+}"""
 
-    if use_base64:
-        # Load PDF from URL and encode as base64
-        if pdf_path.startswith('http'):
-            pdf_data = base64.standard_b64encode(httpx.get(pdf_path).content).decode("utf-8")
-        else:
-            # Load from local file
-            with open(pdf_path, "rb") as f:
-                pdf_data = base64.standard_b64encode(f.read()).decode("utf-8")
-        
-        document_content = {
-            "type": "document",
-            "source": {
-                "type": "base64",
-                "media_type": "application/pdf",
-                "data": pdf_data
-            }
-        }
-    else:
-        # Use URL method
-        document_content = {
-            "type": "document",
-            "source": {
-                "type": "url",
-                "url": pdf_path
-            }
-        }
+
+def cached_text_block(text: str) -> dict:
+    """System prompt text block marked as a prompt-cache breakpoint"""
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def smart_docs_system(user_prompt="") -> list:
+    """Stable, cacheable system prompt: fixed instructions, then the Manim docs targeted at the request"""
+    targeted_docs = smart_docs_loader.get_targeted_documentation(user_prompt)
+    return [
+        cached_text_block(SMART_DOCS_INSTRUCTIONS),
+        cached_text_block("TARGETED MANIM DOCUMENTATION:\n" + targeted_docs),
+    ]
+
+
+def smart_docs_prompt(user_prompt=""):
+    """Per-request part of the smart-docs prompt, sent after the paper"""
+    return f"""USER REQUEST: {user_prompt}
+
+Create the 4-clip video config for the paper above following the instructions, and return ONLY the JSON."""
+
+
+async def smart_docs_request(pdf_path, user_prompt="", use_base64=False, extract_text: Optional[bool] = None,
+                             url_source=False) -> dict:
+    """messages.create/stream arguments for a smart-docs config request"""
+    # Reading, extracting and encoding the PDF blocks, so keep it off the event loop
+    paper_content = await asyncio.to_thread(build_paper_content, pdf_path, use_base64, extract_text, url_source)
     
-    message = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
+    return dict(
+        model=CONFIG_MODEL,
         max_tokens=8192,
+        system=smart_docs_system(user_prompt),
         messages=[
             {
                 "role": "user", 
-                "content": [
-                    document_content,
+                "content": paper_content + [
                     {
                         "type": "text",
-                        "text": dynamic_prompt,
+                        "text": smart_docs_prompt(user_prompt),
                     }
                 ]
             },
         ]
     )
 
-    return message
+
+@weave.op()
+async def generate_video_config_with_smart_docs(pdf_path, user_prompt="", use_base64=False, extract_text: Optional[bool] = None):
+    """Generate video configuration with smart documentation targeting.
+
+    With ``extract_text`` (default: CONFIG_PDF_EXTRACTION env var) the paper is
+    sent as extracted text and figure crops instead of the whole PDF.
+    """
+    request = await smart_docs_request(pdf_path, user_prompt, use_base64, extract_text)
+    return await llm_client.create_message(**request)
+
+
+async def stream_video_config_with_smart_docs(pdf_path, user_prompt="", use_base64=False,
+                                              extract_text: Optional[bool] = None, on_message=None, on_start=None):
+    """Like generate_video_config_with_smart_docs, but yields the response text as it streams in.
+
+    ``on_start`` is called with the message snapshot (input and prompt-cache
+    usage) when the first text arrives, ``on_message`` with the final message
+    at the end.
+    """
+    request = await smart_docs_request(pdf_path, user_prompt, use_base64, extract_text)
+    async for text in llm_client.stream_text(on_message=on_message, on_start=on_start, **request):
+        yield text
+
+
+async def repair_clip_config(fragment: str, error: str, index: int, user_prompt="") -> str:
+    """Ask Claude to fix one malformed ``clips[i]`` object; returns the response text.
+
+    Only the broken fragment is sent (with the cached smart-docs system
+    prompt), not the paper, so a repair costs a fraction of the config.
+    """
+    message = await llm_client.create_message(
+        model=CONFIG_MODEL,
+        max_tokens=4096,
+        system=smart_docs_system(user_prompt),
+        messages=[
+            {
+                "role": "user",
+                "content": f"""Clip {index + 1} of the video config you generated is broken ({error}):
+
+{fragment}
+
+Return ONLY the corrected clip as a single JSON object with "type", "code" and "voice_over" (no markdown, no explanation). Complete it if it was cut off.""",
+            },
+        ]
+    )
+    return message.content[0].text
+
+
+async def repair_scene_code(code: str, error: str, voice_over: str = "", user_prompt="") -> str:
+    """Ask Claude to fix a scene that failed validation or rendering; returns the corrected code.
+
+    The failing code and the tail of the error go out with the cached
+    smart-docs system prompt, so only the one clip is regenerated.
+    """
+    message = await llm_client.create_message(
+        model=CONFIG_MODEL,
+        max_tokens=4096,
+        system=smart_docs_system(user_prompt),
+        messages=[
+            {
+                "role": "user",
+                "content": f"""This Manim scene from the video config failed to render.
+
+ERROR:
+{error[-MAX_REPAIR_ERROR_CHARS:]}
+
+CODE:
+{code}
+
+VOICE-OVER: {voice_over}
+
+Fix the error while keeping the scene's content and 12-second timing. Return ONLY the corrected Python code for class SimpleScene (no markdown, no explanation).""",
+            },
+        ]
+    )
+    return _CODE_FENCE_RE.sub("", message.content[0].text)
 
 @weave.op()
 def generate_video_config(pdf_path, use_base64=False):
@@ -376,12 +567,7 @@ def generate_video_config(pdf_path, use_base64=False):
     
     if use_base64:
         # Load PDF from URL and encode as base64
-        if pdf_path.startswith('http'):
-            pdf_data = base64.standard_b64encode(httpx.get(pdf_path).content).decode("utf-8")
-        else:
-            # Load from local file
-            with open(pdf_path, "rb") as f:
-                pdf_data = base64.standard_b64encode(f.read()).decode("utf-8")
+        pdf_data = base64.standard_b64encode(read_pdf_bytes(pdf_path)).decode("utf-8")
         
         document_content = {
             "type": "document",
@@ -401,9 +587,11 @@ def generate_video_config(pdf_path, use_base64=False):
             }
         }
     
-    message = client.messages.create(
-        model="claude-3-5-sonnet-20241022",
+    # get_prompt() is the same for every paper, so it is the cached system prompt
+    message = llm_client.create_message_sync(
+        model=CONFIG_MODEL,
         max_tokens=8192,
+        system=[cached_text_block(get_prompt())],
         messages=[
             {
                 "role": "user", 
@@ -411,7 +599,7 @@ def generate_video_config(pdf_path, use_base64=False):
                     document_content,
                     {
                         "type": "text",
-                        "text": get_prompt(),
+                        "text": "Create the video config for this paper following the instructions.",
                     }
                 ]
             },
@@ -0,0 +1,108 @@
+"""
+Range-aware delivery of finished video files.
+
+Browsers seek in a <video> element with ``Range`` requests and revalidate
+cached copies with ``If-None-Match``. ``ranged_file_response`` answers both:
+single byte ranges get a 206 streamed from disk in small chunks, matching
+ETags get a 304, and unsatisfiable ranges get a 416.
+"""
+
+import hashlib
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+# Finished videos never change under the same URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(path: str) -> str:
+    """Strong ETag derived from the file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=start-end`` range into inclusive offsets.
+
+    Returns None for headers we do not serve partially (multiple ranges,
+    other units); raises ValueError for an unsatisfiable range.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _read_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request: Request, path: str, media_type: str, etag: str,
+                         filename: Optional[str] = None,
+                         cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Response:
+    """Serve ``path`` honouring Range, If-Range and If-None-Match."""
+    size = os.path.getsize(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": cache_control,
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        _read_file(path, start, end), status_code=status_code, media_type=media_type, headers=headers
+    )
@@ -0,0 +1,124 @@
+"""
+In-process fan-out of fine-grained job progress events.
+
+The pipeline publishes stage events (config generated, clip N rendered, voice
+N ready, stitching, ...) through ``JobEventBus.publish``; any number of
+``GET /jobs/{job_id}/events`` subscribers receive them as they happen. Each
+job keeps a short ring buffer of recent events so a client that connects late
+or reconnects with ``Last-Event-ID`` can replay what it missed.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+# Stages after which a job emits no further events
+TERMINAL_STAGES = ("completed", "failed")
+
+
+def report_progress(on_progress, stage: str, **data):
+    """
+    Forward a pipeline stage event to an optional ``on_progress(stage, **data)``
+    callback, never letting a failing callback break the pipeline itself.
+    """
+    if on_progress is None:
+        return
+    try:
+        on_progress(stage, **data)
+    except Exception as e:
+        print(f"⚠️  Progress callback failed for stage '{stage}': {e}")
+
+
+class JobEventBus:
+    """Publish/subscribe hub for per-job progress events."""
+
+    def __init__(self, history_size: int = 200, max_jobs: int = 1000, queue_size: int = 1000):
+        self.history_size = history_size
+        self.max_jobs = max_jobs
+        self.queue_size = queue_size
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self._next_id: Dict[str, int] = {}
+        self._subscribers: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: str, stage: str, **data) -> Dict:
+        """
+        Record an event for ``job_id`` and deliver it to every subscriber.
+
+        Safe to call from the event loop or from worker threads.
+        """
+        with self._lock:
+            event_id = self._next_id.get(job_id, 0) + 1
+            self._next_id[job_id] = event_id
+            event = {
+                "id": event_id,
+                "job_id": job_id,
+                "stage": stage,
+                "timestamp": datetime.now().isoformat(),
+                **data,
+            }
+            history = self._history.get(job_id)
+            if history is None:
+                history = self._history[job_id] = deque(maxlen=self.history_size)
+            self._history.move_to_end(job_id)
+            history.append(event)
+            self._evict_old_jobs()
+            subscribers = list(self._subscribers.get(job_id, ()))
+
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, event)
+        return event
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: it can catch up by reconnecting with Last-Event-ID
+            pass
+
+    def _evict_old_jobs(self):
+        while len(self._history) > self.max_jobs:
+            job_id, _ = self._history.popitem(last=False)
+            if job_id not in self._subscribers:
+                self._next_id.pop(job_id, None)
+
+    async def subscribe(self, job_id: str, last_event_id: int = 0,
+                        heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict]]:
+        """
+        Yield events for ``job_id``: first the buffered events after
+        ``last_event_id``, then live ones.
+
+        If ``heartbeat`` is set, ``None`` is yielded whenever that many seconds
+        pass without an event so callers can keep idle connections alive.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (queue, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(subscriber)
+            backlog = [e for e in self._history.get(job_id, ()) if e["id"] > last_event_id]
+
+        try:
+            seen = last_event_id
+            for event in backlog:
+                seen = event["id"]
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= seen:
+                    continue  # already replayed from the backlog
+                seen = event["id"]
+                yield event
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(job_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[job_id]
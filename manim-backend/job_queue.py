@@ -0,0 +1,386 @@
+"""
+Durable render queue shared by the API and render workers.
+
+The API enqueues video jobs; render workers (in the API process or started
+separately with ``render_worker.py``) claim them under a time-limited lease
+that they extend with heartbeats. A worker that dies stops heartbeating, its
+lease expires and ``reclaim_expired`` puts the job back in the queue for
+another worker. Workers also append progress events here so the API can
+relay them to ``GET /jobs/{job_id}/events`` subscribers.
+
+``JobQueue`` defines the interface. ``SQLiteJobQueue`` is the embedded
+default (shared by every process on a host through one database file);
+``MemoryJobQueue`` is an in-process stand-in for tests and single-process use.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Leases not renewed for this long are considered abandoned
+DEFAULT_LEASE_SECONDS = 60
+
+# A job whose lease expired this many times is given up on
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class JobQueue:
+    """Interface implemented by every render-queue backend."""
+
+    def enqueue(self, job_id: str, payload: Dict, priority: int = 0) -> None:
+        """Add a job. Enqueueing a job that is already queued or leased is a no-op."""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        """
+        Lease the next job (highest priority, then oldest) to ``worker_id``.
+
+        Returns ``{"job_id", "payload", "attempts"}`` or None if nothing is queued.
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a lease. False means the worker no longer holds it."""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker_id: str) -> None:
+        """Remove a finished job held by ``worker_id`` from the queue."""
+        raise NotImplementedError
+
+    def reclaim_expired(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Tuple[List[str], List[str]]:
+        """
+        Return expired leases to the queue.
+
+        Returns ``(requeued, abandoned)`` job ids; abandoned jobs used up
+        ``max_attempts`` and were removed.
+        """
+        raise NotImplementedError
+
+    def cancel(self, job_id: str) -> bool:
+        """Remove a job that is still waiting. Returns True if it was queued."""
+        raise NotImplementedError
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it is not waiting."""
+        raise NotImplementedError
+
+    def waiting(self) -> List[str]:
+        """Ids of the waiting jobs in claim order (positions 1, 2, ...)."""
+        raise NotImplementedError
+
+    def counts(self) -> Dict[str, int]:
+        """Number of ``queued`` and ``leased`` jobs."""
+        raise NotImplementedError
+
+    def publish_event(self, job_id: str, stage: str, **data) -> None:
+        """Append a progress event for the API to relay."""
+        raise NotImplementedError
+
+    def read_events(self, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """Events with an id greater than ``after_id``, oldest first."""
+        raise NotImplementedError
+
+    def last_event_id(self) -> int:
+        """Id of the newest event, or 0 if there are none."""
+        raise NotImplementedError
+
+    def prune_events(self, max_age_seconds: float = 3600) -> None:
+        """Drop relayed events older than ``max_age_seconds``."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the queue."""
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Embedded SQLite render queue.
+
+    A job is waiting while ``worker_id`` is NULL and leased otherwise. Claims
+    and reclaims run inside ``BEGIN IMMEDIATE`` so two workers can never
+    lease the same job.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS render_queue (
+            job_id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            enqueued_at REAL NOT NULL,
+            worker_id TEXT,
+            lease_expires_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_render_queue_order
+            ON render_queue (worker_id, priority DESC, enqueued_at);
+        CREATE TABLE IF NOT EXISTS render_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str = "jobs.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id: str, payload: Dict, priority: int = 0) -> None:
+        self._connect().execute(
+            "INSERT OR IGNORE INTO render_queue (job_id, payload, priority, enqueued_at) VALUES (?, ?, ?, ?)",
+            (job_id, json.dumps(payload), priority, time.time()),
+        )
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT job_id, payload, attempts FROM render_queue WHERE worker_id IS NULL"
+                " ORDER BY priority DESC, enqueued_at, job_id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE render_queue SET worker_id = ?, lease_expires_at = ?, attempts = attempts + 1"
+                " WHERE job_id = ?",
+                (worker_id, time.time() + lease_seconds, row["job_id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"job_id": row["job_id"], "payload": json.loads(row["payload"]), "attempts": row["attempts"] + 1}
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE render_queue SET lease_expires_at = ? WHERE job_id = ? AND worker_id = ?",
+            (time.time() + lease_seconds, job_id, worker_id),
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str) -> None:
+        self._connect().execute(
+            "DELETE FROM render_queue WHERE job_id = ? AND worker_id = ?", (job_id, worker_id)
+        )
+
+    def reclaim_expired(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Tuple[List[str], List[str]]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "SELECT job_id, attempts FROM render_queue WHERE worker_id IS NOT NULL AND lease_expires_at < ?",
+                (time.time(),),
+            ).fetchall()
+            requeued = [row["job_id"] for row in expired if row["attempts"] < max_attempts]
+            abandoned = [row["job_id"] for row in expired if row["attempts"] >= max_attempts]
+            conn.executemany(
+                "UPDATE render_queue SET worker_id = NULL, lease_expires_at = NULL WHERE job_id = ?",
+                [(job_id,) for job_id in requeued],
+            )
+            conn.executemany("DELETE FROM render_queue WHERE job_id = ?", [(job_id,) for job_id in abandoned])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return requeued, abandoned
+
+    def cancel(self, job_id: str) -> bool:
+        cursor = self._connect().execute(
+            "DELETE FROM render_queue WHERE job_id = ? AND worker_id IS NULL", (job_id,)
+        )
+        return cursor.rowcount > 0
+
+    def position(self, job_id: str) -> Optional[int]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT priority, enqueued_at FROM render_queue WHERE job_id = ? AND worker_id IS NULL", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM render_queue WHERE worker_id IS NULL AND ("
+            " priority > ? OR (priority = ? AND (enqueued_at < ? OR (enqueued_at = ? AND job_id < ?))))",
+            (row["priority"], row["priority"], row["enqueued_at"], row["enqueued_at"], job_id),
+        ).fetchone()[0]
+        return ahead + 1
+
+    def waiting(self) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT job_id FROM render_queue WHERE worker_id IS NULL ORDER BY priority DESC, enqueued_at, job_id"
+        ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        row = self._connect().execute(
+            "SELECT COUNT(*) - COUNT(worker_id) AS queued, COUNT(worker_id) AS leased FROM render_queue"
+        ).fetchone()
+        return {"queued": row["queued"], "leased": row["leased"]}
+
+    def publish_event(self, job_id: str, stage: str, **data) -> None:
+        self._connect().execute(
+            "INSERT INTO render_events (job_id, stage, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, stage, json.dumps(data), time.time()),
+        )
+
+    def read_events(self, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT id, job_id, stage, data FROM render_events WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit),
+        )
+        return [
+            {"id": row["id"], "job_id": row["job_id"], "stage": row["stage"], "data": json.loads(row["data"])}
+            for row in rows
+        ]
+
+    def last_event_id(self) -> int:
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM render_events").fetchone()[0]
+
+    def prune_events(self, max_age_seconds: float = 3600) -> None:
+        self._connect().execute(
+            "DELETE FROM render_events WHERE created_at < ?", (time.time() - max_age_seconds,)
+        )
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryJobQueue(JobQueue):
+    """In-process queue with the same semantics, for tests and single-process runs."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._events: List[Dict] = []
+        self._next_event_id = 1
+        self._lock = threading.Lock()
+
+    def _waiting(self) -> List[Dict]:
+        waiting = [job for job in self._jobs.values() if job["worker_id"] is None]
+        return sorted(waiting, key=lambda job: (-job["priority"], job["enqueued_at"], job["job_id"]))
+
+    def enqueue(self, job_id: str, payload: Dict, priority: int = 0) -> None:
+        with self._lock:
+            self._jobs.setdefault(job_id, {
+                "job_id": job_id, "payload": payload, "priority": priority,
+                "enqueued_at": time.time(), "worker_id": None,
+                "lease_expires_at": None, "attempts": 0,
+            })
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        with self._lock:
+            waiting = self._waiting()
+            if not waiting:
+                return None
+            job = waiting[0]
+            job.update(worker_id=worker_id, lease_expires_at=time.time() + lease_seconds,
+                       attempts=job["attempts"] + 1)
+            return {"job_id": job["job_id"], "payload": job["payload"], "attempts": job["attempts"]}
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["worker_id"] != worker_id:
+                return False
+            job["lease_expires_at"] = time.time() + lease_seconds
+            return True
+
+    def complete(self, job_id: str, worker_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["worker_id"] == worker_id:
+                del self._jobs[job_id]
+
+    def reclaim_expired(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Tuple[List[str], List[str]]:
+        requeued, abandoned = [], []
+        now = time.time()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job["worker_id"] is None or job["lease_expires_at"] >= now:
+                    continue
+                if job["attempts"] >= max_attempts:
+                    del self._jobs[job_id]
+                    abandoned.append(job_id)
+                else:
+                    job.update(worker_id=None, lease_expires_at=None)
+                    requeued.append(job_id)
+        return requeued, abandoned
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["worker_id"] is not None:
+                return False
+            del self._jobs[job_id]
+            return True
+
+    def position(self, job_id: str) -> Optional[int]:
+        with self._lock:
+            for index, job in enumerate(self._waiting(), start=1):
+                if job["job_id"] == job_id:
+                    return index
+        return None
+
+    def waiting(self) -> List[str]:
+        with self._lock:
+            return [job["job_id"] for job in self._waiting()]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            leased = sum(1 for job in self._jobs.values() if job["worker_id"] is not None)
+            return {"queued": len(self._jobs) - leased, "leased": leased}
+
+    def publish_event(self, job_id: str, stage: str, **data) -> None:
+        with self._lock:
+            self._events.append({"id": self._next_event_id, "job_id": job_id, "stage": stage,
+                                 "data": data, "created_at": time.time()})
+            self._next_event_id += 1
+
+    def read_events(self, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        with self._lock:
+            events = [event for event in self._events if event["id"] > after_id][:limit]
+        return [{key: event[key] for key in ("id", "job_id", "stage", "data")} for event in events]
+
+    def last_event_id(self) -> int:
+        return self._next_event_id - 1
+
+    def prune_events(self, max_age_seconds: float = 3600) -> None:
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            self._events = [event for event in self._events if event["created_at"] >= cutoff]
+
+
+def create_job_queue(url: Optional[str] = None) -> JobQueue:
+    """
+    Build a render queue from a URL such as ``sqlite:///jobs.db`` or ``memory://``.
+
+    Defaults to the ``JOB_QUEUE_URL`` environment variable, then to the same
+    SQLite file as the default job store.
+    """
+    url = url or os.getenv("JOB_QUEUE_URL", "sqlite:///jobs.db")
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):])
+    if url == "memory://":
+        return MemoryJobQueue()
+    raise ValueError(f"Unsupported job queue URL: {url}")
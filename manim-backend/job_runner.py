@@ -0,0 +1,264 @@
+"""
+Execution of a single video job, shared by the API and render workers.
+
+``VideoJobRunner`` runs the summary-video pipeline for a queued job inside
+its workspace, records status and results in the job store and publishes
+progress through ``publish(job_id, stage, **data)`` -- the in-process event
+bus when the API renders itself, the shared queue's event log when a
+separate ``render_worker.py`` process does.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import weave
+
+from file_delivery import file_etag
+from job_store import JobStore
+from pdf_compress import compress_pdf
+from video_generator import generate_summary_video, generate_summary_video_upload
+from workspace import JobWorkspace
+
+
+def summarize_metrics(metrics: Dict) -> Dict:
+    """Small subset of generation metrics that is cheap to keep on every job row"""
+    summary = {
+        key: metrics.get(key)
+        for key in ("total_clips", "successful_clips", "failed_clips", "success_rate")
+    }
+    config_metrics = metrics.get("config_metrics") or {}
+    for key in ("source", "time_to_first_token_seconds", "cache_hit_rate"):
+        summary[f"config_{key}"] = config_metrics.get(key)
+    return summary
+
+
+# Uploads larger than this are compressed before config generation
+COMPRESS_THRESHOLD_MB = 2.5
+
+# Largest PDF Claude accepts as a base64 document
+MAX_PDF_MB = 5.0
+
+
+def job_payload(pdf_source: str, prompt: str = "", is_upload: bool = False,
+                batch_config: Optional[str] = None) -> Dict:
+    """Queue payload describing how to run a video job (``batch_config``: config generated in a batch)"""
+    payload = {"pdf_source": pdf_source, "prompt": prompt, "is_upload": is_upload}
+    if batch_config is not None:
+        payload["batch_config"] = batch_config
+    return payload
+
+
+class VideoJobRunner:
+    """Runs queued video jobs against a job store."""
+
+    def __init__(self, job_store: JobStore, publish: Callable[..., object]):
+        self.job_store = job_store
+        self.publish = publish
+
+    def update_status(self, job_id: str, status: str, **kwargs):
+        """Atomically update a job's status and fields in the job store"""
+        if status == "completed":
+            kwargs["completed_at"] = datetime.now().isoformat()
+        self.job_store.update_job(job_id, status=status, **kwargs)
+
+    def progress_callback(self, job_id: str):
+        """Build the on_progress callback that feeds pipeline stages into the job's event stream"""
+        def on_progress(stage: str, **data):
+            self.publish(job_id, stage, **data)
+            self.job_store.update_job(job_id, stage=stage)
+        return on_progress
+
+    async def run(self, job_id: str, payload: Dict):
+        """Entry point for the render pool: run a job from its queue payload"""
+        job = self.job_store.get_job(job_id, include_artifacts=False)
+        if job is None:
+            print(f"Job {job_id}: deleted before it started, skipping")
+            return
+        # An earlier attempt may already have replaced the upload with a compressed copy
+        pdf_source = job.get("pdf_source") or payload["pdf_source"]
+        await self.process_video_generation(
+            job_id, pdf_source, payload.get("prompt", ""), payload.get("is_upload", False),
+            payload.get("batch_config")
+        )
+
+    async def compress_upload(self, job_id: str, pdf_path: str) -> str:
+        """
+        Compress an uploaded PDF that is too large for Claude ("compressing" stage).
+
+        Runs off the event loop; records timing in the job's compression_metrics
+        and points the job at the compressed file. Returns the PDF to use.
+        """
+        original_mb = os.path.getsize(pdf_path) / (1024 * 1024)
+        if original_mb <= COMPRESS_THRESHOLD_MB:
+            return pdf_path
+
+        print(f"🔄 File is {original_mb:.1f}MB, compressing to reduce API load...")
+        self.update_status(job_id, "compressing")
+        self.publish(job_id, "compressing", size_mb=round(original_mb, 2))
+
+        started = time.monotonic()
+        base, ext = os.path.splitext(pdf_path)
+        final_path = await asyncio.to_thread(compress_pdf, pdf_path, f"{base}_compressed{ext}", COMPRESS_THRESHOLD_MB)
+        final_mb = os.path.getsize(final_path) / (1024 * 1024)
+        metrics = {
+            "original_mb": round(original_mb, 2),
+            "compressed_mb": round(final_mb, 2),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+
+        if final_path != pdf_path:
+            print(f"✅ Using compressed version: {final_mb:.1f}MB")
+            self.job_store.update_job(job_id, pdf_source=final_path, compression_metrics=metrics)
+            os.remove(pdf_path)
+        else:
+            print("⚠️  Compression didn't help, using original")
+            self.job_store.update_job(job_id, compression_metrics=metrics)
+        self.publish(job_id, "compressed", **metrics)
+
+        if final_mb > MAX_PDF_MB:
+            raise ValueError(
+                f"PDF is too large even after compression ({final_mb:.1f}MB). "
+                "Please try a smaller file or use a URL instead."
+            )
+        return final_path
+
+    def abandon(self, job_id: str):
+        """Mark a job failed after its render workers repeatedly died"""
+        error_msg = "Render worker stopped responding"
+        self.update_status(job_id, "failed", error=error_msg)
+        self.publish(job_id, "failed", error=error_msg)
+
+    @weave.op()
+    async def process_video_generation(self, job_id: str, pdf_source: str, prompt: str = "", is_upload: bool = False,
+                                       batch_config: Optional[str] = None):
+        """
+        Background task to generate video with Weave tracking.
+
+        Intermediate files live in a per-job workspace that is kept when the job
+        fails, so a retry or a restart resumes from the last checkpointed stage;
+        it is removed once the job completes.
+        """
+        on_progress = self.progress_callback(job_id)
+        try:
+            if is_upload:
+                pdf_source = await self.compress_upload(job_id, pdf_source)
+
+            with JobWorkspace(job_id, cleanup=False) as workspace:
+                self.update_status(job_id, "processing", error=None)
+                self.publish(job_id, "processing")
+                print(f"Job {job_id}: Starting video generation...")
+
+                # Use our existing video generation pipeline
+                if is_upload:
+                    # For uploaded files, we need to use base64 encoding
+                    result = await generate_summary_video_upload(
+                        pdf_source, prompt, on_progress=on_progress, workspace=workspace
+                    )
+                else:
+                    # For URLs, pass directly
+                    result = await generate_summary_video(
+                        pdf_source, prompt, on_progress=on_progress, workspace=workspace,
+                        batch_config=batch_config
+                    )
+
+                # Move video to outputs directory with job ID
+                os.makedirs("outputs", exist_ok=True)
+                original_path = result["video_path"]
+                final_path = f"outputs/video_{job_id}.mp4"
+
+                # Enhanced file move with audio stream verification
+                if os.path.exists(original_path):
+                    print(f"🔄 Moving video with audio verification...")
+                    print(f"📁 Source: {original_path} ({os.path.getsize(original_path)} bytes)")
+
+                    # First, verify the original file has audio
+                    try:
+                        import subprocess
+                        cmd = ["ffprobe", "-v", "quiet", "-show_streams", "-select_streams", "a", original_path]
+                        # Probing and copying run off the event loop so lease heartbeats keep running
+                        audio_check = await asyncio.to_thread(subprocess.run, cmd, capture_output=True, text=True)
+                        original_has_audio = bool(audio_check.stdout.strip())
+                        print(f"🔊 Original file has audio: {original_has_audio}")
+                    except Exception as e:
+                        print(f"⚠️  Could not check original audio: {e}")
+                        original_has_audio = None
+
+                    # Use FFmpeg to copy the file to preserve all streams perfectly
+                    try:
+                        # Use FFmpeg copy to preserve all streams and metadata
+                        ffmpeg_cmd = [
+                            "ffmpeg", "-y",  # -y to overwrite existing files
+                            "-i", original_path,  # input file
+                            "-c", "copy",  # copy all streams without re-encoding
+                            "-map", "0",  # map all streams from input
+                            "-movflags", "+faststart",  # moov atom up front so playback starts early
+                            final_path  # output file
+                        ]
+                        print(f"🎬 Using FFmpeg to preserve all streams: {' '.join(ffmpeg_cmd)}")
+                        ffmpeg_result = await asyncio.to_thread(
+                            subprocess.run, ffmpeg_cmd, capture_output=True, text=True
+                        )
+
+                        if ffmpeg_result.returncode == 0:
+                            print(f"✅ FFmpeg copy successful")
+                            # Remove original after successful copy
+                            os.remove(original_path)
+
+                            # Verify the copied file
+                            if os.path.exists(final_path):
+                                final_size = os.path.getsize(final_path)
+                                print(f"📁 Final file: {final_path} ({final_size} bytes)")
+
+                                # Verify audio streams in final file
+                                try:
+                                    cmd = ["ffprobe", "-v", "quiet", "-show_streams", "-select_streams", "a", final_path]
+                                    final_audio_check = await asyncio.to_thread(
+                                        subprocess.run, cmd, capture_output=True, text=True
+                                    )
+                                    final_has_audio = bool(final_audio_check.stdout.strip())
+                                    print(f"🔊 Final file has audio: {final_has_audio}")
+
+                                    if original_has_audio and not final_has_audio:
+                                        print(f"🚨 WARNING: Audio lost during file copy!")
+                                    elif final_has_audio:
+                                        print(f"✅ Audio successfully preserved in final file")
+                                except Exception as e:
+                                    print(f"⚠️  Could not verify final audio: {e}")
+                            else:
+                                raise Exception("FFmpeg copy failed - output file not created")
+                        else:
+                            raise Exception(f"FFmpeg failed: {ffmpeg_result.stderr}")
+
+                    except Exception as ffmpeg_error:
+                        print(f"⚠️  FFmpeg copy failed: {ffmpeg_error}")
+                        print(f"🔄 Falling back to shutil.move()...")
+
+                        # Fallback to shutil.move which should preserve the file exactly
+                        import shutil
+                        await asyncio.to_thread(shutil.move, original_path, final_path)
+                        print(f"📁 Fallback move completed")
+
+                    result["video_path"] = final_path
+                    print(f"✅ Video successfully moved to: {final_path}")
+
+                # Update job as completed with full metrics
+                self.update_status(
+                    job_id, 
+                    "completed", 
+                    video_path=final_path,
+                    video_etag=await asyncio.to_thread(file_etag, final_path),
+                    metrics_summary=summarize_metrics(result),
+                    generation_metrics=result
+                )
+                self.publish(job_id, "completed", video_url=f"/download/{job_id}")
+                workspace.cleanup()
+                print(f"Job {job_id}: Completed successfully!")
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Job {job_id}: Failed with error: {error_msg}")
+            self.update_status(job_id, "failed", error=error_msg)
+            self.publish(job_id, "failed", error=error_msg)
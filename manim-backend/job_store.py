@@ -0,0 +1,463 @@
+"""
+Job persistence for the video generation API.
+
+Jobs used to live in a single ``jobs.json`` that every request parsed and
+rewrote in full. This module replaces that with a small pluggable store:
+``JobStore`` defines the interface and ``SQLiteJobStore`` is the default
+embedded backend (WAL mode, one row per job, indexed by status and
+created_at). Large per-job payloads such as ``generation_metrics`` are kept
+in a separate artifacts table so status polls never have to load them.
+Batches of jobs submitted together (see ``batch_runner``) have their own
+``batches`` table; their jobs point to them through ``batch_id``.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Job fields that are too large to live in the hot job row. They are stored
+# in ``job_artifacts`` and only loaded when explicitly requested.
+ARTIFACT_FIELDS = ("generation_metrics", "batch_config")
+
+# Statuses of jobs that are queued or running
+ACTIVE_STATUSES = ("pending", "compressing", "processing")
+
+# Batch jobs waiting for their config from the batch (not yet in the render queue)
+BATCHED_STATUS = "batched"
+
+# Statuses of batches that still have work to do
+ACTIVE_BATCH_STATUSES = ("submitting", "generating", "rendering")
+
+
+class JobStore:
+    """Interface implemented by every job-store backend."""
+
+    def create_job(self, job: Dict) -> None:
+        """Insert a new job record. ``job`` must contain job_id, status and created_at."""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str, include_artifacts: bool = True) -> Optional[Dict]:
+        """Return a single job, or None if it does not exist."""
+        raise NotImplementedError
+
+    def update_job(self, job_id: str, **fields) -> bool:
+        """Atomically merge ``fields`` into a job. Returns False if the job does not exist."""
+        raise NotImplementedError
+
+    def delete_job(self, job_id: str) -> Optional[Dict]:
+        """Delete a job and return its last known state, or None if it did not exist."""
+        raise NotImplementedError
+
+    def list_jobs(self, statuses: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                  before: Optional[Tuple[str, str]] = None,
+                  include_artifacts: bool = False, batch_id: Optional[str] = None) -> List[Dict]:
+        """
+        List jobs, newest first.
+
+        ``statuses`` filters by status, ``before`` is a ``(created_at, job_id)``
+        keyset cursor: only jobs strictly older than it are returned.
+        ``batch_id`` restricts the list to the jobs created by one batch.
+        """
+        raise NotImplementedError
+
+    def count_jobs(self) -> int:
+        """Return the total number of stored jobs."""
+        raise NotImplementedError
+
+    def revision(self) -> int:
+        """Return a counter that changes whenever any job is created, updated or deleted."""
+        raise NotImplementedError
+
+    def find_by_idempotency_key(self, idempotency_key: str) -> Optional[Dict]:
+        """Return the job created with ``idempotency_key``, if any."""
+        raise NotImplementedError
+
+    def claim_job(self, job: Dict, reuse_completed: bool = True) -> Tuple[Dict, bool]:
+        """
+        Insert ``job`` unless an equivalent job already exists.
+
+        A job is equivalent if it shares the ``idempotency_key``, or if it has
+        the same ``content_key`` and is still active (or completed,
+        when ``reuse_completed`` is set). Returns ``(job, created)`` where
+        ``job`` is either the new record or the existing one.
+        """
+        raise NotImplementedError
+
+    def create_batch(self, batch: Dict, jobs: Sequence[Dict] = ()) -> None:
+        """
+        Insert a batch record and its ``jobs`` atomically: either all of them
+        are stored or none is. ``batch`` must contain batch_id, status and created_at.
+        """
+        raise NotImplementedError
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        """Return a single batch, or None if it does not exist."""
+        raise NotImplementedError
+
+    def update_batch(self, batch_id: str, **fields) -> bool:
+        """Atomically merge ``fields`` into a batch. Returns False if the batch does not exist."""
+        raise NotImplementedError
+
+    def list_batches(self, statuses: Optional[Sequence[str]] = None) -> List[Dict]:
+        """List batches, oldest first, optionally filtered by status."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Embedded SQLite job store.
+
+    Every thread gets its own connection; writes run inside ``BEGIN IMMEDIATE``
+    transactions so concurrent background tasks can no longer lose each
+    other's updates.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            content_key TEXT,
+            idempotency_key TEXT,
+            batch_id TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs (status, created_at);
+        CREATE TABLE IF NOT EXISTS job_artifacts (
+            job_id TEXT NOT NULL REFERENCES jobs (job_id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (job_id, name)
+        );
+        CREATE TABLE IF NOT EXISTS store_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO store_meta (key, value) VALUES ('revision', 0);
+        CREATE TABLE IF NOT EXISTS batches (
+            batch_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+    """
+
+    # Indexes on columns added after the first release; created once the
+    # columns are guaranteed to exist
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_jobs_content_key ON jobs (content_key, status);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_idempotency_key ON jobs (idempotency_key);
+        CREATE INDEX IF NOT EXISTS idx_jobs_batch_id ON jobs (batch_id, status);
+    """
+
+    # Columns that older databases may be missing
+    ADDED_COLUMNS = {"content_key": "TEXT", "idempotency_key": "TEXT", "batch_id": "TEXT"}
+
+    def __init__(self, db_path: str = "jobs.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in self.ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        conn.executescript(self.INDEXES)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        """Return a connection with an open write transaction that bumps the store revision."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'revision'")
+        return conn
+
+    @staticmethod
+    def _split(job: Dict):
+        """Split a job dict into its hot row and its artifact payloads."""
+        row = {k: v for k, v in job.items() if k not in ARTIFACT_FIELDS}
+        artifacts = {k: job[k] for k in ARTIFACT_FIELDS if k in job}
+        return row, artifacts
+
+    @staticmethod
+    def _write_artifacts(conn: sqlite3.Connection, job_id: str, artifacts: Dict):
+        for name, value in artifacts.items():
+            if value is None:
+                conn.execute("DELETE FROM job_artifacts WHERE job_id = ? AND name = ?", (job_id, name))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_artifacts (job_id, name, data) VALUES (?, ?, ?)",
+                    (job_id, name, json.dumps(value)),
+                )
+
+    def _attach_artifacts(self, conn: sqlite3.Connection, jobs: List[Dict]) -> List[Dict]:
+        if not jobs:
+            return jobs
+        by_id = {job["job_id"]: job for job in jobs}
+        placeholders = ",".join("?" for _ in by_id)
+        rows = conn.execute(
+            f"SELECT job_id, name, data FROM job_artifacts WHERE job_id IN ({placeholders})",
+            list(by_id),
+        )
+        for row in rows:
+            by_id[row["job_id"]][row["name"]] = json.loads(row["data"])
+        return jobs
+
+    def _insert(self, conn: sqlite3.Connection, job: Dict):
+        row, artifacts = self._split(job)
+        conn.execute(
+            "INSERT INTO jobs (job_id, status, created_at, updated_at, content_key, idempotency_key, batch_id, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (row["job_id"], row["status"], row["created_at"], datetime.now().isoformat(),
+             row.get("content_key"), row.get("idempotency_key"), row.get("batch_id"), json.dumps(row)),
+        )
+        self._write_artifacts(conn, row["job_id"], artifacts)
+
+    def create_job(self, job: Dict) -> None:
+        conn = self._write()
+        try:
+            self._insert(conn, job)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def find_by_idempotency_key(self, idempotency_key: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def claim_job(self, job: Dict, reuse_completed: bool = True) -> Tuple[Dict, bool]:
+        statuses = list(ACTIVE_STATUSES) + (["completed"] if reuse_completed else [])
+        conn = self._write()
+        try:
+            row = None
+            if job.get("idempotency_key"):
+                row = conn.execute(
+                    "SELECT data FROM jobs WHERE idempotency_key = ?", (job["idempotency_key"],)
+                ).fetchone()
+            if row is None and job.get("content_key"):
+                # Prefer a finished job, then the most recent one still running
+                row = conn.execute(
+                    f"SELECT data FROM jobs WHERE content_key = ? AND status IN ({','.join('?' for _ in statuses)})"
+                    " ORDER BY status = 'completed' DESC, created_at DESC LIMIT 1",
+                    [job["content_key"], *statuses],
+                ).fetchone()
+            if row is not None:
+                conn.execute("ROLLBACK")
+                return json.loads(row["data"]), False
+            self._insert(conn, job)
+            conn.execute("COMMIT")
+            return job, True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_job(self, job_id: str, include_artifacts: bool = True) -> Optional[Dict]:
+        conn = self._connect()
+        row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = json.loads(row["data"])
+        if include_artifacts:
+            self._attach_artifacts(conn, [job])
+        return job
+
+    def update_job(self, job_id: str, **fields) -> bool:
+        row_fields, artifacts = self._split(fields)
+        conn = self._write()
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return False
+            job = json.loads(row["data"])
+            job.update(row_fields)
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, data = ? WHERE job_id = ?",
+                (job["status"], datetime.now().isoformat(), json.dumps(job), job_id),
+            )
+            self._write_artifacts(conn, job_id, artifacts)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_job(self, job_id: str) -> Optional[Dict]:
+        conn = self._write()
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+            return json.loads(row["data"])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list_jobs(self, statuses: Optional[Sequence[str]] = None, limit: Optional[int] = None,
+                  before: Optional[Tuple[str, str]] = None,
+                  include_artifacts: bool = False, batch_id: Optional[str] = None) -> List[Dict]:
+        conn = self._connect()
+        query = "SELECT data FROM jobs"
+        clauses = []
+        params: list = []
+        if batch_id:
+            clauses.append("batch_id = ?")
+            params.append(batch_id)
+        if statuses:
+            clauses.append(f"status IN ({','.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        if before:
+            created_at, job_id = before
+            clauses.append("(created_at < ? OR (created_at = ? AND job_id < ?))")
+            params.extend([created_at, created_at, job_id])
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC, job_id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        jobs = [json.loads(row["data"]) for row in conn.execute(query, params)]
+        if include_artifacts:
+            self._attach_artifacts(conn, jobs)
+        return jobs
+
+    def count_jobs(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def revision(self) -> int:
+        row = self._connect().execute("SELECT value FROM store_meta WHERE key = 'revision'").fetchone()
+        return row[0]
+
+    def create_batch(self, batch: Dict, jobs: Sequence[Dict] = ()) -> None:
+        conn = self._write()
+        try:
+            conn.execute(
+                "INSERT INTO batches (batch_id, status, created_at, data) VALUES (?, ?, ?, ?)",
+                (batch["batch_id"], batch["status"], batch["created_at"], json.dumps(batch)),
+            )
+            for job in jobs:
+                self._insert(conn, job)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT data FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def update_batch(self, batch_id: str, **fields) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return False
+            batch = json.loads(row["data"])
+            batch.update(fields)
+            conn.execute(
+                "UPDATE batches SET status = ?, data = ? WHERE batch_id = ?",
+                (batch["status"], json.dumps(batch), batch_id),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list_batches(self, statuses: Optional[Sequence[str]] = None) -> List[Dict]:
+        query = "SELECT data FROM batches"
+        params: list = []
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        query += " ORDER BY created_at, batch_id"
+        return [json.loads(row["data"]) for row in self._connect().execute(query, params)]
+
+    def close(self) -> None:
+        """
+        Close the calling thread's connection.
+
+        Connections are per thread: those opened by other threads (e.g. the
+        asyncio.to_thread pool) are not closed here but when their thread
+        exits. A thread that uses the store after close() reconnects.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_job_store(url: Optional[str] = None) -> JobStore:
+    """
+    Build a job store from a URL such as ``sqlite:///jobs.db``.
+
+    Defaults to the ``JOB_STORE_URL`` environment variable, then to a local
+    SQLite file next to the server.
+    """
+    url = url or os.getenv("JOB_STORE_URL", "sqlite:///jobs.db")
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported job store URL: {url}")
+
+
+def migrate_json_jobs(json_path: str, store: JobStore) -> int:
+    """
+    One-shot import of a legacy ``jobs.json`` file into ``store``.
+
+    Jobs that already exist in the store are skipped. On success the JSON file
+    is renamed to ``<name>.migrated`` so the import never runs twice. A corrupt
+    file is left in place and reported instead of being treated as empty.
+    """
+    if not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, "r") as f:
+            legacy_jobs = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read legacy job file {json_path}: {e}")
+        return 0
+
+    migrated = 0
+    for job_id, job in legacy_jobs.items():
+        if store.get_job(job_id, include_artifacts=False) is not None:
+            continue
+        job = dict(job)
+        job.setdefault("job_id", job_id)
+        job.setdefault("status", "failed")
+        job.setdefault("created_at", datetime.now().isoformat())
+        store.create_job(job)
+        migrated += 1
+
+    os.replace(json_path, json_path + ".migrated")
+    print(f"📦 Migrated {migrated} jobs from {json_path} into the job store")
+    return migrated
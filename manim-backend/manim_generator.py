@@ -1,14 +1,23 @@
 import asyncio
+import contextlib
 import subprocess
 import os
-import tempfile
 import json
-from typing import List, Dict, Any
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from pathlib import Path
 import weave
 
+from job_events import report_progress
+from scene_validator import MANIM_DRY_RUN, SCENE_PRELUDE, dry_run_scene, validate_scene
+
+# Fixes requested for a clip whose scene fails validation or rendering, and the time allowed for them
+RENDER_REPAIR_ATTEMPTS = int(os.getenv("RENDER_REPAIR_ATTEMPTS", "2"))
+RENDER_REPAIR_SECONDS = float(os.getenv("RENDER_REPAIR_SECONDS", "300"))
+
 @weave.op()
-async def generate_manim_video(code: str, output_dir: str = "output", clip_name: str = None, quality: str = "medium_quality") -> str:
+async def generate_manim_video(code: str, output_dir: str = "output", clip_name: str = None, quality: str = "medium_quality",
+                               errors: Optional[List[str]] = None) -> str:
     """
     Generate a video from Manim code asynchronously.
     
@@ -17,17 +26,22 @@ async def generate_manim_video(code: str, output_dir: str = "output", clip_name:
         output_dir: Directory to save the output video
         clip_name: Optional name for the clip file
         quality: Manim quality setting (low_quality, medium_quality, high_quality)
+        errors: Optional list the reason for a failure is appended to
         
     Returns:
         Path to the generated video file
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
+    errors = [] if errors is None else errors
     
     # Generate a unique filename if not provided
     if not clip_name:
         clip_name = f"clip_{hash(code) % 10000}"
     
+    # Each clip renders into its own media directory so concurrent renders
+    # never see each other's output files
+    media_dir = os.path.join(output_dir, clip_name)
+    os.makedirs(media_dir, exist_ok=True)
+    
     # Validate and clean the code
     if "class SimpleScene" not in code:
         print(f"Warning: Code doesn't contain 'class SimpleScene', attempting to fix...")
@@ -35,14 +49,24 @@ async def generate_manim_video(code: str, output_dir: str = "output", clip_name:
         code = code.replace("class Scene", "class SimpleScene")
         if "class SimpleScene" not in code:
             print(f"Error: Could not fix class name in code")
+            errors.append("The code does not define class SimpleScene")
             return None
     
-    # Create temporary Python file with the Manim code
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
+    # Cheap checks first: a broken scene should fail in milliseconds, not mid-render
+    problems = validate_scene(code)
+    if problems:
+        print(f"Error: Manim code for {clip_name} failed validation:")
+        for problem in problems:
+            print(f"  - {problem}")
+        errors.append("Validation failed:\n" + "\n".join(problems))
+        return None
+    
+    # Write the Manim code next to the clip's media directory
+    scene_file_path = os.path.join(media_dir, f"{clip_name}.py")
+    with open(scene_file_path, 'w') as scene_file:
         # Always include default imports and ensure clean code
-        full_code = "from manim import *\nimport numpy as np\n\n" + code
-        temp_file.write(full_code)
-        temp_file_path = temp_file.name
+        full_code = SCENE_PRELUDE + code
+        scene_file.write(full_code)
         
         # Debug: Print the code being executed
         print(f"Generated Manim code for {clip_name}:")
@@ -51,6 +75,14 @@ async def generate_manim_video(code: str, output_dir: str = "output", clip_name:
         print("=" * 50)
     
     try:
+        if MANIM_DRY_RUN:
+            dry_run_error = await dry_run_scene(scene_file_path, media_dir)
+            if dry_run_error:
+                print(f"Error: Dry run failed for clip {clip_name}")
+                print(f"stderr: {dry_run_error}")
+                errors.append(dry_run_error)
+                return None
+        
         # Run Manim command asynchronously
         quality_flag = {
             "low_quality": "l",
@@ -60,10 +92,10 @@ async def generate_manim_video(code: str, output_dir: str = "output", clip_name:
         
         cmd = [
             "manim",
-            temp_file_path,
+            scene_file_path,
             "SimpleScene",  # Specify the exact scene class to render
-            "-o", output_dir,
-            "--media_dir", output_dir,
+            "-o", clip_name,
+            "--media_dir", media_dir,
             "-v", "WARNING",  # Reduce verbosity
             f"-q{quality_flag}",  # Quality flag: -ql (low), -qm (medium), -qh (high)
             "--resolution", "1280,720",  # Match Veo's 720p resolution
@@ -84,35 +116,92 @@ async def generate_manim_video(code: str, output_dir: str = "output", clip_name:
             print(f"Error: Manim execution failed for clip {clip_name}")
             print(f"stdout: {stdout.decode()}")
             print(f"stderr: {stderr.decode()}")
+            errors.append(stderr.decode(errors="replace") or stdout.decode(errors="replace") or "Manim exited with an error")
             return None
         
-        # Find the generated video file
-        video_files = list(Path(output_dir).glob("**/*.mp4"))
-        if not video_files:
+        # Find this clip's rendered video (partial movie files are skipped)
+        final_videos = [
+            f for f in Path(media_dir).glob(f"**/{clip_name}.mp4")
+            if "partial_movie_files" not in f.parts
+        ]
+        if not final_videos:
             print(f"Error: No video file was generated for clip {clip_name}")
+            errors.append("Manim finished without writing a video")
             return None
         
-        # Filter out partial files and find the most recent
-        final_videos = [f for f in video_files if "partial" not in str(f)]
-        if not final_videos:
-            print(f"Warning: No final video file found for clip {clip_name}, using latest available")
-            final_videos = video_files
-        
-        # Return the most recently created video file
-        latest_video = max(final_videos, key=os.path.getctime)
-        print(f"✓ Generated Manim video: {latest_video}")
-        return str(latest_video)
+        video_path = final_videos[0]
+        print(f"✓ Generated Manim video: {video_path}")
+        return str(video_path)
         
     except Exception as e:
         print(f"Exception during Manim generation: {e}")
+        errors.append(str(e))
         return None
     finally:
         # Clean up temporary file
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+        if os.path.exists(scene_file_path):
+            os.unlink(scene_file_path)
 
 @weave.op()
-async def generate_manim_clips(clips_config: List[Dict[str, Any]], output_dir: str = "clips", quality: str = "medium_quality") -> List[str]:
+async def render_manim_clip(clip: Dict[str, Any], index: int, total: int, output_dir: str = "clips",
+                            quality: str = "medium_quality", on_progress=None,
+                            repair_code: Optional[Callable[[str, str], Awaitable[str]]] = None,
+                            render_slots: Optional[asyncio.Semaphore] = None) -> Optional[str]:
+    """
+    Render the ``index``-th Manim clip of a video, reporting per-clip events.
+    
+    With ``repair_code`` (async ``(code, error) -> code``), a scene that fails
+    validation or rendering is sent back with the captured error and
+    rendered again, up to RENDER_REPAIR_ATTEMPTS times within
+    RENDER_REPAIR_SECONDS; the code that rendered replaces ``clip['code']``.
+    ``render_slots`` is held only while rendering, not while a fix is
+    being written.
+    
+    Returns the path to the rendered video, or None if rendering failed.
+    """
+    clip_name = f"manim_clip_{index:03d}"
+    print(f"Generating clip {index+1}/{total}: {clip_name}")
+    report_progress(on_progress, "clip_rendering", clip_index=index, total_clips=total)
+    
+    code = clip['code']
+    deadline = time.monotonic() + RENDER_REPAIR_SECONDS
+    error = None
+    for attempt in range(RENDER_REPAIR_ATTEMPTS + 1):
+        errors = []
+        try:
+            async with render_slots or contextlib.nullcontext():
+                video_path = await generate_manim_video(code, output_dir, clip_name, quality, errors)
+        except Exception as e:
+            print(f"✗ Error generating clip {index+1}: {e}")
+            video_path = None
+            errors.append(str(e))
+        if video_path:
+            clip['code'] = code
+            print(f"✓ Successfully generated clip {index+1}")
+            report_progress(on_progress, "clip_rendered", clip_index=index, total_clips=total, repairs=attempt)
+            return video_path
+        
+        error = "\n".join(errors) or "Rendering failed"
+        if not repair_code or attempt == RENDER_REPAIR_ATTEMPTS or time.monotonic() >= deadline:
+            break
+        print(f"🩹 Requesting a fix for clip {index+1} ({attempt+1}/{RENDER_REPAIR_ATTEMPTS})")
+        report_progress(on_progress, "clip_repairing", clip_index=index, total_clips=total, attempt=attempt + 1)
+        try:
+            code = await asyncio.wait_for(repair_code(code, error), deadline - time.monotonic())
+        except Exception as e:
+            print(f"✗ Could not get a fix for clip {index+1}: {e!r}")
+            break
+    
+    print(f"✗ Failed to generate clip {index+1}")
+    report_progress(on_progress, "clip_failed", clip_index=index, total_clips=total, error=error[-500:])
+    return None
+
+def renderable_clips(clips_config: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Clips that carry Manim code to render."""
+    return [clip for clip in clips_config if clip.get('type') == 'manim' and clip.get('code')]
+
+async def generate_manim_clips(clips_config: List[Dict[str, Any]], output_dir: str = "clips", quality: str = "medium_quality", on_progress=None,
+                               repair_code: Optional[Callable[[str, str], Awaitable[str]]] = None) -> List[str]:
     """
     Generate multiple Manim clips sequentially (to avoid resource conflicts).
     
@@ -120,27 +209,20 @@ async def generate_manim_clips(clips_config: List[Dict[str, Any]], output_dir: s
         clips_config: List of clip configurations with 'code' and optional 'voice_over'
         output_dir: Directory to save output videos
         quality: Manim quality setting (low_quality, medium_quality, high_quality)
+        on_progress: Optional callback ``on_progress(stage, **data)`` for per-clip events
+        repair_code: Optional async ``(code, error) -> code`` used to fix clips that fail (see render_manim_clip)
         
     Returns:
         List of paths to generated video files
     """
-    manim_clips = [clip for clip in clips_config if clip.get('type') == 'manim' and clip.get('code')]
+    manim_clips = renderable_clips(clips_config)
     
     video_paths = []
     
     for i, clip in enumerate(manim_clips):
-        clip_name = f"manim_clip_{i:03d}"
-        print(f"Generating clip {i+1}/{len(manim_clips)}: {clip_name}")
-        
-        try:
-            video_path = await generate_manim_video(clip['code'], output_dir, clip_name, quality)
-            if video_path:
-                video_paths.append(video_path)
-                print(f"✓ Successfully generated clip {i+1}")
-            else:
-                print(f"✗ Failed to generate clip {i+1}")
-        except Exception as e:
-            print(f"✗ Error generating clip {i+1}: {e}")
+        video_path = await render_manim_clip(clip, i, len(manim_clips), output_dir, quality, on_progress, repair_code)
+        if video_path:
+            video_paths.append(video_path)
     
     return video_paths
 
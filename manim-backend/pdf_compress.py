@@ -0,0 +1,215 @@
+"""
+PDF compression for uploads that are too large to send to Claude.
+
+``compress_pdf`` first tries to shrink the document without touching its
+text and vector content: embedded raster images are downsampled to the
+resolution they are actually displayed at and re-encoded as JPEG, at
+progressively lower settings until the file fits. Only if that is not
+enough are pages rasterized (``rasterize_pdf``), which loses the text layer
+and forces Claude to read the pages as images.
+
+Rasterization renders every page once, in parallel across a process pool,
+encodes it at each step of ``RASTER_LADDER`` and then picks the best step
+whose total encoded size fits the target, so no page is rendered twice.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+# (max DPI at displayed size, JPEG quality) tried in order by recompress_images
+IMAGE_SETTINGS = [(150, 75), (110, 60), (72, 45)]
+
+# Images whose encoded stream is smaller than this are left alone
+MIN_IMAGE_BYTES = 16 * 1024
+
+# (scale, JPEG quality) candidates for rasterized pages, best first. Pages
+# are rendered once at the largest scale and downsampled for the others.
+RASTER_LADDER = [(0.8, 75), (0.8, 60), (0.7, 55), (0.6, 50), (0.5, 40), (0.4, 35)]
+
+# Pages handed to each rasterization task
+RASTER_PAGES_PER_TASK = 8
+
+# Process pool size for rasterization
+RASTER_WORKERS = int(os.getenv("PDF_COMPRESS_WORKERS", str(min(os.cpu_count() or 1, 8))))
+
+# Allowance for the PDF structure around the page images
+RASTER_PAGE_OVERHEAD_BYTES = 1024
+
+SAVE_OPTIONS = dict(garbage=4, deflate=True, clean=True)
+
+
+def _size_mb(path: str) -> float:
+    return os.path.getsize(path) / (1024 * 1024)
+
+
+def _display_width_inches(page: fitz.Page, xref: int) -> float:
+    """Widest width (in inches) at which an image is drawn on ``page``."""
+    try:
+        rects = page.get_image_rects(xref)
+    except Exception:
+        rects = []
+    return max((rect.width / 72 for rect in rects), default=0)
+
+
+def recompress_images(input_path: str, output_path: str, max_dpi: int = 150, jpeg_quality: int = 75) -> int:
+    """
+    Downsample and re-encode the embedded images of a PDF, keeping text and vectors.
+
+    Each image is shrunk to at most ``max_dpi`` at the largest size it is
+    displayed at and stored as JPEG when that is smaller than the original
+    stream. Images with transparency masks are skipped. Returns the number of
+    images replaced.
+    """
+    doc = fitz.open(input_path)
+    replaced = 0
+    seen = set()
+    try:
+        for page in doc:
+            for image in page.get_images(full=True):
+                xref, smask = image[0], image[1]
+                if xref in seen or smask:
+                    continue
+                seen.add(xref)
+
+                original_bytes = len(doc.xref_stream_raw(xref) or b"")
+                if original_bytes < MIN_IMAGE_BYTES:
+                    continue
+
+                try:
+                    pix = fitz.Pixmap(doc, xref)
+                    if pix.alpha:
+                        pix = fitz.Pixmap(pix, 0)
+                    if pix.n not in (1, 3):
+                        # CMYK and other colorspaces -> RGB for JPEG
+                        pix = fitz.Pixmap(fitz.csRGB, pix)
+
+                    display_inches = _display_width_inches(page, xref)
+                    if display_inches:
+                        max_width = int(display_inches * max_dpi)
+                        if pix.width > max_width > 0:
+                            scale = max_width / pix.width
+                            pix = fitz.Pixmap(pix, max_width, max(1, int(pix.height * scale)), None)
+
+                    data = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+                    if len(data) < original_bytes:
+                        page.replace_image(xref, stream=data)
+                        replaced += 1
+                except Exception as e:
+                    print(f"⚠️  Leaving image {xref} as is: {e}")
+
+        doc.save(output_path, **SAVE_OPTIONS)
+    finally:
+        doc.close()
+    return replaced
+
+
+def _encode_pages(input_path: str, page_numbers: List[int]) -> List[Dict[Tuple[float, int], bytes]]:
+    """Render pages once and encode each at every RASTER_LADDER step (runs in a worker process)."""
+    max_scale = max(scale for scale, _ in RASTER_LADDER)
+    results = []
+    doc = fitz.open(input_path)
+    try:
+        for page_number in page_numbers:
+            page = doc[page_number]
+            rendered = page.get_pixmap(matrix=fitz.Matrix(max_scale, max_scale), alpha=False)
+            scaled = {max_scale: rendered}
+            candidates = {}
+            for scale, quality in RASTER_LADDER:
+                if scale not in scaled:
+                    factor = scale / max_scale
+                    scaled[scale] = fitz.Pixmap(
+                        rendered, max(1, int(rendered.width * factor)), max(1, int(rendered.height * factor)), None
+                    )
+                candidates[(scale, quality)] = scaled[scale].tobytes("jpeg", jpg_quality=quality)
+            results.append(candidates)
+    finally:
+        doc.close()
+    return results
+
+
+def rasterize_pdf(input_path: str, output_path: str, target_size_mb: float = 2.5) -> str:
+    """
+    Rebuild the PDF from one JPEG per page (drops the text layer), using the
+    best RASTER_LADDER step that fits ``target_size_mb`` (or the smallest).
+    """
+    with fitz.open(input_path) as doc:
+        page_rects = [page.rect for page in doc]
+
+    batches = [
+        list(range(start, min(start + RASTER_PAGES_PER_TASK, len(page_rects))))
+        for start in range(0, len(page_rects), RASTER_PAGES_PER_TASK)
+    ]
+    if len(batches) > 1 and RASTER_WORKERS > 1:
+        with ProcessPoolExecutor(max_workers=min(RASTER_WORKERS, len(batches))) as pool:
+            encoded_batches = list(pool.map(_encode_pages, [input_path] * len(batches), batches))
+    else:
+        encoded_batches = [_encode_pages(input_path, batch) for batch in batches]
+    pages = [candidates for batch in encoded_batches for candidates in batch]
+
+    budget = target_size_mb * 1024 * 1024 - RASTER_PAGE_OVERHEAD_BYTES * len(pages)
+    setting = RASTER_LADDER[-1]
+    for candidate in RASTER_LADDER:
+        if sum(len(page[candidate]) for page in pages) <= budget:
+            setting = candidate
+            break
+    print(f"🧮 Rasterizing {len(pages)} pages at {setting[0]:.0%}/q{setting[1]}")
+
+    compressed_doc = fitz.open()
+    try:
+        for rect, candidates in zip(page_rects, pages):
+            new_page = compressed_doc.new_page(width=rect.width, height=rect.height)
+            new_page.insert_image(new_page.rect, stream=candidates[setting])
+        compressed_doc.save(output_path, **SAVE_OPTIONS)
+    finally:
+        compressed_doc.close()
+    return output_path
+
+
+def compress_pdf(input_path: str, output_path: str, target_size_mb: float = 2.5) -> str:
+    """
+    Compress a PDF towards ``target_size_mb`` while keeping it readable.
+
+    Returns the path of the best result: ``output_path`` if compression made
+    the file smaller, otherwise ``input_path`` (also when it already fits).
+    """
+    original_mb = _size_mb(input_path)
+    if original_mb <= target_size_mb:
+        return input_path
+    best_mb = original_mb
+
+    def keep_if_smaller(candidate_path: str) -> bool:
+        """Move candidate to output_path if it beats the best so far; True once it fits."""
+        nonlocal best_mb
+        candidate_mb = _size_mb(candidate_path)
+        if candidate_mb < best_mb:
+            os.replace(candidate_path, output_path)
+            best_mb = candidate_mb
+        elif os.path.exists(candidate_path):
+            os.remove(candidate_path)
+        return best_mb <= target_size_mb
+
+    candidate_path = output_path + ".tmp.pdf"
+    try:
+        for max_dpi, quality in IMAGE_SETTINGS:
+            replaced = recompress_images(input_path, candidate_path, max_dpi, quality)
+            print(f"🖼️  Recompressed {replaced} images at {max_dpi}dpi/q{quality}: {_size_mb(candidate_path):.1f}MB")
+            if keep_if_smaller(candidate_path):
+                break
+        else:
+            # Text-preserving compression was not enough: rasterize as a last resort
+            print("🔄 Still too large, rasterizing pages...")
+            rasterize_pdf(input_path, candidate_path, target_size_mb)
+            keep_if_smaller(candidate_path)
+    except Exception as e:
+        print(f"❌ PDF compression failed: {e}")
+    finally:
+        if os.path.exists(candidate_path):
+            os.remove(candidate_path)
+
+    if best_mb < original_mb:
+        print(f"📦 PDF compressed: {original_mb:.1f}MB → {best_mb:.1f}MB ({best_mb / original_mb:.1%})")
+        return output_path
+    return input_path
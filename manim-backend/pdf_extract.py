@@ -0,0 +1,96 @@
+"""
+Structured text and figure extraction for config generation.
+
+Sending the whole PDF to Claude pays for every page, including references
+and appendices. ``extract_paper`` reads what the script writer actually
+needs -- title, abstract, section headings, body text, figure/table
+captions and a few figure crops -- from the shared paper model in
+``api/services/paper_model.py`` (parsed once per PDF content hash and
+cached on disk), and ``paper_content_blocks`` turns that into message
+content blocks to send instead of the document.
+"""
+
+import base64
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+import repo_path  # noqa: F401
+from api.services import paper_model
+
+# Figure crops sent along with the text
+MAX_FIGURES = 3
+FIGURE_DPI = 100
+
+# Extracted text shorter than this means a scanned PDF: send the document instead
+MIN_TEXT_CHARS = 1500
+
+
+def _figure_crops(pdf_bytes: bytes, figures: List[Dict]) -> List[Dict]:
+    """PNG crops of the largest figures listed in the paper model."""
+    largest = sorted(figures, key=lambda figure: -figure["area"])[:MAX_FIGURES]
+    crops = []
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for figure in largest:
+            pix = doc[figure["page"] - 1].get_pixmap(clip=fitz.Rect(figure["bbox"]), dpi=FIGURE_DPI)
+            crops.append({"page": figure["page"], "png": pix.tobytes("png")})
+    return sorted(crops, key=lambda crop: crop["page"])
+
+
+def extract_paper(pdf_path: Optional[str] = None, pdf_bytes: Optional[bytes] = None,
+                  include_figures: bool = True) -> Dict:
+    """
+    Extract the parts of a paper that matter for script writing.
+
+    Returns a dict with ``title``, ``abstract``, ``sections`` (list of
+    ``{"heading", "text"}``), ``captions``, ``figures`` (PNG crops),
+    ``pages`` (pages before the back matter), ``total_pages`` and the
+    full paper ``model``.
+    """
+    if pdf_bytes is None:
+        with open(pdf_path, "rb") as f:
+            pdf_bytes = f.read()
+    model = paper_model.get_paper_model(pdf_bytes)
+
+    return {
+        "title": model["title"],
+        "abstract": model["abstract"],
+        "sections": [
+            {"heading": section["heading"], "text": section["text"]}
+            for section in model["sections"] if not section["back_matter"]
+        ],
+        "captions": [caption["text"] for caption in model["captions"] if caption["page"] <= model["body_pages"]],
+        "figures": _figure_crops(pdf_bytes, model["figures"]) if include_figures else [],
+        "pages": model["body_pages"],
+        "total_pages": model["total_pages"],
+        "model": model,
+    }
+
+
+def paper_text(paper: Dict, max_chars: int = 60000) -> str:
+    """Render an extracted paper as compact markdown-like text."""
+    return paper_model.paper_text(paper["model"], max_chars)
+
+
+def paper_content_blocks(paper: Dict, max_chars: int = 60000) -> List[Dict]:
+    """Claude message content blocks (text + figure images) for an extracted paper."""
+    blocks = [{
+        "type": "text",
+        "text": "RESEARCH PAPER (extracted text, references and appendices omitted):\n\n"
+                + paper_text(paper, max_chars),
+    }]
+    for figure in paper["figures"]:
+        blocks.append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/png",
+                "data": base64.standard_b64encode(figure["png"]).decode("utf-8"),
+            },
+        })
+    return blocks
+
+
+def has_enough_text(paper: Dict) -> bool:
+    """False for scanned or image-only PDFs, which should be sent as documents."""
+    return sum(len(section["text"]) for section in paper["sections"]) >= MIN_TEXT_CHARS
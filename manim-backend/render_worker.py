@@ -0,0 +1,67 @@
+"""
+Standalone render worker.
+
+Leases video jobs from the shared render queue and runs them, so rendering
+capacity can be added without running more API servers:
+
+    RENDER_WORKERS=0 uvicorn server:app        # API only
+    python render_worker.py --workers 2         # on each render host
+
+Workers use the same ``JOB_STORE_URL``, ``JOB_QUEUE_URL`` and
+``JOB_WORKSPACE_ROOT`` as the API. Progress events go through the queue and
+are relayed by the API to its SSE subscribers.
+"""
+
+import argparse
+import asyncio
+import os
+
+# Set FFmpeg path for MoviePy before importing the pipeline
+os.environ['IMAGEIO_FFMPEG_EXE'] = '/opt/homebrew/bin/ffmpeg'
+
+import weave
+
+from job_queue import DEFAULT_LEASE_SECONDS, create_job_queue
+from job_runner import VideoJobRunner
+from job_store import create_job_store
+from worker_pool import RenderWorkerPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run render workers for the video generation API")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RENDER_WORKERS", "2")),
+                        help="Number of jobs rendered concurrently by this process")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="Lease length; expired leases are reclaimed by other workers")
+    args = parser.parse_args()
+
+    try:
+        weave.init("research-agent")
+        print("✅ W&B Weave tracking initialized for project: research-agent")
+    except Exception as e:
+        print(f"⚠️  W&B Weave not available: {e}")
+
+    job_store = create_job_store()
+    queue = create_job_queue()
+    runner = VideoJobRunner(job_store, queue.publish_event)
+    pool = RenderWorkerPool(
+        queue,
+        runner.run,
+        max_workers=args.workers,
+        max_queue_depth=int(os.getenv("RENDER_QUEUE_DEPTH", "20")),
+        lease_seconds=args.lease_seconds,
+        on_abandoned=runner.abandon,
+    )
+
+    print(f"🛠️  Render worker {pool.worker_prefix} waiting for jobs...")
+    try:
+        asyncio.run(pool.run_forever())
+    except KeyboardInterrupt:
+        print("👋 Render worker stopped; running jobs will be reclaimed when their leases expire")
+    finally:
+        queue.close()
+        job_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Makes the repository root importable, so the backend can share the PDF
+fetch cache and paper model in ../api with the Flask API:
+
+    import repo_path  # noqa: F401
+    from api.services.pdf_fetcher import fetch_pdf
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
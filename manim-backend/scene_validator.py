@@ -0,0 +1,164 @@
+"""
+Pre-render checks for generated Manim scenes.
+
+A real render is a Manim subprocess that can run for a long time before an
+LLM-written scene reaches its first bad call. ``validate_scene`` catches
+most broken scenes in milliseconds, in tiers:
+
+1. syntax: the code must parse;
+2. structure: a ``SimpleScene`` class with a ``construct`` method;
+3. disallowed constructs: imports outside ``ALLOWED_IMPORTS``, calls such
+   as ``eval``/``exec``/``open``, introspection attributes (``__globals__``,
+   ``__subclasses__``, ...) and ``while True``
+   loops without a ``break`` (this keeps scenes on-task; it is not a sandbox);
+4. names: everything the scene reads must be defined in the code, a
+   builtin, or exported by the installed manim (skipped when manim cannot
+   be imported here).
+
+``dry_run_scene`` is an optional last tier (``MANIM_DRY_RUN=1``): it runs
+the scene in Manim's last-frame mode at low quality, which executes
+``construct`` with animations skipped, so runtime errors surface before the
+full render.
+"""
+
+import ast
+import asyncio
+import builtins
+import functools
+import os
+from typing import List, Optional
+
+# Prepended to every scene before rendering
+SCENE_PRELUDE = "from manim import *\nimport numpy as np\n\n"
+
+SCENE_CLASS = "SimpleScene"
+
+ALLOWED_IMPORTS = {"manim", "numpy", "math", "random", "itertools", "functools", "colorsys", "typing"}
+DISALLOWED_CALLS = {"eval", "exec", "compile", "open", "__import__", "input", "breakpoint",
+                    "globals", "locals", "vars", "exit", "quit"}
+# Attributes that reach interpreter internals; other dunders (super().__init__, self.__class__, ...)
+# are fine, since walking from a class to everything else needs __bases__/__mro__/__subclasses__
+DISALLOWED_ATTRIBUTES = {"__bases__", "__base__", "__mro__", "__subclasses__", "__globals__",
+                         "__builtins__", "__dict__", "__code__", "__closure__", "__func__", "__self__",
+                         "__getattribute__", "__reduce__", "__reduce_ex__", "__loader__", "__spec__"}
+
+MANIM_DRY_RUN = os.getenv("MANIM_DRY_RUN", "false").lower() in ("1", "true", "yes")
+MANIM_DRY_RUN_TIMEOUT = float(os.getenv("MANIM_DRY_RUN_TIMEOUT", "60"))
+
+
+@functools.lru_cache(maxsize=1)
+def manim_names() -> Optional[frozenset]:
+    """Names ``from manim import *`` provides, or None if manim is not importable."""
+    try:
+        import manim
+    except Exception:
+        return None
+    return frozenset(getattr(manim, "__all__", None) or dir(manim))
+
+
+def _bound_names(tree: ast.AST) -> set:
+    """Every name the code binds anywhere (assignments, defs, args, imports, ...)."""
+    bound = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            bound.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+    return bound
+
+
+def _construct_problems(tree: ast.Module) -> List[str]:
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == SCENE_CLASS:
+            if any(isinstance(item, ast.FunctionDef) and item.name == "construct" for item in node.body):
+                return []
+            return [f"class {SCENE_CLASS} has no construct method"]
+    return [f"no top-level class {SCENE_CLASS}"]
+
+
+def _disallowed_constructs(tree: ast.AST) -> List[str]:
+    problems = []
+    for node in ast.walk(tree):
+        line = getattr(node, "lineno", "?")
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or "."]
+        else:
+            modules = []
+        for module in modules:
+            if module.split(".")[0] not in ALLOWED_IMPORTS:
+                problems.append(f"line {line}: import of {module} is not allowed")
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in DISALLOWED_CALLS:
+            problems.append(f"line {line}: call to {node.func.id}() is not allowed")
+        elif isinstance(node, ast.Attribute) and node.attr in DISALLOWED_ATTRIBUTES:
+            problems.append(f"line {line}: access to {node.attr} is not allowed")
+        elif (isinstance(node, ast.While) and isinstance(node.test, ast.Constant) and node.test.value
+              and not any(isinstance(child, ast.Break) for child in ast.walk(node))):
+            problems.append(f"line {line}: infinite while loop")
+    return problems
+
+
+def _undefined_names(tree: ast.AST) -> List[str]:
+    available = manim_names()
+    if available is None:
+        return []
+    known = _bound_names(tree) | _bound_names(ast.parse(SCENE_PRELUDE)) | set(dir(builtins)) | available
+    problems = []
+    seen = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in known and node.id not in seen:
+            seen.add(node.id)
+            problems.append(f"line {node.lineno}: name {node.id} is not defined in the scene or in manim")
+    return problems
+
+
+def validate_scene(code: str) -> List[str]:
+    """
+    Static checks of a scene's code (without SCENE_PRELUDE).
+
+    Returns the problems found, each prefixed with its line where there is
+    one; an empty list means the scene is worth rendering.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [f"line {e.lineno}: syntax error: {e.msg}"]
+    problems = _construct_problems(tree) + _disallowed_constructs(tree)
+    if problems:
+        return problems
+    return _undefined_names(tree)
+
+
+async def dry_run_scene(scene_file_path: str, media_dir: str, timeout: float = MANIM_DRY_RUN_TIMEOUT) -> Optional[str]:
+    """
+    Run the scene in last-frame mode at low quality.
+
+    Returns None if it ran cleanly, otherwise the error output.
+    """
+    process = await asyncio.create_subprocess_exec(
+        "manim", scene_file_path, SCENE_CLASS,
+        "-s", "-ql",
+        "--media_dir", os.path.join(media_dir, "dry_run"),
+        "-v", "WARNING",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return f"dry run timed out after {timeout:.0f}s"
+    if process.returncode != 0:
+        return (stderr.decode(errors="replace") or stdout.decode(errors="replace")).strip() or "dry run failed"
+    return None
@@ -1,21 +1,35 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Request, Query
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
+import base64
+import hashlib
 import json
 import os
 import uuid
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import asyncio
+from contextlib import aclosing
+import httpx
 import weave
-import fitz  # PyMuPDF for PDF compression
 
 # Set FFmpeg path for MoviePy before importing video_generator
 os.environ['IMAGEIO_FFMPEG_EXE'] = '/opt/homebrew/bin/ffmpeg'
 
 # Import our video generation pipeline
-from video_generator import generate_summary_video, generate_summary_video_upload
+from file_delivery import file_etag, ranged_file_response
+from batch_runner import BATCH_PRIORITY, MAX_BATCH_PAPERS, BatchRunner
+from job_runner import VideoJobRunner, job_payload
+from job_store import ACTIVE_STATUSES, ARTIFACT_FIELDS, BATCHED_STATUS, create_job_store, migrate_json_jobs
+from job_events import JobEventBus, TERMINAL_STAGES
+from job_queue import create_job_queue
+from upload_ingest import UploadLimitMiddleware, UploadTooLargeError, save_upload
+from worker_pool import RenderWorkerPool, QueueFullError
+from workspace import JobWorkspace, sweep_expired_workspaces
+import repo_path  # noqa: F401
+from api.services.llm_batch import create_message_batches
 
 # Initialize Weave for API tracking (with fallback)
 try:
@@ -34,18 +48,114 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Range", "Accept-Ranges"],
 )
 
-# JSON file to store job status
+# Paths whose responses must never be buffered for compression (binary video
+# downloads are already compressed and need byte-exact lengths)
+UNCOMPRESSED_PATH_PREFIXES = ("/download/",)
+
+# Suffixes for streaming endpoints that must be flushed event by event
+UNCOMPRESSED_PATH_SUFFIXES = ("/events",)
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip JSON/HTML responses while leaving binary downloads and event streams untouched"""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (
+            scope["path"].startswith(UNCOMPRESSED_PATH_PREFIXES)
+            or scope["path"].endswith(UNCOMPRESSED_PATH_SUFFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024)
+
+# Oversized uploads are refused before their body is read
+app.add_middleware(UploadLimitMiddleware, paths=["/generate-video-upload"])
+
+# Legacy JSON job file, imported into the job store on first start
 JOBS_FILE = "jobs.json"
 
+job_store = create_job_store()
+migrate_json_jobs(JOBS_FILE, job_store)
+
+# /jobs pagination limits
+JOB_LIST_DEFAULT_LIMIT = 50
+JOB_LIST_MAX_LIMIT = 200
+
+# Fan-out of per-job progress events for GET /jobs/{job_id}/events
+job_events = JobEventBus()
+
+# Seconds between keep-alive comments on idle event streams
+SSE_HEARTBEAT_SECONDS = 15
+
+job_runner = VideoJobRunner(job_store, job_events.publish)
+
+# Video jobs wait in a durable queue; submissions beyond the queue depth get a
+# 429. With RENDER_WORKERS=0 this process only serves the API and rendering
+# is left to render_worker.py processes sharing the queue.
+render_pool = RenderWorkerPool(
+    create_job_queue(),
+    job_runner.run,
+    max_workers=int(os.getenv("RENDER_WORKERS", "2")),
+    max_queue_depth=int(os.getenv("RENDER_QUEUE_DEPTH", "20")),
+    on_abandoned=job_runner.abandon,
+)
+
+# Reading-list batches: configs come from one Message Batch, renders run
+# behind interactive jobs
+batch_runner = BatchRunner(job_store, render_pool.queue, create_message_batches(), job_events.publish)
+
+# How often progress events from external render workers are relayed
+WORKER_EVENT_POLL_SECONDS = 0.5
+
+async def relay_worker_events():
+    """Forward progress events written by render_worker.py processes to SSE subscribers"""
+    queue = render_pool.queue
+    last_id = queue.last_event_id()
+    last_prune = 0.0
+    while True:
+        try:
+            for event in queue.read_events(last_id):
+                last_id = event["id"]
+                job_events.publish(event["job_id"], event["stage"], **event["data"])
+            if asyncio.get_running_loop().time() - last_prune > 600:
+                queue.prune_events()
+                sweep_workspaces()
+                last_prune = asyncio.get_running_loop().time()
+        except Exception as e:
+            print(f"⚠️  Could not relay worker events: {e}")
+        await asyncio.sleep(WORKER_EVENT_POLL_SECONDS)
+
+@app.on_event("startup")
+async def start_render_pool():
+    render_pool.start()
+    resume_interrupted_jobs()
+    sweep_workspaces()
+    app.state.event_relay = asyncio.create_task(relay_worker_events())
+    app.state.batch_loop = asyncio.create_task(batch_runner.run_forever())
+
+@app.on_event("shutdown")
+async def stop_render_pool():
+    app.state.event_relay.cancel()
+    app.state.batch_loop.cancel()
+    await render_pool.stop()
+    render_pool.queue.close()
+    job_store.close()
+
 class VideoRequest(BaseModel):
     pdf_url: str
     quality: str = "medium_quality"
 
+class BatchRequest(BaseModel):
+    pdf_urls: List[str]
+    prompt: str = ""
+    quality: str = "medium_quality"
+
 class JobStatus(BaseModel):
     job_id: str
-    status: str  # pending, processing, completed, failed
+    status: str  # batched, pending, compressing, processing, completed, failed
     created_at: str
     completed_at: Optional[str] = None
     error: Optional[str] = None
@@ -57,242 +167,161 @@ class JobStatus(BaseModel):
 class RenameVideoRequest(BaseModel):
     video_name: str
 
-def load_jobs() -> Dict[str, Dict]:
-    """Load jobs from JSON file"""
-    if os.path.exists(JOBS_FILE):
-        try:
-            with open(JOBS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+def encode_job_cursor(job: Dict) -> str:
+    """Encode the keyset position of a job as an opaque pagination cursor"""
+    raw = json.dumps([job["created_at"], job["job_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_job_cursor(cursor: str):
+    """Decode a cursor produced by encode_job_cursor into (created_at, job_id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), str(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def project_job(job: Dict, fields: Optional[List[str]]) -> Dict:
+    """Return only the requested fields of a job (job_id is always included)"""
+    if fields is None:
+        return job
+    return {key: job[key] for key in ["job_id", *fields] if key in job}
+
+def with_queue_position(job: Dict) -> Dict:
+    """Attach the live render queue position to a pending job record"""
+    if job.get("status") == "pending":
+        job["queue_position"] = render_pool.position(job["job_id"])
+    return job
+
+def queue_full_error(retry_after: int) -> HTTPException:
+    """429 response telling clients when to retry a rejected submission"""
+    return HTTPException(
+        status_code=429,
+        detail="Render queue is full, please retry later",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+def enqueue_video_job(job_id: str, pdf_source: str, prompt: str, is_upload: bool) -> int:
+    """Admit a job to the render pool and announce its queue position"""
+    position = render_pool.submit(job_id, job_payload(pdf_source, prompt, is_upload))
+    job_events.publish(job_id, "queued", queue_position=position)
+    return position
 
-def save_jobs(jobs: Dict[str, Dict]):
-    """Save jobs to JSON file"""
-    with open(JOBS_FILE, 'w') as f:
-        json.dump(jobs, f, indent=2)
-
-def update_job_status(job_id: str, status: str, **kwargs):
-    """Update job status in JSON file"""
-    jobs = load_jobs()
-    if job_id in jobs:
-        jobs[job_id]["status"] = status
-        if status == "completed":
-            jobs[job_id]["completed_at"] = datetime.now().isoformat()
-        for key, value in kwargs.items():
-            jobs[job_id][key] = value
-        save_jobs(jobs)
-
-def compress_pdf(input_path: str, output_path: str, target_size_mb: float = 2.5) -> str:
+def existing_job_payload(job: Dict) -> Dict:
+    """Queue payload for a stored job"""
+    pdf_source = job["pdf_source"]
+    is_upload = not pdf_source.startswith(('http://', 'https://'))
+    return job_payload(pdf_source, job.get("prompt", ""), is_upload, job.get("batch_config"))
+
+def job_priority(job: Dict) -> int:
+    """Render queue priority of a stored job: batch jobs wait behind interactive ones"""
+    return BATCH_PRIORITY if job.get("batch_id") else 0
+
+def enqueue_existing_job(job: Dict) -> int:
+    """Queue a stored job (loaded with its artifacts) again; its workspace checkpoints let it resume"""
+    position = render_pool.submit(job["job_id"], existing_job_payload(job), job_priority(job))
+    job_events.publish(job["job_id"], "queued", queue_position=position)
+    return position
+
+def resume_interrupted_jobs():
     """
-    Compress PDF to reduce file size while maintaining readability.
-    Returns the output path of the compressed PDF.
+    Make sure every active job is in the render queue.
+
+    Jobs admitted before a restart are normally still queued (or leased by a
+    live worker, in which case enqueueing is a no-op); this re-adds jobs from
+    an older server or an in-memory queue, bypassing the depth limit since
+    they were already admitted.
     """
-    try:
-        # Open the original PDF
-        doc = fitz.open(input_path)
-        
-        # Create a new PDF with compression settings
-        compressed_doc = fitz.open()  # New empty document
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Reduce image quality and resolution for compression
-            # Get page as pixmap with lower resolution
-            mat = fitz.Matrix(0.8, 0.8)  # 80% scale to reduce size
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            
-            # Convert to image bytes with compression
-            img_data = pix.tobytes("jpeg", jpg_quality=75)  # 75% JPEG quality
-            
-            # Create new page and insert compressed image
-            new_page = compressed_doc.new_page(width=page.rect.width, height=page.rect.height)
-            new_page.insert_image(new_page.rect, stream=img_data)
-        
-        # Save with additional compression options
-        compressed_doc.save(
-            output_path,
-            garbage=4,  # Garbage collection level (max compression)
-            deflate=True,  # Use deflate compression
-            clean=True,    # Clean unused objects
-            linear=True    # Linearize for web optimization
-        )
-        
-        # Clean up
-        doc.close()
-        compressed_doc.close()
-        pix = None
-        
-        # Check if compression was successful
-        if os.path.exists(output_path):
-            original_size = os.path.getsize(input_path)
-            compressed_size = os.path.getsize(output_path)
-            compression_ratio = compressed_size / original_size
-            
-            print(f"📦 PDF compressed: {original_size/1024/1024:.1f}MB → {compressed_size/1024/1024:.1f}MB ({compression_ratio:.1%})")
-            
-            # If still too large, try more aggressive compression
-            if compressed_size > target_size_mb * 1024 * 1024:
-                print(f"🔄 File still too large, trying aggressive compression...")
-                return compress_pdf_aggressive(input_path, output_path, target_size_mb)
-            
-            return output_path
-        else:
-            raise Exception("Compression failed - output file not created")
-            
-    except Exception as e:
-        print(f"❌ PDF compression failed: {e}")
-        # Return original file if compression fails
-        return input_path
+    queue = render_pool.queue
+    for job in reversed(job_store.list_jobs(statuses=list(ACTIVE_STATUSES), include_artifacts=True)):
+        queue.enqueue(job["job_id"], existing_job_payload(job), job_priority(job))
+        if job["status"] != "pending" and queue.position(job["job_id"]) is not None:
+            job_store.update_job(job["job_id"], status="pending")
+            print(f"♻️  Resuming interrupted job {job['job_id']}")
 
-def compress_pdf_aggressive(input_path: str, output_path: str, target_size_mb: float = 2.5) -> str:
+def sweep_workspaces():
     """
-    More aggressive PDF compression by converting to lower resolution images.
+    Delete expired job workspaces. Failed jobs keep theirs for retries until
+    the TTL runs out; jobs that may still run keep theirs regardless of age.
     """
+    statuses = list(ACTIVE_STATUSES) + [BATCHED_STATUS]
+    keep = {job["job_id"] for job in job_store.list_jobs(statuses=statuses)}
+    for job_id in sweep_expired_workspaces(keep=keep):
+        print(f"🧹 Removed expired workspace of job {job_id}")
+
+def make_content_key(*parts) -> str:
+    """Stable key identifying the inputs of a video job"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+async def fetch_url_validators(url: str) -> Dict[str, str]:
+    """HEAD a PDF URL and return its cache validators (ETag, Last-Modified, Content-Length)"""
     try:
-        doc = fitz.open(input_path)
-        compressed_doc = fitz.open()
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Very aggressive scaling and quality reduction
-            mat = fitz.Matrix(0.6, 0.6)  # 60% scale
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            
-            # Lower JPEG quality for maximum compression
-            img_data = pix.tobytes("jpeg", jpg_quality=50)  # 50% JPEG quality
-            
-            new_page = compressed_doc.new_page(width=page.rect.width, height=page.rect.height)
-            new_page.insert_image(new_page.rect, stream=img_data)
-        
-        # Save with maximum compression
-        compressed_doc.save(
-            output_path,
-            garbage=4,
-            deflate=True,
-            clean=True,
-            linear=True
-        )
-        
-        doc.close()
-        compressed_doc.close()
-        pix = None
-        
-        if os.path.exists(output_path):
-            compressed_size = os.path.getsize(output_path)
-            print(f"📦 Aggressive compression: {compressed_size/1024/1024:.1f}MB")
-            return output_path
-        else:
-            return input_path
-            
-    except Exception as e:
-        print(f"❌ Aggressive compression failed: {e}")
-        return input_path
+        async with httpx.AsyncClient(follow_redirects=True, timeout=10) as client:
+            response = await client.head(url)
+        if response.status_code < 400:
+            return {
+                name: response.headers[name]
+                for name in ("etag", "last-modified", "content-length")
+                if name in response.headers
+            }
+    except httpx.HTTPError as e:
+        print(f"⚠️  Could not fetch validators for {url}: {e}")
+    return {}
 
-@weave.op()
-async def process_video_generation(job_id: str, pdf_source: str, prompt: str = "", is_upload: bool = False):
-    """Background task to generate video with Weave tracking"""
+def existing_job_response(job: Dict) -> Dict:
+    """Response for a submission that was matched to an existing job"""
+    response = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "deduplicated": True,
+        "message": "Matched an existing video job"
+    }
+    if job["status"] == "completed":
+        response["video_url"] = f"/download/{job['job_id']}"
+    elif job["status"] == "pending":
+        response["queue_position"] = render_pool.position(job["job_id"])
+    return response
+
+def format_sse(event: Dict, include_id: bool = True) -> str:
+    """Serialize an event as a Server-Sent Events message"""
+    lines = []
+    if include_id and "id" in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['stage']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return "\n".join(lines) + "\n\n"
+
+def sse_response(key: str, snapshot: Dict, status: str, request: Request) -> StreamingResponse:
+    """
+    Event stream of a job or batch: the snapshot, then buffered events newer
+    than the Last-Event-ID header, then live events until a terminal stage.
+    """
     try:
-        update_job_status(job_id, "processing")
-        print(f"Job {job_id}: Starting video generation...")
-        
-        # Use our existing video generation pipeline
-        if is_upload:
-            # For uploaded files, we need to use base64 encoding
-            result = await generate_summary_video_upload(pdf_source, prompt)
-        else:
-            # For URLs, pass directly
-            result = await generate_summary_video(pdf_source, prompt)
-        
-        # Move video to outputs directory with job ID
-        os.makedirs("outputs", exist_ok=True)
-        original_path = result["video_path"]
-        final_path = f"outputs/video_{job_id}.mp4"
-        
-        # Enhanced file move with audio stream verification
-        if os.path.exists(original_path):
-            print(f"🔄 Moving video with audio verification...")
-            print(f"📁 Source: {original_path} ({os.path.getsize(original_path)} bytes)")
-            
-            # First, verify the original file has audio
-            try:
-                import subprocess
-                cmd = ["ffprobe", "-v", "quiet", "-show_streams", "-select_streams", "a", original_path]
-                audio_check = subprocess.run(cmd, capture_output=True, text=True)
-                original_has_audio = bool(audio_check.stdout.strip())
-                print(f"🔊 Original file has audio: {original_has_audio}")
-            except Exception as e:
-                print(f"⚠️  Could not check original audio: {e}")
-                original_has_audio = None
-            
-            # Use FFmpeg to copy the file to preserve all streams perfectly
-            try:
-                # Use FFmpeg copy to preserve all streams and metadata
-                ffmpeg_cmd = [
-                    "ffmpeg", "-y",  # -y to overwrite existing files
-                    "-i", original_path,  # input file
-                    "-c", "copy",  # copy all streams without re-encoding
-                    "-map", "0",  # map all streams from input
-                    final_path  # output file
-                ]
-                print(f"🎬 Using FFmpeg to preserve all streams: {' '.join(ffmpeg_cmd)}")
-                ffmpeg_result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
-                
-                if ffmpeg_result.returncode == 0:
-                    print(f"✅ FFmpeg copy successful")
-                    # Remove original after successful copy
-                    os.remove(original_path)
-                    
-                    # Verify the copied file
-                    if os.path.exists(final_path):
-                        final_size = os.path.getsize(final_path)
-                        print(f"📁 Final file: {final_path} ({final_size} bytes)")
-                        
-                        # Verify audio streams in final file
-                        try:
-                            cmd = ["ffprobe", "-v", "quiet", "-show_streams", "-select_streams", "a", final_path]
-                            final_audio_check = subprocess.run(cmd, capture_output=True, text=True)
-                            final_has_audio = bool(final_audio_check.stdout.strip())
-                            print(f"🔊 Final file has audio: {final_has_audio}")
-                            
-                            if original_has_audio and not final_has_audio:
-                                print(f"🚨 WARNING: Audio lost during file copy!")
-                            elif final_has_audio:
-                                print(f"✅ Audio successfully preserved in final file")
-                        except Exception as e:
-                            print(f"⚠️  Could not verify final audio: {e}")
-                    else:
-                        raise Exception("FFmpeg copy failed - output file not created")
-                else:
-                    raise Exception(f"FFmpeg failed: {ffmpeg_result.stderr}")
-                    
-            except Exception as ffmpeg_error:
-                print(f"⚠️  FFmpeg copy failed: {ffmpeg_error}")
-                print(f"🔄 Falling back to shutil.move()...")
-                
-                # Fallback to shutil.move which should preserve the file exactly
-                import shutil
-                shutil.move(original_path, final_path)
-                print(f"📁 Fallback move completed")
-            
-            result["video_path"] = final_path
-            print(f"✅ Video successfully moved to: {final_path}")
-        
-        # Update job as completed with full metrics
-        update_job_status(
-            job_id, 
-            "completed", 
-            video_path=final_path,
-            generation_metrics=result
-        )
-        print(f"Job {job_id}: Completed successfully!")
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"Job {job_id}: Failed with error: {error_msg}")
-        update_job_status(job_id, "failed", error=error_msg)
+        last_event_id = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_event_id = 0
+
+    async def event_stream():
+        yield format_sse(snapshot, include_id=False)
+        if status in TERMINAL_STAGES:
+            return
+        events = job_events.subscribe(key, last_event_id, heartbeat=SSE_HEARTBEAT_SECONDS)
+        async with aclosing(events):
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["stage"] in TERMINAL_STAGES:
+                    break
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/", response_class=HTMLResponse)
 async def serve_frontend():
@@ -354,6 +383,7 @@ async def serve_frontend():
             }
             .status.pending { background: #ffeaa7; color: #fdcb6e; }
             .status.processing { background: #74b9ff; color: white; }
+            .status.compressing { background: #a29bfe; color: white; }
             .status.completed { background: #00b894; color: white; }
             .status.failed { background: #e17055; color: white; }
             .progress-bar { 
@@ -414,6 +444,8 @@ async def serve_frontend():
         <script>
             let jobs = {};
             let pollInterval;
+            let jobsEtag = null;
+            let jobStreams = {};
 
             // Drag and drop functionality
             const uploadArea = document.querySelector('.upload-area');
@@ -497,8 +529,9 @@ async def serve_frontend():
                             <p>Or drag and drop a PDF file here</p>
                         `;
                         
-                        // Start polling for this job
-                        startPolling();
+                        // Follow this job's progress events
+                        await refreshJobs();
+                        subscribeToJob(result.job_id);
                         
                         alert(`Video generation started! Job ID: ${result.job_id}`);
                     } else {
@@ -515,17 +548,79 @@ async def serve_frontend():
             function startPolling() {
                 if (pollInterval) clearInterval(pollInterval);
                 
-                pollInterval = setInterval(async () => {
-                    try {
-                        const response = await fetch('/jobs');
-                        const data = await response.json();
-                        jobs = {};
-                        data.jobs.forEach(job => jobs[job.job_id] = job);
-                        updateJobsDisplay();
-                    } catch (error) {
-                        console.error('Error polling jobs:', error);
+                // Progress arrives over per-job event streams; the listing is only
+                // refreshed occasionally as a fallback.
+                refreshJobs();
+                pollInterval = setInterval(refreshJobs, 30000);
+            }
+            
+            async function refreshJobs() {
+                try {
+                    const response = await fetch('/jobs?limit=50', {
+                        headers: jobsEtag ? { 'If-None-Match': jobsEtag } : {}
+                    });
+                    if (response.status === 304) return;
+                    jobsEtag = response.headers.get('ETag');
+                    const data = await response.json();
+                    jobs = {};
+                    data.jobs.forEach(job => jobs[job.job_id] = job);
+                    Object.values(jobs).forEach(job => {
+                        if (['pending', 'compressing', 'processing'].includes(job.status)) subscribeToJob(job.job_id);
+                    });
+                    updateJobsDisplay();
+                } catch (error) {
+                    console.error('Error polling jobs:', error);
+                }
+            }
+            
+            function subscribeToJob(jobId) {
+                if (jobStreams[jobId]) return;
+                const source = new EventSource(`/jobs/${jobId}/events`);
+                jobStreams[jobId] = source;
+                
+                const handle = (event) => {
+                    const data = JSON.parse(event.data);
+                    if (!jobs[jobId]) return;
+                    if (data.stage === 'snapshot') {
+                        jobs[jobId] = { ...jobs[jobId], ...data.job };
+                    } else {
+                        jobs[jobId].stage = data.stage;
+                        jobs[jobId].stageDetail = data;
+                        if (data.stage === 'processing' || data.stage === 'compressing') jobs[jobId].status = data.stage;
+                        if (data.stage === 'queued') jobs[jobId].queue_position = data.queue_position;
                     }
-                }, 2000);
+                    if (data.stage === 'completed' || data.stage === 'failed' ||
+                        (data.stage === 'snapshot' && (data.job.status === 'completed' || data.job.status === 'failed'))) {
+                        source.close();
+                        delete jobStreams[jobId];
+                        refreshJobs();
+                    }
+                    updateJobsDisplay();
+                };
+                ['snapshot', 'queued', 'compressing', 'compressed', 'processing', 'config_generating', 'config_generated', 'clip_rendering',
+                 'clip_rendered', 'clip_repairing', 'clip_failed', 'voice_ready', 'voice_failed', 'clip_muxed',
+                 'stitching', 'stitched', 'completed', 'failed'].forEach(stage => source.addEventListener(stage, handle));
+            }
+            
+            function describeStage(job) {
+                const d = job.stageDetail || {};
+                const clip = d.clip_index !== undefined ? ` ${d.clip_index + 1}/${d.total_clips}` : '';
+                switch (job.stage) {
+                    case 'compressing': return `🗜️ Compressing PDF (${d.size_mb}MB)...`;
+                    case 'compressed': return `🗜️ PDF compressed to ${d.compressed_mb}MB in ${d.seconds}s`;
+                    case 'config_generating': return '🧠 Writing the video script...';
+                    case 'config_generated': return `📝 Script ready (${d.total_clips} clips)`;
+                    case 'clip_rendering': return `🎬 Rendering clip${clip}...`;
+                    case 'clip_rendered': return `✅ Rendered clip${clip}`;
+                    case 'clip_repairing': return `🩹 Fixing clip${clip} (attempt ${d.attempt})...`;
+                    case 'clip_failed': return `⚠️ Clip${clip} failed to render`;
+                    case 'voice_ready': return `🎤 Voice-over ready for clip${clip}`;
+                    case 'voice_failed': return `🔇 Voice-over failed for clip${clip}`;
+                    case 'clip_muxed': return `🔗 Clip${clip} combined with audio`;
+                    case 'stitching': return '🧵 Stitching the final video...';
+                    case 'stitched': return '📦 Finalizing video...';
+                    default: return '⏳ Generating video clips and voice-over...';
+                }
             }
             
             function updateJobsDisplay() {
@@ -551,11 +646,15 @@ async def serve_frontend():
                             </div>
                         </div>
                         
-                        ${job.status === 'processing' ? `
+                        ${job.status === 'pending' && job.queue_position ? `
+                            <p>🕒 Queued (position ${job.queue_position})</p>
+                        ` : ''}
+                        
+                        ${job.status === 'processing' || job.status === 'compressing' ? `
                             <div class="progress-bar">
                                 <div class="progress-fill" style="width: 50%"></div>
                             </div>
-                            <p>⏳ Generating video clips and voice-over...</p>
+                            <p>${describeStage(job)}</p>
                         ` : ''}
                         
                         ${job.status === 'completed' ? `
@@ -565,18 +664,18 @@ async def serve_frontend():
                                     Your browser does not support the video tag.
                                 </video>
                                 <div class="metrics">
-                                    ${job.generation_metrics ? `
+                                    ${job.metrics_summary ? `
                                         <div class="metric">
                                             <strong>Success Rate:</strong> 
-                                            ${(job.generation_metrics.success_rate * 100).toFixed(1)}%
+                                            ${(job.metrics_summary.success_rate * 100).toFixed(1)}%
                                         </div>
                                         <div class="metric">
                                             <strong>Total Clips:</strong> 
-                                            ${job.generation_metrics.total_clips}
+                                            ${job.metrics_summary.total_clips}
                                         </div>
                                         <div class="metric">
                                             <strong>Successful:</strong> 
-                                            ${job.generation_metrics.successful_clips}
+                                            ${job.metrics_summary.successful_clips}
                                         </div>
                                     ` : ''}
                                 </div>
@@ -595,7 +694,7 @@ async def serve_frontend():
                 window.open(`/download/${jobId}`, '_blank');
             }
             
-            // Start polling on page load
+            // Load jobs and subscribe to active ones on page load
             startPolling();
         </script>
     </body>
@@ -605,17 +704,28 @@ async def serve_frontend():
 
 @app.post("/generate-video-upload")
 async def generate_video_upload(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    prompt: str = Form("Generate a video explaining the key concepts from this research paper")
+    prompt: str = Form("Generate a video explaining the key concepts from this research paper"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Upload PDF and start video generation"""
+    """
+    Upload PDF and start video generation.
+
+    Identical uploads (same PDF bytes and prompt) are matched to an existing
+    completed or in-flight job instead of running the pipeline again.
+    """
     
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
-    # Read file content to check size
-    content = await file.read()
+    if idempotency_key:
+        existing = job_store.find_by_idempotency_key(idempotency_key)
+        if existing:
+            return existing_job_response(existing)
+    
+    # Reject early instead of storing an upload we cannot schedule
+    if render_pool.is_full():
+        raise queue_full_error(render_pool.retry_after())
     
     # Create uploads directory
     os.makedirs("uploads", exist_ok=True)
@@ -624,93 +734,66 @@ async def generate_video_upload(
     file_id = str(uuid.uuid4())
     original_file_path = f"uploads/{file_id}_{file.filename}"
     
-    # Save uploaded file
-    with open(original_file_path, "wb") as f:
-        f.write(content)
-    
-    # Check file size and compress if necessary
-    file_size_mb = len(content) / (1024 * 1024)
-    print(f"📄 Uploaded PDF: {file.filename} ({file_size_mb:.1f}MB)")
-    
-    final_file_path = original_file_path
+    # Copy the upload to disk in chunks, hashing and size-checking it on the way
+    try:
+        file_size, pdf_hash = await save_upload(file, original_file_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    if file_size_mb > 2.5:  # Compress if larger than 2.5MB
-        print(f"🔄 File is {file_size_mb:.1f}MB, compressing to reduce API load...")
-        compressed_file_path = f"uploads/{file_id}_compressed_{file.filename}"
-        
-        try:
-            final_file_path = compress_pdf(original_file_path, compressed_file_path, target_size_mb=2.5)
-            
-            # Check final size
-            if os.path.exists(final_file_path):
-                final_size = os.path.getsize(final_file_path) / (1024 * 1024)
-                
-                # If compression was successful and file is smaller
-                if final_file_path != original_file_path and final_size < file_size_mb:
-                    print(f"✅ Using compressed version: {final_size:.1f}MB")
-                    # Remove original large file to save space
-                    if os.path.exists(original_file_path):
-                        os.remove(original_file_path)
-                else:
-                    print(f"⚠️  Compression didn't help much, using original")
-                    final_file_path = original_file_path
-                    # Remove failed compression attempt
-                    if os.path.exists(compressed_file_path):
-                        os.remove(compressed_file_path)
-                
-                # Final check - if still too large for Claude API
-                if final_size > 5.0:  # 5MB absolute limit for Claude
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"PDF is too large even after compression ({final_size:.1f}MB). Please try a smaller file or use a URL instead."
-                    )
-            else:
-                print(f"⚠️  Compression failed, using original file")
-                final_file_path = original_file_path
-                
-        except Exception as e:
-            print(f"⚠️  Compression error: {e}, using original file")
-            final_file_path = original_file_path
-            # Remove failed compression attempt
-            compressed_file_path_check = f"uploads/{file_id}_compressed_{file.filename}"
-            if os.path.exists(compressed_file_path_check):
-                os.remove(compressed_file_path_check)
+    file_size_mb = file_size / (1024 * 1024)
+    print(f"📄 Uploaded PDF: {file.filename} ({file_size_mb:.1f}MB, sha256 {pdf_hash[:12]})")
     
     # Generate job ID
     job_id = str(uuid.uuid4())
     
-    # Create job record
+    # Create the job record unless the same PDF + prompt is already done or running
     job_data = {
         "job_id": job_id,
         "status": "pending",
         "created_at": datetime.now().isoformat(),
-        "pdf_source": final_file_path,
+        "pdf_source": original_file_path,
         "original_filename": file.filename,
-        "video_name": None
+        "prompt": prompt,
+        "video_name": None,
+        "content_key": make_content_key("upload", pdf_hash, prompt),
+        "idempotency_key": idempotency_key
     }
     
-    jobs = load_jobs()
-    jobs[job_id] = job_data
-    save_jobs(jobs)
-    
-    # Start background task
-    background_tasks.add_task(
-        process_video_generation,
-        job_id,
-        final_file_path,
-        prompt, # Pass prompt
-        True  # is_upload = True
-    )
+    job, created = job_store.claim_job(job_data)
+    if not created:
+        print(f"♻️  Upload matches job {job['job_id']} ({job['status']}), skipping generation")
+        os.remove(original_file_path)
+        return existing_job_response(job)
+    
+    # Queue the job on the render pool; large PDFs are compressed there
+    try:
+        position = enqueue_video_job(job_id, original_file_path, prompt, is_upload=True)
+    except QueueFullError as e:
+        job_store.delete_job(job_id)
+        if os.path.exists(original_file_path):
+            os.remove(original_file_path)
+        raise queue_full_error(e.retry_after)
     
     return {
         "job_id": job_id, 
         "status": "pending", 
-        "message": "PDF uploaded, video generation started"
+        "queue_position": position,
+        "message": "PDF uploaded, video generation queued"
     }
 
 @app.post("/generate-video-url")
-async def generate_video_url(request: VideoRequest, background_tasks: BackgroundTasks):
-    """Start video generation with PDF URL"""
+async def generate_video_url(
+    request: VideoRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Start video generation with PDF URL.
+
+    The URL plus its ETag/Last-Modified validators identify the content: a
+    match against a completed job returns that video, a match against a
+    running job attaches to it. Without validators only in-flight jobs are
+    reused, since the document behind the URL may have changed.
+    """
     
     if not request.pdf_url:
         raise HTTPException(status_code=400, detail="PDF URL is required")
@@ -718,6 +801,16 @@ async def generate_video_url(request: VideoRequest, background_tasks: Background
     if not request.pdf_url.startswith(('http://', 'https://')):
         raise HTTPException(status_code=400, detail="Please provide a valid URL")
     
+    if idempotency_key:
+        existing = job_store.find_by_idempotency_key(idempotency_key)
+        if existing:
+            return existing_job_response(existing)
+    
+    if render_pool.is_full():
+        raise queue_full_error(render_pool.retry_after())
+    
+    validators = await fetch_url_validators(request.pdf_url)
+    
     # Generate job ID
     job_id = str(uuid.uuid4())
     
@@ -728,47 +821,210 @@ async def generate_video_url(request: VideoRequest, background_tasks: Background
         "created_at": datetime.now().isoformat(),
         "pdf_source": request.pdf_url,
         "quality": request.quality,
-        "video_name": None
+        "prompt": "",
+        "video_name": None,
+        "content_key": make_content_key("url", request.pdf_url, validators, ""),
+        "idempotency_key": idempotency_key
     }
     
-    jobs = load_jobs()
-    jobs[job_id] = job_data
-    save_jobs(jobs)
-    
-    # Start background task
-    background_tasks.add_task(
-        process_video_generation,
-        job_id,
-        request.pdf_url,
-        "", # No prompt for URL generation
-        False  # is_upload = False
-    )
+    job, created = job_store.claim_job(job_data, reuse_completed=bool(validators))
+    if not created:
+        print(f"♻️  URL matches job {job['job_id']} ({job['status']}), skipping generation")
+        return existing_job_response(job)
+    
+    # Queue the job on the render pool (no prompt for URL generation). The
+    # queue can fill up while the validators are fetched; never leave a
+    # claimed job behind that will not run
+    try:
+        position = enqueue_video_job(job_id, request.pdf_url, "", is_upload=False)
+    except QueueFullError as e:
+        job_store.delete_job(job_id)
+        raise queue_full_error(e.retry_after)
     
-    return {"job_id": job_id, "status": "pending", "message": "Video generation started"}
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "queue_position": position,
+        "message": "Video generation queued"
+    }
+
+@app.post("/generate-video-batch")
+async def generate_video_batch(request: BatchRequest):
+    """
+    Generate videos for a whole reading list.
+
+    The video configs of all papers are requested as one Message Batch
+    (cheaper, but it may take hours), then the papers are rendered behind
+    interactive jobs. Nothing here counts against the render queue depth;
+    follow the batch with GET /batches/{batch_id} or its events stream.
+    """
+    pdf_urls = list(dict.fromkeys(url.strip() for url in request.pdf_urls if url.strip()))
+    if not pdf_urls:
+        raise HTTPException(status_code=400, detail="At least one PDF URL is required")
+    if len(pdf_urls) > MAX_BATCH_PAPERS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {MAX_BATCH_PAPERS} PDFs")
+    invalid = [url for url in pdf_urls if not url.startswith(('http://', 'https://'))]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Please provide valid URLs (got {invalid[0]})")
+
+    batch_id = str(uuid.uuid4())
+    created_at = datetime.now().isoformat()
+    jobs = [
+        {
+            "job_id": str(uuid.uuid4()),
+            "created_at": created_at,
+            "pdf_source": url,
+            "quality": request.quality,
+            "prompt": request.prompt,
+            "video_name": None,
+        }
+        for url in pdf_urls
+    ]
+    batch = batch_runner.create_batch(batch_id, jobs, request.prompt)
+
+    return {
+        "batch_id": batch_id,
+        "status": batch["status"],
+        "job_ids": batch["job_ids"],
+        "message": f"Batch of {len(jobs)} videos queued"
+    }
+
+@app.get("/batches/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Get batch status with the number of its jobs in each stage"""
+    batch = job_store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    batch["progress"] = batch_runner.progress(batch_id)
+    return batch
+
+@app.get("/batches/{batch_id}/events")
+async def stream_batch_events(batch_id: str, request: Request):
+    """Stream batch_progress events as Server-Sent Events, until the batch completes"""
+    batch = job_store.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    batch["progress"] = batch_runner.progress(batch_id)
+    return sse_response(batch_id, {"stage": "snapshot", "batch": batch}, batch["status"], request)
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Re-run a failed job, reusing every stage it already completed"""
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "failed":
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be retried (job is {job['status']})")
+    
+    job_store.update_job(job_id, status="pending", error=None)
+    try:
+        position = enqueue_existing_job(job)
+    except QueueFullError as e:
+        job_store.update_job(job_id, status="failed", error=job.get("error"))
+        raise queue_full_error(e.retry_after)
+    
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "queue_position": position,
+        "message": "Job queued for retry"
+    }
 
 @app.get("/jobs/{job_id}")
 async def get_job_status(job_id: str):
     """Get job status"""
-    jobs = load_jobs()
-    if job_id not in jobs:
+    job = job_store.get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return jobs[job_id]
+    return with_queue_position(job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Stream a job's progress as Server-Sent Events.
+
+    The stream opens with a "snapshot" event holding the current job record,
+    replays buffered events newer than the Last-Event-ID header, then pushes
+    live stage events until the job completes or fails.
+    """
+    job = job_store.get_job(job_id, include_artifacts=False)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return sse_response(job_id, {"stage": "snapshot", "job": job}, job["status"], request)
 
 @app.get("/jobs")
-async def list_jobs():
-    """List all jobs"""
-    jobs = load_jobs()
-    return {"jobs": list(jobs.values())}
+async def list_jobs(
+    request: Request,
+    limit: int = Query(JOB_LIST_DEFAULT_LIMIT, ge=1, le=JOB_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """
+    List jobs, newest first, one page at a time.
+
+    - status: comma-separated status filter (e.g. "pending,processing")
+    - fields: comma-separated projection, or "*" for everything including
+      generation_metrics (omitted by default)
+    - cursor: next_cursor value from the previous page
+
+    Responses carry an ETag derived from the job store revision and the
+    render queue order (pending jobs carry their live queue_position), so
+    clients sending If-None-Match get a 304 without the listing being rebuilt.
+    """
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+    if fields == "*":
+        field_list = None
+        include_artifacts = True
+    elif fields:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()]
+        include_artifacts = any(f in ARTIFACT_FIELDS for f in field_list)
+    else:
+        field_list = None
+        include_artifacts = False
+
+    query_key = json.dumps([limit, cursor, statuses, fields, render_pool.queue.waiting()])
+    etag = f'W/"{job_store.revision()}-{hashlib.sha1(query_key.encode()).hexdigest()[:12]}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cache_headers)
+
+    before = decode_job_cursor(cursor) if cursor else None
+    jobs = job_store.list_jobs(
+        statuses=statuses,
+        limit=limit + 1,
+        before=before,
+        include_artifacts=include_artifacts
+    )
+
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = encode_job_cursor(jobs[-1])
+
+    return JSONResponse(
+        {"jobs": [project_job(with_queue_position(job), field_list) for job in jobs], "next_cursor": next_cursor},
+        headers=cache_headers
+    )
 
 @app.get("/download/{job_id}")
-async def download_video(job_id: str):
-    """Download generated video"""
-    jobs = load_jobs()
-    if job_id not in jobs:
+async def download_video(job_id: str, request: Request):
+    """
+    Download generated video.
+
+    Supports Range requests for seeking and is cacheable forever: the file
+    behind a job's download URL never changes.
+    """
+    job = job_store.get_job(job_id, include_artifacts=False)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Video not ready yet")
     
@@ -776,46 +1032,50 @@ async def download_video(job_id: str):
     if not video_path or not os.path.exists(video_path):
         raise HTTPException(status_code=404, detail="Video file not found")
     
-    return FileResponse(
+    etag = job.get("video_etag")
+    if not etag:
+        # Jobs completed before ETags were recorded
+        etag = await asyncio.to_thread(file_etag, video_path)
+        job_store.update_job(job_id, video_etag=etag)
+    
+    return ranged_file_response(
+        request,
         video_path,
         media_type='video/mp4',
+        etag=etag,
         filename=f"video_{job_id}.mp4"
     )
 
 @app.put("/jobs/{job_id}/rename")
 async def rename_video(job_id: str, request: RenameVideoRequest):
     """Rename a video"""
-    jobs = load_jobs()
-    if job_id not in jobs:
+    if not job_store.update_job(job_id, video_name=request.video_name):
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Update video name
-    jobs[job_id]["video_name"] = request.video_name
-    save_jobs(jobs)
-    
     return {"message": "Video renamed successfully", "video_name": request.video_name}
 
 @app.delete("/jobs/{job_id}")
 async def delete_job(job_id: str):
     """Delete job and associated files"""
-    jobs = load_jobs()
-    if job_id not in jobs:
+    job = job_store.delete_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
+    # Drop it from the render queue if it has not started yet
+    render_pool.cancel(job_id)
     
+
     # Delete video file if it exists
     if job.get("video_path") and os.path.exists(job["video_path"]):
         os.remove(job["video_path"])
     
+    # Drop checkpoints kept for retries
+    JobWorkspace(job_id).cleanup()
+    
     # Delete uploaded PDF if it exists
     if job.get("pdf_source") and job["pdf_source"].startswith("uploads/") and os.path.exists(job["pdf_source"]):
         os.remove(job["pdf_source"])
     
-    # Remove from jobs
-    del jobs[job_id]
-    save_jobs(jobs)
-    
     return {"message": "Job deleted successfully"}
 
 @app.get("/api-info")
@@ -825,21 +1085,31 @@ async def api_info():
         "message": "Manim Video Generation API with W&B Weave Tracking",
         "features": [
             "PDF upload or URL input",
-            "Background video generation",
+            "Deduplication of identical submissions (Idempotency-Key supported)",
+            "Durable render queue with leased workers (in-process or render_worker.py)",
             "Real-time job tracking",
+            "Resumable jobs with per-stage checkpoints",
+            "Server-sent progress events",
+            "Reading-list batches (Message Batches API, rendered at low priority)",
             "W&B Weave integration",
-            "Video download and streaming"
+            "Video download and streaming (Range requests, immutable caching)"
         ],
         "endpoints": {
             "GET /": "Frontend interface",
             "POST /generate-video-upload": "Upload PDF and start generation",
             "POST /generate-video-url": "Start generation with PDF URL",
-            "GET /jobs": "List all jobs",
+            "POST /generate-video-batch": "Generate videos for a list of PDF URLs at batch pricing",
+            "GET /batches/{batch_id}": "Get batch status and per-stage job counts",
+            "GET /batches/{batch_id}/events": "Stream batch progress events (SSE)",
+            "GET /jobs": "List jobs (limit, cursor, status, fields; supports If-None-Match)",
             "GET /jobs/{job_id}": "Get job status", 
+            "GET /jobs/{job_id}/events": "Stream job progress events (SSE)",
             "GET /download/{job_id}": "Download video",
             "PUT /jobs/{job_id}/rename": "Rename video",
+            "POST /jobs/{job_id}/retry": "Retry a failed job from its last checkpoint",
             "DELETE /jobs/{job_id}": "Delete job"
         },
+        "render_pool": render_pool.stats(),
         "weave_project": "manim_video_api"
     }
 
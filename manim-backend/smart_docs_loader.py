@@ -1,3 +1,4 @@
+import hashlib
 import json
 import re
 from typing import List, Dict, Optional
@@ -6,6 +7,7 @@ class SmartManimDocsLoader:
     def __init__(self, docs_path: str = "manim_docs.json"):
         self.docs_path = docs_path
         self.docs_data = self._load_docs()
+        self.docs_version = self._docs_version()
     
     def _load_docs(self) -> Dict:
         """Load the scraped documentation data"""
@@ -16,6 +18,14 @@ class SmartManimDocsLoader:
             print(f"Error loading docs: {e}")
             return {}
     
+    def _docs_version(self) -> str:
+        """Short content hash of the docs snapshot (changes whenever docs are re-scraped)"""
+        try:
+            with open(self.docs_path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            return "missing"
+    
     def extract_relevant_sections(self, user_prompt: str) -> str:
         """Extract documentation sections most relevant to the user's request"""
         
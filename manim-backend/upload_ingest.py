@@ -0,0 +1,125 @@
+"""
+Streaming, size-limited ingestion of uploaded PDFs.
+
+``UploadLimitMiddleware`` rejects oversized upload requests with a 413
+before the multipart body is parsed when ``Content-Length`` is known, and
+cuts the body off once it grows past the limit otherwise (chunked uploads).
+``save_upload`` then copies the parsed upload to its final path in fixed
+size chunks on a worker thread, hashing and size-checking it on the way, so
+neither memory use nor the event loop depends on how large the PDF is.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Iterable, Tuple
+
+from fastapi import UploadFile
+
+# Largest PDF accepted for upload (before compression)
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+
+# Allowance for the multipart envelope and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Uploads are read, hashed and written in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured byte limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File too large (max {max_bytes / (1024 * 1024):.0f}MB)")
+        self.max_bytes = max_bytes
+
+
+def _copy_upload(source, dest_path: str, max_bytes: int) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    source.seek(0)
+    try:
+        with open(dest_path, "wb") as out:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return size, digest.hexdigest()
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[int, str]:
+    """
+    Copy an upload to ``dest_path`` off the event loop.
+
+    Returns ``(size_bytes, sha256_hex)``; raises UploadTooLargeError (leaving
+    nothing behind at ``dest_path``) once more than ``max_bytes`` were read.
+    """
+    return await asyncio.to_thread(_copy_upload, file.file, dest_path, max_bytes)
+
+
+class UploadLimitMiddleware:
+    """Reject request bodies larger than ``max_bytes`` on the given paths with 413."""
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"File too large (max {self.max_bytes // (1024 * 1024)}MB)"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Stop reading; whatever the app answers is replaced by a 413
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not response_started:
+                await self._reject(send)
@@ -1,18 +1,44 @@
 import asyncio
 import os
 import json
+import time
 from pathlib import Path
 import warnings
+from typing import Optional
 import weave
 
 # MoviePy imports
 from moviepy import VideoFileClip, AudioFileClip, concatenate_videoclips, ImageClip
 
 # Local imports
-from config_gen import generate_video_config_with_smart_docs
-from manim_generator import generate_manim_clips
+from config_cache import CONFIG_CACHE_BYPASS, ConfigResponseCache, cache_key
+from config_gen import (config_cache_key_parts, repair_clip_config, repair_scene_code,
+                        stream_video_config_with_smart_docs)
+from clip_stream import ClipStreamParser
+from clip_schema import ClipConfigError, load_clip
+from manim_generator import render_manim_clip, renderable_clips
 from voice_gen_fallback import generate_voice_with_fallback as generate_voice
 from veo_gen import generate_veo_thank_you_clip
+from job_events import report_progress
+from workspace import JobWorkspace
+import repo_path  # noqa: F401
+from api.services import llm_client
+
+# Roughly 4 clips make a 1-minute video; later clips in the config are ignored
+MAX_CLIPS = 4
+
+# Manim renders running at once while the config streams in
+CLIP_RENDER_CONCURRENCY = int(os.getenv("CLIP_RENDER_CONCURRENCY", "2"))
+
+# Re-requests of a clip whose JSON is malformed or fails ClipConfig validation
+CLIP_REPAIR_ATTEMPTS = int(os.getenv("CLIP_REPAIR_ATTEMPTS", "2"))
+
+# Pre-rendered outro with audio; resolved next to this module so it is found
+# whatever the working directory of the server or worker process
+THANK_YOU_CLIP = os.getenv(
+    "THANK_YOU_CLIP",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "clips", "thank_you_with_audio.mp4")
+)
 
 
 @weave.op()
@@ -72,7 +98,7 @@ def combine_video_with_audio_sync(video_path: str, audio_path: str, output_path:
             audio=True,  # Explicitly enable audio
             audio_codec='aac',  # Specify audio codec
             codec='libx264',  # Specify video codec
-            temp_audiofile='temp-audio.m4a',  # Specify temp audio file
+            temp_audiofile=os.path.splitext(output_path)[0] + '-temp-audio.m4a',  # Temp audio next to the output
             remove_temp=True
         )
         
@@ -108,6 +134,15 @@ def combine_video_with_audio_sync(video_path: str, audio_path: str, output_path:
 
 
 @weave.op()
+def clip_has_audio(video_path: str) -> bool:
+    """Whether a video file has an audio track (opens it with MoviePy, so it blocks)"""
+    clip = VideoFileClip(video_path)
+    try:
+        return clip.audio is not None
+    finally:
+        clip.close()
+
+
 def normalize_video_clip(clip, target_fps: int = 24, target_resolution: tuple = (1280, 720)) -> VideoFileClip:
     """
     Normalize video clip to consistent format for stitching.
@@ -150,9 +185,28 @@ def normalize_video_clip(clip, target_fps: int = 24, target_resolution: tuple =
         print(f"⚠️  Warning: Could not normalize clip - {e}")
         return clip
 
+def thank_you_clip_path(output_dir: str) -> Optional[str]:
+    """
+    The outro clip: the pre-rendered THANK_YOU_CLIP if it exists, otherwise
+    a clip generated into ``output_dir``. None if generation failed.
+    """
+    if os.path.exists(THANK_YOU_CLIP):
+        print(f"📁 Using existing thank you clip: {THANK_YOU_CLIP}")
+        return THANK_YOU_CLIP
+    thank_you_dir = os.path.join(output_dir, "thank_you")
+    os.makedirs(thank_you_dir, exist_ok=True)
+    print(f"🎬 Generating new thank you clip...")
+    return generate_veo_thank_you_clip(os.path.join(thank_you_dir, "thank_you_veo.mp4"))
+
 @weave.op()
 def stitch_videos(video_paths: list, output_path: str = "summary_video.mp4", add_thank_you: bool = True) -> str:
-    """Stitch multiple video files together with optional Veo 'Thank You' ending."""
+    """
+    Stitch multiple video files together with optional Veo 'Thank You' ending.
+    
+    Intermediate files (temp audio, a freshly generated thank-you clip) are
+    written next to output_path, so each job's workspace stays self-contained.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
     print(f"\n🎬 VIDEO STITCHING DEBUG:")
     print(f"📝 Input paths: {len(video_paths)} videos")
     print(f"📁 Output path: {output_path}")
@@ -213,14 +267,7 @@ def stitch_videos(video_paths: list, output_path: str = "summary_video.mp4", add
         if add_thank_you:
             print("\n🎬 Adding Veo 'Thank You' clip to the end...")
             try:
-                # Use the thank you clip with audio if available, otherwise generate new one
-                if os.path.exists("clips/thank_you_with_audio.mp4"):
-                    veo_clip_path = "clips/thank_you_with_audio.mp4"
-                    print(f"📁 Using existing thank you clip: {veo_clip_path}")
-                else:
-                    thank_you_path = "clips/thank_you_veo.mp4"
-                    print(f"🎬 Generating new thank you clip...")
-                    veo_clip_path = generate_veo_thank_you_clip(thank_you_path)
+                veo_clip_path = thank_you_clip_path(output_dir)
                 
                 if veo_clip_path and os.path.exists(veo_clip_path):
                     print(f"📹 Processing Veo 'Thank You' clip: {veo_clip_path}")
@@ -283,9 +330,10 @@ def stitch_videos(video_paths: list, output_path: str = "summary_video.mp4", add
             audio=True,  # Explicitly enable audio
             audio_codec='aac',  # Specify audio codec
             codec='libx264',  # Specify video codec
-            temp_audiofile='temp-final-audio.m4a',  # Specify temp audio file
+            temp_audiofile=os.path.join(output_dir, 'temp-final-audio.m4a'),  # Temp audio stays in the workspace
             remove_temp=True,
-            audio_fps=44100  # Ensure consistent audio sample rate
+            audio_fps=44100,  # Ensure consistent audio sample rate
+            ffmpeg_params=['-movflags', '+faststart']  # moov atom first so playback starts before the download ends
         )
         
         # Verify final output
@@ -320,127 +368,334 @@ def stitch_videos(video_paths: list, output_path: str = "summary_video.mp4", add
         raise
 
 
-@weave.op()
-async def generate_summary_video_upload(pdf_path: str, user_prompt: str = "") -> dict:
-    """Generate a 1-minute summary video from an uploaded PDF file."""
-    print(f"📄 Processing uploaded PDF: {pdf_path}")
-    print(f"📝 User prompt: {user_prompt}")
+def _parse_config_clips(config_text: str):
+    """
+    Parse a complete config response into ``(index, clip)`` pairs plus the
+    broken ``(index, fragment, error)`` entries (see ClipStreamParser).
+    """
+    parser = ClipStreamParser()
+    completed = parser.feed(config_text)
+    parser.close()
+    if not parser.count:
+        raise ValueError("Could not parse video configuration")
+    return completed, parser.broken
+
+
+async def _repair_clip(index: int, fragment: str, error: str, user_prompt: str):
+    """Re-request one broken clip (up to CLIP_REPAIR_ATTEMPTS times); returns ``(index, clip or None)``."""
+    for attempt in range(CLIP_REPAIR_ATTEMPTS):
+        print(f"🩹 Re-requesting clip {index + 1} of the config ({error})")
+        try:
+            text = await repair_clip_config(fragment, error, index, user_prompt)
+        except Exception as e:
+            print(f"❌ Repair request for clip {index + 1} failed: {e}")
+            return index, None
+        try:
+            return index, load_clip(text)
+        except ClipConfigError as e:
+            fragment, error = text, str(e)
+    print(f"⚠️  Giving up on clip {index + 1} of the config ({error})")
+    return index, None
+
+
+async def _stream_config_clips(pdf_source: str, user_prompt: str, use_base64: bool,
+                               workspace: JobWorkspace, on_progress=None, use_cache: bool = True,
+                               metrics: Optional[dict] = None, batch_config: Optional[str] = None):
+    """
+    Yield ``(index, clip)`` for the clips of the video config as soon as each one is available.
+    
+    Clips come from the workspace's checkpoint when present, then from
+    ``batch_config`` (a response generated ahead of time in a batch), then
+    from a cached Claude response for the same PDF, prompt, model, template and
+    docs snapshot (unless ``use_cache`` is False or CONFIG_CACHE_BYPASS is
+    set). Otherwise Claude's response is streamed and every ``clips[i]`` is
+    yielded the moment its JSON object closes. At most MAX_CLIPS clips are
+    used; the stream is abandoned once they have arrived.
+    
+    Clips that fail ClipConfig validation are re-requested on their own
+    while the others render, and yielded (with their original ``index``)
+    once repaired; clips that cannot be repaired are left out.
+    
+    ``metrics`` (if given) is filled in with where the config came from,
+    broken and repaired clip counts and, for Claude responses, time to
+    first token and prompt-cache usage.
+    """
+    metrics = {} if metrics is None else metrics
+    started = time.monotonic()
+    checkpoint = workspace.restore("config")
+    if checkpoint:
+        with open(checkpoint["path"]) as f:
+            config = json.load(f)
+        clips = config["clips"]
+        print(f"♻️  Resuming with saved config ({len(clips)} clips)")
+        metrics["source"] = "checkpoint"
+        report_progress(on_progress, "config_generated", total_clips=len(clips), resumed=True)
+        for index, clip in zip(config.get("indices", range(len(clips))), clips):
+            yield index, clip
+        return
+    
+    report_progress(on_progress, "config_generating")
+    key_parts = await asyncio.to_thread(config_cache_key_parts, pdf_source, user_prompt, use_base64)
+    key = cache_key(**key_parts)
+    config_cache = ConfigResponseCache()
+    config_text = batch_config
+    if config_text is None and use_cache and not CONFIG_CACHE_BYPASS:
+        config_text = config_cache.get(key)
+    cached = batch_config is None and config_text is not None
     
-    # Generate video config from PDF using base64 encoding
-    response = generate_video_config_with_smart_docs(pdf_path, user_prompt, use_base64=True)
-    config_text = response.content[0].text
+    clips = {}
+    repairs = {}
+    
+    def start_repairs(broken):
+        for index, fragment, error in broken:
+            if index < MAX_CLIPS and index not in repairs:
+                print(f"⚠️  Clip {index + 1} of the config is broken: {error}")
+                repairs[index] = asyncio.create_task(_repair_clip(index, fragment, error, user_prompt))
     
-    # Parse JSON config
     try:
-        config = json.loads(config_text)
-    except json.JSONDecodeError:
-        import re
-        json_match = re.search(r'\{.*\}', config_text, re.DOTALL)
-        if json_match:
-            config = json.loads(json_match.group())
+        if config_text is not None:
+            if cached:
+                print("♻️  Using cached video config for this PDF and prompt")
+                metrics["source"] = "response_cache"
+            else:
+                print("📦 Using the video config generated in batch")
+                metrics["source"] = "batch"
+            completed, broken = _parse_config_clips(config_text)
+            for index, clip in completed:
+                if index < MAX_CLIPS:
+                    clips[index] = clip
+                    yield index, clip
+            start_repairs(broken)
         else:
-            raise ValueError("Could not parse video configuration")
+            metrics["source"] = "claude"
+            
+            def on_start(message):
+                # Input usage is known once text starts flowing, even if we stop reading early
+                metrics["time_to_first_token_seconds"] = round(time.monotonic() - started, 3)
+                metrics.update(llm_client.cache_usage(message.usage))
+                print(f"⚡ First config token after {metrics['time_to_first_token_seconds']}s "
+                      f"(prompt cache hit rate {metrics['cache_hit_rate']:.0%})")
+            
+            # Stream the config from Claude, handing out clips as they complete
+            parser = ClipStreamParser()
+            stream = stream_video_config_with_smart_docs(pdf_source, user_prompt, use_base64=use_base64,
+                                                         on_start=on_start)
+            try:
+                async for text in stream:
+                    for index, clip in parser.feed(text):
+                        if index < MAX_CLIPS:
+                            clips[index] = clip
+                            print(f"📨 Clip {index + 1} of the config received")
+                            yield index, clip
+                    start_repairs(parser.broken)
+                    if parser.count >= MAX_CLIPS or parser.finished:
+                        break
+            finally:
+                await stream.aclose()
+            parser.close()
+            start_repairs(parser.broken)
+            if not parser.count:
+                raise ValueError("Could not parse video configuration")
+        
+        for repair in asyncio.as_completed(list(repairs.values())):
+            index, clip = await repair
+            if clip:
+                clips[index] = clip
+                print(f"🩹 Clip {index + 1} of the config repaired")
+                yield index, clip
+    finally:
+        for task in repairs.values():
+            task.cancel()
+    
+    metrics["broken_clips"] = len(repairs)
+    metrics["repaired_clips"] = sum(1 for index in repairs if index in clips)
     
-    clips = config.get("clips", [])
     if not clips:
         raise ValueError("No clips generated from PDF")
     
-    # Limit to ~1 minute (take first few clips)
-    max_clips = min(len(clips), 4)  # Roughly 4 clips for 1 minute
-    clips = clips[:max_clips]
+    indices = sorted(clips)
+    ordered = [clips[index] for index in indices]
+    # Only responses that parsed into clips are worth reusing
+    if not cached:
+        config_text = json.dumps({"clips": ordered})
+        config_cache.put(key, config_text, **key_parts)
+    
+    config_path = workspace.path("config.json")
+    with open(config_path, "w") as f:
+        json.dump({"clips": ordered, "indices": indices, "config_text": config_text}, f, indent=2)
+    workspace.checkpoint("config", config_path, total_clips=len(ordered))
+    
+    metrics["config_seconds"] = round(time.monotonic() - started, 3)
+    report_progress(on_progress, "config_generated", total_clips=len(ordered), cached=cached)
+
+
+async def _render_clip(i: int, clip_config: dict, total: int, workspace: JobWorkspace,
+                       render_slots: asyncio.Semaphore, on_progress=None, user_prompt: str = "") -> Optional[str]:
+    """
+    Rendered video of clip ``i``, reusing its checkpoint when present.
+    
+    A scene that fails is repaired on its own (see render_manim_clip) while
+    the other clips carry on through rendering, voice-over and muxing.
+    """
+    checkpoint = workspace.restore(f"clip_{i}_video")
+    if checkpoint:
+        print(f"♻️  Reusing rendered clip {i+1}: {checkpoint['path']}")
+        report_progress(on_progress, "clip_rendered", clip_index=i, total_clips=total, resumed=True)
+        return checkpoint["path"]
+    
+    async def repair_code(code, error):
+        return await repair_scene_code(code, error, clip_config.get("voice_over", ""), user_prompt)
+    
+    video_path = await render_manim_clip(clip_config, i, total, workspace.clips_dir, "medium_quality",
+                                         on_progress, repair_code, render_slots)
+    if video_path:
+        workspace.checkpoint(f"clip_{i}_video", video_path)
+    return video_path
+
+
+async def _clip_voice(i: int, clip_config: dict, workspace: JobWorkspace) -> Optional[str]:
+    """Voice-over audio of clip ``i`` (None if it has no text or synthesis failed)."""
+    voice_text = clip_config.get('voice_over')
+    if not voice_text:
+        return None
+    audio = workspace.restore(f"clip_{i}_audio")
+    if audio:
+        print(f"♻️  Reusing voice for clip {i+1}: {audio['path']}")
+        return audio["path"]
+    
+    print(f"🎤 Generating voice for clip {i+1}...")
+    print(f"📝 Voice text: {voice_text[:100]}...")
+    audio_path = os.path.join(workspace.clips_dir, f"audio_{i}.wav")
+    print(f"📁 Audio output path: {audio_path}")
+    try:
+        audio_result = await generate_voice(voice_text, audio_path)
+    except Exception as e:
+        print(f"❌ Voice generation failed for clip {i+1}: {e}")
+        import traceback
+        print(f"📋 Traceback: {traceback.format_exc()}")
+        return None
+    print(f"📝 Voice generation result: {audio_result}")
+    if audio_result and os.path.exists(audio_result):
+        workspace.checkpoint(f"clip_{i}_audio", audio_result)
+        return audio_result
+    return None
+
+
+async def _produce_clip(i: int, clip_config: dict, total: int, workspace: JobWorkspace,
+                        render_slots: asyncio.Semaphore, on_progress=None, user_prompt: str = "") -> Optional[str]:
+    """
+    Render clip ``i`` and synthesize its voice-over concurrently, then mux them.
     
-    print(f"🎬 Generating {len(clips)} video clips...")
+    Returns the clip to stitch (with voice-over, or silent if the voice
+    failed), or None if the clip could not be rendered.
+    """
+    muxed = workspace.restore(f"clip_{i}_muxed")
+    if muxed:
+        print(f"♻️  Reusing clip {i+1} with voice-over: {muxed['path']}")
+        return muxed["path"]
+    
+    video_path, audio_result = await asyncio.gather(
+        _render_clip(i, clip_config, total, workspace, render_slots, on_progress, user_prompt),
+        _clip_voice(i, clip_config, workspace),
+    )
+    
+    print(f"\n🎬 Processing clip {i+1}/{total}...")
+    print(f"📁 Video path: {video_path}")
+    if not video_path:
+        print(f"✗ Clip {i+1} failed to generate (no video path)")
+        return None
+    if not os.path.exists(video_path):
+        print(f"❌ Clip {i+1} video file not found: {video_path}")
+        return None
+    print(f"📏 Video file size: {os.path.getsize(video_path)} bytes")
     
-    # Generate Manim videos
-    output_dir = "clips"
-    os.makedirs(output_dir, exist_ok=True)
+    if not clip_config.get('voice_over'):
+        print(f"🔇 No voice text provided for clip {i+1}")
+        print(f"✓ Clip {i+1} (silent - no voice text)")
+        return video_path
+    if not audio_result:
+        report_progress(on_progress, "voice_failed", clip_index=i, total_clips=total)
+        print(f"⚠️  Voice generation failed, using silent video")
+        print(f"✓ Clip {i+1} (silent - voice failed)")
+        return video_path
     
-    video_paths = await generate_manim_clips(clips, output_dir, "medium_quality")
+    print(f"✅ Audio generated: {os.path.getsize(audio_result)} bytes")
+    report_progress(on_progress, "voice_ready", clip_index=i, total_clips=total)
+    
+    final_path = os.path.join(workspace.clips_dir, f"final_{i}.mp4")
+    print(f"🔗 Combining video + audio -> {final_path}")
+    try:
+        # MoviePy blocks; keep the event loop free for the other clips and the config stream
+        combined_path = await asyncio.to_thread(combine_video_with_audio_sync, video_path, audio_result, final_path)
+    except Exception as e:
+        print(f"❌ Audio combination failed for clip {i+1}: {e}")
+        combined_path = None
     
-    # Track video generation metrics
-    successful_clips = 0
-    failed_clips = 0
+    if combined_path != final_path or not os.path.exists(final_path):
+        print(f"⚠️  Audio combination failed, using silent video")
+        print(f"✓ Clip {i+1} (silent - combination failed)")
+        return video_path
     
-    # Add voice-over to each clip (with fallback to silent video)
-    print(f"\n🎤 ADDING VOICE-OVER TO CLIPS...")
-    final_clips = []
-    for i, (clip_config, video_path) in enumerate(zip(clips, video_paths)):
-        print(f"\n🎬 Processing clip {i+1}/{len(clips)}...")
-        print(f"📁 Video path: {video_path}")
-        
-        if video_path:
-            # Verify video file exists and is valid
-            if not os.path.exists(video_path):
-                print(f"❌ Clip {i+1} video file not found: {video_path}")
-                failed_clips += 1
+    print(f"✅ Combined video created: {os.path.getsize(combined_path)} bytes")
+    # Verify combined video has audio
+    try:
+        has_audio = await asyncio.to_thread(clip_has_audio, combined_path)
+        print(f"🔊 Combined video has audio: {has_audio}")
+    except Exception as test_e:
+        print(f"⚠️  Could not test combined video: {test_e}")
+    
+    workspace.checkpoint(f"clip_{i}_muxed", combined_path)
+    report_progress(on_progress, "clip_muxed", clip_index=i, total_clips=total)
+    print(f"✓ Clip {i+1} with voice-over completed")
+    return combined_path
+
+
+async def _generate_summary_video(pdf_source: str, user_prompt: str, use_base64: bool,
+                                  workspace: JobWorkspace, on_progress=None, use_cache: bool = True,
+                                  batch_config: Optional[str] = None) -> dict:
+    """
+    Shared pipeline behind generate_summary_video and generate_summary_video_upload.
+    
+    Clips are dispatched while the config is still streaming in: as soon as
+    ``clips[i]`` is complete its render (at most CLIP_RENDER_CONCURRENCY at
+    a time) and voice-over synthesis start, overlapping with the rest of
+    the generation.
+    
+    Every intermediate and output file is written inside ``workspace`` and
+    checkpointed in its manifest (config, per-clip render, audio and muxed
+    clip, stitched video), so running again on the same workspace resumes
+    after the last completed stage.
+    """
+    print(f"📝 User prompt: {user_prompt}")
+    
+    render_slots = asyncio.Semaphore(CLIP_RENDER_CONCURRENCY)
+    config_clips = {}
+    tasks = {}
+    config_metrics = {}
+    try:
+        async for index, clip_config in _stream_config_clips(pdf_source, user_prompt, use_base64,
+                                                             workspace, on_progress, use_cache, config_metrics,
+                                                             batch_config):
+            config_clips[index] = clip_config
+            if not renderable_clips([clip_config]):
                 continue
-                
-            video_size = os.path.getsize(video_path)
-            print(f"📏 Video file size: {video_size} bytes")
-            
-            # Try to generate voice-over, but continue if it fails
-            try:
-                voice_text = clip_config.get('voice_over')
-                if voice_text:
-                    print(f"🎤 Generating voice for clip {i+1}...")
-                    print(f"📝 Voice text: {voice_text[:100]}...")
-                    
-                    audio_path = f"{output_dir}/audio_{i}.wav"
-                    print(f"📁 Audio output path: {audio_path}")
-                    
-                    audio_result = await generate_voice(voice_text, audio_path)
-                    print(f"📝 Voice generation result: {audio_result}")
-                    
-                    if audio_result and os.path.exists(audio_result):
-                        audio_size = os.path.getsize(audio_result)
-                        print(f"✅ Audio generated: {audio_size} bytes")
-                        
-                        final_path = f"{output_dir}/final_{i}.mp4"
-                        print(f"🔗 Combining video + audio -> {final_path}")
-                        
-                        combined_path = combine_video_with_audio_sync(video_path, audio_path, final_path)
-                        
-                        if combined_path and os.path.exists(combined_path):
-                            combined_size = os.path.getsize(combined_path)
-                            print(f"✅ Combined video created: {combined_size} bytes")
-                            
-                            # Verify combined video has audio
-                            try:
-                                test_combined = VideoFileClip(combined_path)
-                                has_audio = test_combined.audio is not None
-                                print(f"🔊 Combined video has audio: {has_audio}")
-                                test_combined.close()
-                            except Exception as test_e:
-                                print(f"⚠️  Could not test combined video: {test_e}")
-                            
-                            final_clips.append(combined_path)
-                            successful_clips += 1
-                            print(f"✓ Clip {i+1} with voice-over completed")
-                        else:
-                            print(f"⚠️  Audio combination failed, using silent video")
-                            final_clips.append(video_path)
-                            successful_clips += 1
-                            print(f"✓ Clip {i+1} (silent - combination failed)")
-                    else:
-                        print(f"⚠️  Voice generation failed, using silent video")
-                        final_clips.append(video_path)
-                        successful_clips += 1
-                        print(f"✓ Clip {i+1} (silent - voice failed)")
-                else:
-                    print(f"🔇 No voice text provided for clip {i+1}")
-                    final_clips.append(video_path)
-                    successful_clips += 1
-                    print(f"✓ Clip {i+1} (silent - no voice text)")
-            except Exception as e:
-                print(f"❌ Voice generation failed for clip {i+1}: {e}")
-                import traceback
-                print(f"📋 Traceback: {traceback.format_exc()}")
-                final_clips.append(video_path)
-                successful_clips += 1
-                print(f"✓ Clip {i+1} (silent - voice failed with exception)")
-        else:
-            failed_clips += 1
-            print(f"✗ Clip {i+1} failed to generate (no video path)")
+            # The config asks for MAX_CLIPS clips; the real count is known once it is complete
+            tasks[index] = asyncio.create_task(
+                _produce_clip(index, clip_config, MAX_CLIPS, workspace, render_slots, on_progress, user_prompt)
+            )
+            print(f"🎬 Dispatched clip {index + 1} for rendering and voice-over")
+        # Repaired clips can arrive out of order; the video follows the config order
+        results = await asyncio.gather(*(tasks[index] for index in sorted(tasks)))
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    
+    clips = [config_clips[index] for index in sorted(config_clips)]
+    final_clips = [path for path in results if path]
+    successful_clips = len(final_clips)
+    failed_clips = len(results) - successful_clips
     
     print(f"\n📊 VOICE-OVER PROCESSING SUMMARY:")
     print(f"  ✅ Successful clips: {successful_clips}")
@@ -452,15 +707,14 @@ async def generate_summary_video_upload(pdf_path: str, user_prompt: str = "") ->
     clips_without_audio = 0
     for i, clip_path in enumerate(final_clips):
         try:
-            test_clip = VideoFileClip(clip_path)
-            has_audio = test_clip.audio is not None
+            # Off the event loop, so render worker lease heartbeats keep running
+            has_audio = await asyncio.to_thread(clip_has_audio, clip_path)
             if has_audio:
                 clips_with_audio += 1
                 print(f"  🔊 Clip {i+1}: HAS AUDIO ({clip_path})")
             else:
                 clips_without_audio += 1
                 print(f"  🔇 Clip {i+1}: NO AUDIO ({clip_path})")
-            test_clip.close()
         except Exception as e:
             print(f"  ❌ Clip {i+1}: ERROR checking audio ({e})")
             clips_without_audio += 1
@@ -479,197 +733,79 @@ async def generate_summary_video_upload(pdf_path: str, user_prompt: str = "") ->
         print("❌ CRITICAL ERROR: No clips were successfully generated")
         raise ValueError("No clips were successfully generated")
     
-    # Stitch all clips together
-    final_video = stitch_videos(final_clips, "summary_video.mp4", add_thank_you=True)
+    # Stitch all clips together, unless a previous attempt already did
+    stitched = workspace.restore("stitched")
+    if stitched:
+        print(f"♻️  Reusing stitched video: {stitched['path']}")
+        final_video = stitched["path"]
+    else:
+        report_progress(on_progress, "stitching", clips=len(final_clips))
+        # Encoding takes minutes; the lease heartbeat must keep running meanwhile
+        final_video = await asyncio.to_thread(
+            stitch_videos, final_clips, workspace.path("summary_video.mp4"), add_thank_you=True
+        )
+        workspace.checkpoint("stitched", final_video)
     
     print(f"✅ Summary video created: {final_video}")
     
-    # Return comprehensive results for Weave tracking
+    report_progress(on_progress, "stitched", successful_clips=successful_clips, failed_clips=failed_clips)
+    
     return {
         "video_path": final_video,
         "total_clips": len(clips),
         "successful_clips": successful_clips,
         "failed_clips": failed_clips,
         "success_rate": successful_clips / len(clips) if clips else 0,
-        "pdf_path": pdf_path,
+        "config_metrics": config_metrics,
         "clips_config": clips
     }
 
 
 @weave.op()
-async def generate_summary_video(pdf_url: str, user_prompt: str = "") -> dict:
-    """Generate a 1-minute summary video from a PDF URL."""
-    print(f"📄 Processing PDF: {pdf_url}")
-    print(f"📝 User prompt: {user_prompt}")
-    
-    # Generate video config from PDF
-    response = generate_video_config_with_smart_docs(pdf_url, user_prompt, use_base64=False)
-    config_text = response.content[0].text
-    
-    # Parse JSON config
-    try:
-        config = json.loads(config_text)
-    except json.JSONDecodeError:
-        import re
-        json_match = re.search(r'\{.*\}', config_text, re.DOTALL)
-        if json_match:
-            config = json.loads(json_match.group())
-        else:
-            raise ValueError("Could not parse video configuration")
-    
-    clips = config.get("clips", [])
-    if not clips:
-        raise ValueError("No clips generated from PDF")
-    
-    # Limit to ~1 minute (take first few clips)
-    max_clips = min(len(clips), 4)  # Roughly 4 clips for 1 minute
-    clips = clips[:max_clips]
-    
-    print(f"🎬 Generating {len(clips)} video clips...")
-    
-    # Generate Manim videos
-    output_dir = "clips"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    video_paths = await generate_manim_clips(clips, output_dir, "medium_quality")
-    
-    # Track video generation metrics
-    successful_clips = 0
-    failed_clips = 0
-    
-    # Add voice-over to each clip (with fallback to silent video)
-    print(f"\n🎤 ADDING VOICE-OVER TO CLIPS...")
-    final_clips = []
-    for i, (clip_config, video_path) in enumerate(zip(clips, video_paths)):
-        print(f"\n🎬 Processing clip {i+1}/{len(clips)}...")
-        print(f"📁 Video path: {video_path}")
-        
-        if video_path:
-            # Verify video file exists and is valid
-            if not os.path.exists(video_path):
-                print(f"❌ Clip {i+1} video file not found: {video_path}")
-                failed_clips += 1
-                continue
-                
-            video_size = os.path.getsize(video_path)
-            print(f"📏 Video file size: {video_size} bytes")
-            
-            # Try to generate voice-over, but continue if it fails
-            try:
-                voice_text = clip_config.get('voice_over')
-                if voice_text:
-                    print(f"🎤 Generating voice for clip {i+1}...")
-                    print(f"📝 Voice text: {voice_text[:100]}...")
-                    
-                    audio_path = f"{output_dir}/audio_{i}.wav"
-                    print(f"📁 Audio output path: {audio_path}")
-                    
-                    audio_result = await generate_voice(voice_text, audio_path)
-                    print(f"📝 Voice generation result: {audio_result}")
-                    
-                    if audio_result and os.path.exists(audio_result):
-                        audio_size = os.path.getsize(audio_result)
-                        print(f"✅ Audio generated: {audio_size} bytes")
-                        
-                        final_path = f"{output_dir}/final_{i}.mp4"
-                        print(f"🔗 Combining video + audio -> {final_path}")
-                        
-                        combined_path = combine_video_with_audio_sync(video_path, audio_path, final_path)
-                        
-                        if combined_path and os.path.exists(combined_path):
-                            combined_size = os.path.getsize(combined_path)
-                            print(f"✅ Combined video created: {combined_size} bytes")
-                            
-                            # Verify combined video has audio
-                            try:
-                                test_combined = VideoFileClip(combined_path)
-                                has_audio = test_combined.audio is not None
-                                print(f"🔊 Combined video has audio: {has_audio}")
-                                test_combined.close()
-                            except Exception as test_e:
-                                print(f"⚠️  Could not test combined video: {test_e}")
-                            
-                            final_clips.append(combined_path)
-                            successful_clips += 1
-                            print(f"✓ Clip {i+1} with voice-over completed")
-                        else:
-                            print(f"⚠️  Audio combination failed, using silent video")
-                            final_clips.append(video_path)
-                            successful_clips += 1
-                            print(f"✓ Clip {i+1} (silent - combination failed)")
-                    else:
-                        print(f"⚠️  Voice generation failed, using silent video")
-                        final_clips.append(video_path)
-                        successful_clips += 1
-                        print(f"✓ Clip {i+1} (silent - voice failed)")
-                else:
-                    print(f"🔇 No voice text provided for clip {i+1}")
-                    final_clips.append(video_path)
-                    successful_clips += 1
-                    print(f"✓ Clip {i+1} (silent - no voice text)")
-            except Exception as e:
-                print(f"❌ Voice generation failed for clip {i+1}: {e}")
-                import traceback
-                print(f"📋 Traceback: {traceback.format_exc()}")
-                final_clips.append(video_path)
-                successful_clips += 1
-                print(f"✓ Clip {i+1} (silent - voice failed with exception)")
-        else:
-            failed_clips += 1
-            print(f"✗ Clip {i+1} failed to generate (no video path)")
-    
-    print(f"\n📊 VOICE-OVER PROCESSING SUMMARY:")
-    print(f"  ✅ Successful clips: {successful_clips}")
-    print(f"  ❌ Failed clips: {failed_clips}")
-    print(f"  📁 Final clips ready: {len(final_clips)}")
-    
-    # Critical audio verification 
-    clips_with_audio = 0
-    clips_without_audio = 0
-    for i, clip_path in enumerate(final_clips):
-        try:
-            test_clip = VideoFileClip(clip_path)
-            has_audio = test_clip.audio is not None
-            if has_audio:
-                clips_with_audio += 1
-                print(f"  🔊 Clip {i+1}: HAS AUDIO ({clip_path})")
-            else:
-                clips_without_audio += 1
-                print(f"  🔇 Clip {i+1}: NO AUDIO ({clip_path})")
-            test_clip.close()
-        except Exception as e:
-            print(f"  ❌ Clip {i+1}: ERROR checking audio ({e})")
-            clips_without_audio += 1
+async def generate_summary_video_upload(pdf_path: str, user_prompt: str = "", on_progress=None,
+                                        workspace: JobWorkspace = None, use_cache: bool = True) -> dict:
+    """
+    Generate a 1-minute summary video from an uploaded PDF file.
     
-    print(f"\n🎵 AUDIO VERIFICATION:")
-    print(f"  📊 Clips with audio: {clips_with_audio}/{len(final_clips)}")
-    print(f"  📊 Clips without audio: {clips_without_audio}/{len(final_clips)}")
+    Without a workspace a fresh one is created and kept, so the returned
+    video_path stays valid for the caller. ``use_cache=False`` always asks
+    Claude for a new config instead of reusing a cached one.
+    """
+    print(f"📄 Processing uploaded PDF: {pdf_path}")
     
-    if clips_without_audio > 0:
-        print(f"\n⚠️ WARNING: {clips_without_audio} clips have no audio!")
-        print(f"🔧 This will result in a video with missing audio segments.")
-        if clips_with_audio == 0:
-            print(f"🚨 CRITICAL: ALL CLIPS ARE SILENT!")
+    # Uploaded files are sent to Claude base64-encoded
+    result = await _generate_summary_video(
+        pdf_path, user_prompt, use_base64=True,
+        workspace=workspace or JobWorkspace(cleanup=False), on_progress=on_progress, use_cache=use_cache
+    )
     
-    if not final_clips:
-        print("❌ CRITICAL ERROR: No clips were successfully generated")
-        raise ValueError("No clips were successfully generated")
+    # Return comprehensive results for Weave tracking
+    return {**result, "pdf_path": pdf_path}
+
+
+@weave.op()
+async def generate_summary_video(pdf_url: str, user_prompt: str = "", on_progress=None,
+                                 workspace: JobWorkspace = None, use_cache: bool = True,
+                                 batch_config: Optional[str] = None) -> dict:
+    """
+    Generate a 1-minute summary video from a PDF URL.
     
-    # Stitch all clips together
-    final_video = stitch_videos(final_clips, "summary_video.mp4", add_thank_you=True)
+    Without a workspace a fresh one is created and kept, so the returned
+    video_path stays valid for the caller. ``use_cache=False`` always asks
+    Claude for a new config instead of reusing a cached one;
+    ``batch_config`` is a config response already generated in a batch.
+    """
+    print(f"📄 Processing PDF: {pdf_url}")
     
-    print(f"✅ Summary video created: {final_video}")
+    # URLs are passed to Claude directly
+    result = await _generate_summary_video(
+        pdf_url, user_prompt, use_base64=False,
+        workspace=workspace or JobWorkspace(cleanup=False), on_progress=on_progress, use_cache=use_cache,
+        batch_config=batch_config
+    )
     
     # Return comprehensive results for Weave tracking
-    return {
-        "video_path": final_video,
-        "total_clips": len(clips),
-        "successful_clips": successful_clips,
-        "failed_clips": failed_clips,
-        "success_rate": successful_clips / len(clips) if clips else 0,
-        "pdf_url": pdf_url,
-        "clips_config": clips
-    }
+    return {**result, "pdf_url": pdf_url}
 
 
 def main():
@@ -699,8 +835,11 @@ def main():
     print(f"🚀 Generating 1-minute summary video from: {pdf_url}")
     
     try:
-        # Generate the video with full tracking
-        result = asyncio.run(generate_summary_video(pdf_url))
+        # Generate the video with full tracking in a throwaway workspace
+        with JobWorkspace() as workspace:
+            result = asyncio.run(generate_summary_video(pdf_url, workspace=workspace))
+            os.replace(result["video_path"], "summary_video.mp4")
+            result["video_path"] = "summary_video.mp4"
         
         print(f"🎉 Done! Video saved as: {result['video_path']}")
         print(f"📁 Full path: {os.path.abspath(result['video_path'])}")
@@ -0,0 +1,186 @@
+"""
+Bounded render worker pool for the video generation API.
+
+Video jobs spawn Manim and ffmpeg subprocesses, so running every submission
+at once oversubscribes the CPU and slows all of them down. Jobs wait in a
+durable ``JobQueue`` of at most ``max_queue_depth`` entries; beyond that,
+``submit`` raises ``QueueFullError`` with a Retry-After estimate so the API
+can answer 429.
+
+``RenderWorkerPool`` runs ``max_workers`` asyncio workers that lease jobs
+from the queue, keep the lease alive with heartbeats while the job runs and
+reclaim leases of workers that died. The API process can run workers itself
+or run none (``max_workers=0``) and leave rendering to ``render_worker.py``
+processes sharing the same queue.
+"""
+
+import asyncio
+import math
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from job_queue import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, JobQueue
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the render queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RenderWorkerPool:
+    """Fixed number of asyncio workers draining a bounded, durable job queue."""
+
+    def __init__(self, queue: JobQueue, runner: Callable[[str, Dict], Awaitable],
+                 max_workers: int = 2, max_queue_depth: int = 20,
+                 initial_job_seconds: float = 180.0,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 poll_interval: float = 1.0,
+                 on_abandoned: Optional[Callable[[str], None]] = None):
+        self.queue = queue
+        self.runner = runner
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.on_abandoned = on_abandoned
+        self.worker_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self._running: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: list = []
+        # Exponentially weighted average job duration, used for Retry-After
+        self._avg_job_seconds = initial_job_seconds
+
+    def start(self):
+        """Start the worker tasks. Must be called from a running event loop."""
+        if self._workers or not self.max_workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"render-worker-{i}")
+            for i in range(self.max_workers)
+        ]
+        print(f"🏭 Render pool started: {self.max_workers} workers, queue depth {self.max_queue_depth}")
+
+    async def stop(self):
+        """
+        Cancel the workers. Queued jobs stay in the durable queue; jobs that
+        were running are picked up again once their lease expires.
+        """
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def run_forever(self):
+        """Run the workers until cancelled (used by standalone worker processes)."""
+        self.start()
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self.stop()
+
+    def is_full(self) -> bool:
+        return self.queue.counts()["queued"] >= self.max_queue_depth
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up."""
+        waiting = self.queue.counts()["queued"] - self.max_queue_depth + 1
+        return max(1, math.ceil(self._avg_job_seconds * max(waiting, 1) / max(self.max_workers, 1)))
+
+    def submit(self, job_id: str, payload: Dict, priority: int = 0) -> int:
+        """
+        Queue a job for ``runner(job_id, payload)``. ``payload`` must be JSON
+        serializable, since the job may run in another process.
+
+        Returns the 1-based queue position, or raises QueueFullError.
+        """
+        if self.is_full():
+            raise QueueFullError(self.retry_after())
+        self.queue.enqueue(job_id, payload, priority)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.queue.position(job_id) or 1
+
+    def cancel(self, job_id: str) -> bool:
+        """Remove a job that has not started yet. Returns True if it was queued."""
+        return self.queue.cancel(job_id)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a queued job, or None if it is not waiting."""
+        return self.queue.position(job_id)
+
+    def stats(self) -> Dict:
+        counts = self.queue.counts()
+        return {
+            "workers": self.max_workers,
+            "running": len(self._running),
+            "queued": counts["queued"],
+            "leased": counts["leased"],
+            "max_queue_depth": self.max_queue_depth,
+            "avg_job_seconds": round(self._avg_job_seconds, 1),
+        }
+
+    def _reclaim(self):
+        requeued, abandoned = self.queue.reclaim_expired(self.max_attempts)
+        for job_id in requeued:
+            print(f"♻️  Lease expired, re-queued job {job_id}")
+        for job_id in abandoned:
+            print(f"💀 Job {job_id} lost its worker {self.max_attempts} times, giving up")
+            if self.on_abandoned is not None:
+                self.on_abandoned(job_id)
+
+    async def _next_job(self, worker_id: str) -> Dict:
+        """Wait until a job can be leased."""
+        while True:
+            self._reclaim()
+            lease = self.queue.claim(worker_id, self.lease_seconds)
+            if lease is not None:
+                return lease
+            # Other processes enqueue too, so poll as well as waiting for local submits
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job_id: str, worker_id: str, task: asyncio.Task):
+        """Keep the lease alive; stop the job if another worker took it over."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.queue.heartbeat(job_id, worker_id, self.lease_seconds):
+                print(f"⚠️  {worker_id} lost the lease on job {job_id}, stopping it")
+                task.cancel()
+                return
+
+    async def _worker(self, index: int):
+        worker_id = f"{self.worker_prefix}-{index}"
+        while True:
+            lease = await self._next_job(worker_id)
+            job_id = lease["job_id"]
+
+            started = time.monotonic()
+            self._running[job_id] = started
+            job_task = asyncio.create_task(self.runner(job_id, lease["payload"]))
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id, job_task))
+            try:
+                await job_task
+            except asyncio.CancelledError:
+                if heartbeat.done():
+                    # Lease lost: the job now belongs to another worker
+                    continue
+                raise
+            except Exception as e:
+                print(f"❌ Render worker {worker_id}: job {job_id} raised {e}")
+            finally:
+                heartbeat.cancel()
+                self._running.pop(job_id, None)
+                elapsed = time.monotonic() - started
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+            self.queue.complete(job_id, worker_id)
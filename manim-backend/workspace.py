@@ -0,0 +1,134 @@
+"""
+Per-job scratch directories for the video pipeline.
+
+Every stage (config generation, Manim rendering, voice synthesis, muxing and
+stitching) used to write fixed file names into a shared ``clips/`` directory
+and the current working directory, so two concurrent jobs overwrote each
+other's files. A ``JobWorkspace`` gives each job its own directory under
+``JOB_WORKSPACE_ROOT`` and removes it when the job is done.
+
+Stages record their outputs in the workspace's ``manifest.json`` with
+``checkpoint``; a retried or restarted job opened on the same workspace picks
+them up with ``restore`` and skips the work already done. Workspaces of
+failed jobs are kept for such retries until ``sweep_expired_workspaces``
+removes the ones unused for ``JOB_WORKSPACE_TTL_SECONDS``.
+"""
+
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Collection, Dict, List, Optional
+
+WORKSPACE_ROOT = os.getenv("JOB_WORKSPACE_ROOT", "workspaces")
+
+MANIFEST_NAME = "manifest.json"
+
+# Workspaces untouched for this long (default a week) are deleted by the sweep
+WORKSPACE_TTL_SECONDS = float(os.getenv("JOB_WORKSPACE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class JobWorkspace:
+    """Scratch directory owned by exactly one job."""
+
+    def __init__(self, job_id: Optional[str] = None, root: str = WORKSPACE_ROOT, cleanup: bool = True):
+        self.job_id = job_id or f"local-{uuid.uuid4().hex[:12]}"
+        self.root = os.path.abspath(os.path.join(root, self.job_id))
+        self.cleanup_on_exit = cleanup
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, *parts: str) -> str:
+        """Absolute path inside the workspace; parent directories are created."""
+        full_path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        return full_path
+
+    def dir(self, *parts: str) -> str:
+        """Absolute path of a (created) subdirectory inside the workspace."""
+        full_path = os.path.join(self.root, *parts)
+        os.makedirs(full_path, exist_ok=True)
+        return full_path
+
+    @property
+    def clips_dir(self) -> str:
+        return self.dir("clips")
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        """Checkpoints recorded so far, keyed by stage name."""
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️  Ignoring unreadable manifest in {self.root}: {e}")
+            return {}
+
+    def checkpoint(self, stage: str, path: str, **data):
+        """
+        Record that ``stage`` produced the file at ``path`` (inside the workspace).
+
+        The manifest is replaced atomically, so a crash never leaves it half written.
+        """
+        manifest = self.load_manifest()
+        manifest[stage] = {"path": os.path.relpath(path, self.root), **data}
+        tmp_path = os.path.join(self.root, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.root, MANIFEST_NAME))
+
+    def restore(self, stage: str) -> Optional[Dict]:
+        """
+        The checkpoint for ``stage`` with an absolute ``path``, or None if the
+        stage never completed or its output file is gone.
+        """
+        entry = self.load_manifest().get(stage)
+        if not entry:
+            return None
+        full_path = os.path.join(self.root, entry["path"])
+        if not os.path.exists(full_path):
+            return None
+        return {**entry, "path": full_path}
+
+    def cleanup(self):
+        """Delete the workspace and everything in it."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.cleanup_on_exit:
+            self.cleanup()
+
+    def __repr__(self) -> str:
+        return f"JobWorkspace({self.root!r})"
+
+
+def sweep_expired_workspaces(root: str = WORKSPACE_ROOT, ttl_seconds: float = WORKSPACE_TTL_SECONDS,
+                             keep: Collection[str] = ()) -> List[str]:
+    """
+    Delete workspaces not written to for ``ttl_seconds``, except those of the
+    job ids in ``keep`` (jobs that may still run). Returns the removed job ids.
+
+    A workspace's age is that of its last checkpoint, or of the directory
+    itself if nothing was checkpointed yet.
+    """
+    cutoff = time.time() - ttl_seconds
+    removed = []
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return removed
+    for entry in entries:
+        if not entry.is_dir() or entry.name in keep:
+            continue
+        try:
+            last_used = os.path.getmtime(os.path.join(entry.path, MANIFEST_NAME))
+        except OSError:
+            last_used = entry.stat().st_mtime
+        if last_used < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(entry.name)
+    return removed
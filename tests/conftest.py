@@ -7,3 +7,10 @@ def setup_env_vars(monkeypatch):
     monkeypatch.setenv("ANTHROPIC_API_KEY", "test_anthropic_key")
     monkeypatch.setenv("LMNT_API_KEY", "test_lmnt_key")
     monkeypatch.setenv("GOOGLE_API_KEY", "test_google_key")
+
+@pytest.fixture(autouse=True)
+def isolated_pdf_cache(monkeypatch, tmp_path):
+    """Keeps fetched PDFs and parsed paper models out of the shared cache directories."""
+    from api.config import Config
+    monkeypatch.setattr(Config, "PDF_CACHE_DIR", str(tmp_path / "pdf_cache"))
+    monkeypatch.setattr(Config, "PAPER_MODEL_DIR", str(tmp_path / "paper_models"))
@@ -0,0 +1,41 @@
+import importlib
+import os
+import sys
+import pytest
+
+# manim-backend is a directory of flat modules rather than a package
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'manim-backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+# Modules server.py needs beyond the standard library (the whole pipeline is imported)
+SERVER_DEPENDENCIES = ('fastapi', 'multipart', 'weave', 'moviepy', 'dotenv', 'edge_tts', 'lmnt')
+
+@pytest.fixture
+def server(monkeypatch, mocker, tmp_path):
+    """
+    The FastAPI server module with a fresh SQLite job store and an in-memory
+    render queue whose workers are not started.
+    """
+    for module in SERVER_DEPENDENCIES:
+        pytest.importorskip(module)
+    if 'server' not in sys.modules:
+        # The first import opens the default store and reads a legacy jobs.json from the working directory
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('JOB_STORE_URL', f"sqlite:///{tmp_path / 'import.db'}")
+        monkeypatch.setenv('JOB_QUEUE_URL', 'memory://')
+        mocker.patch('weave.init', side_effect=RuntimeError('offline'))
+    module = importlib.import_module('server')
+
+    from job_queue import MemoryJobQueue
+    from job_store import SQLiteJobStore
+    from worker_pool import RenderWorkerPool
+    monkeypatch.setattr(module, 'job_store', SQLiteJobStore(str(tmp_path / 'jobs.db')))
+    monkeypatch.setattr(module, 'render_pool', RenderWorkerPool(MemoryJobQueue(), mocker.AsyncMock(), max_queue_depth=3))
+    return module
+
+@pytest.fixture
+def client(server):
+    """TestClient for the server app; startup hooks (workers, batch loop) are not run."""
+    from fastapi.testclient import TestClient
+    return TestClient(server.app)
@@ -0,0 +1,54 @@
+import json
+import pytest
+from clip_schema import ClipConfigError, load_clip, load_json, strip_comments
+
+SCENE = "class SimpleScene(Scene):\n    def construct(self):\n        self.wait(1)"
+
+def test_load_json_accepts_common_slips():
+    """Tests that fences, comments and trailing commas are cleaned up."""
+    text = '```json\n{"clips": [{"a": 1, /* note */ "b": "x // not a comment"},], // done\n}\n```'
+
+    assert load_json(text) == {"clips": [{"a": 1, "b": "x // not a comment"}]}
+
+def test_load_json_finds_the_object_inside_prose():
+    """Tests that an explanation around the JSON is ignored."""
+    assert load_json('Here is the config:\n{"clips": []}\nEnjoy!') == {"clips": []}
+
+def test_load_json_raises_on_garbage():
+    """Tests that text without a JSON object is still an error."""
+    with pytest.raises(ValueError):
+        load_json('no json here')
+
+def test_strip_comments_keeps_strings_intact():
+    """Tests that comment markers and escaped quotes inside strings survive."""
+    text = '{"url": "http://x", "q": "say \\"hi\\" // there"} // trailing'
+
+    assert strip_comments(text) == '{"url": "http://x", "q": "say \\"hi\\" // there"} '
+
+def test_load_clip_normalizes_a_valid_clip():
+    """Tests defaults, None voice-overs and that unknown keys are kept."""
+    clip = load_clip('{"code": %s, "voice_over": null, "title": "Intro"}' % json.dumps(SCENE))
+
+    assert clip == {"type": "manim", "code": SCENE, "voice_over": "", "title": "Intro"}
+
+def test_load_clip_unwraps_a_full_config():
+    """Tests that a repair answer shaped like the whole config yields its first clip."""
+    clip = load_clip('{"clips": [{"code": %s, "voice_over": "hi"}]}' % json.dumps(SCENE))
+
+    assert clip["voice_over"] == "hi"
+
+@pytest.mark.parametrize('fragment, message', [
+    ('{"type": "manim", "voice_over": "no code"}', 'code: Field required'),
+    ('{"type": "veo", "code": %s}' % json.dumps(SCENE), 'type'),
+    ('{"code": "print(1)"}', 'construct method'),
+    ('{"code": %s, "duration": 600}' % json.dumps(SCENE), 'duration'),
+    ('{"code": %s, "duration": 0}' % json.dumps(SCENE), 'duration'),
+    ('[1, 2]', 'not a JSON object'),
+    ('{"code": "class A', 'invalid JSON'),
+])
+def test_load_clip_rejects_malformed_clips(fragment, message):
+    """Tests that every kind of broken clip raises ClipConfigError with a usable reason."""
+    with pytest.raises(ClipConfigError) as error:
+        load_clip(fragment)
+
+    assert message in str(error.value)
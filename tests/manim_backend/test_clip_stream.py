@@ -0,0 +1,102 @@
+import json
+from clip_stream import ClipStreamParser
+
+def _clip(n):
+    return {"type": "manim", "code": f"class SimpleScene(Scene):\n    def construct(self):\n        t = Text('{{{n}}}')",
+            "voice_over": f"clip {n}"}
+
+def _feed_in_chunks(parser, text, size=7):
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+def test_clips_are_returned_as_soon_as_they_close():
+    """Tests that a clip is handed out by the chunk that closes it, before the config ends."""
+    parser = ClipStreamParser()
+    first = json.dumps(_clip(0))
+
+    assert parser.feed('```json\n{"clips": [' + first[:-1]) == []
+    assert parser.feed('}, {"type": ') == [(0, _clip(0))]
+    assert not parser.finished
+
+def test_streamed_config_matches_whole_config():
+    """Tests that chunk boundaries (inside keys, strings and escapes) do not matter."""
+    text = json.dumps({"clips": [_clip(n) for n in range(4)]}, indent=2)
+    parser = ClipStreamParser()
+
+    completed = _feed_in_chunks(parser, text, size=3)
+
+    assert completed == [(n, _clip(n)) for n in range(4)]
+    assert parser.finished
+    assert parser.broken == []
+
+def test_comments_between_clips_are_skipped():
+    """Tests that comments, even with braces in them, do not confuse the parser."""
+    text = '{"clips": [ // first clip {\n' + json.dumps(_clip(0)) + ', /* } ] */ ' + json.dumps(_clip(1)) + ']}'
+    parser = ClipStreamParser()
+
+    assert [index for index, _ in _feed_in_chunks(parser, text, size=2)] == [0, 1]
+
+def test_malformed_clips_are_set_aside_with_their_index():
+    """Tests that only the broken clips are selected for repair, keeping the others."""
+    broken_json = json.dumps(_clip(1))[:-1] + ', "duration": }'
+    missing_code = '{"type": "manim", "voice_over": "no code"}'
+    text = '{"clips": [' + ', '.join([json.dumps(_clip(0)), broken_json, missing_code, json.dumps(_clip(3))]) + ']}'
+    parser = ClipStreamParser()
+
+    completed = _feed_in_chunks(parser, text)
+
+    assert [index for index, _ in completed] == [0, 3]
+    assert [(index, fragment) for index, fragment, _ in parser.broken] == [(1, broken_json), (2, missing_code)]
+    assert 'invalid JSON' in parser.broken[0][2]
+    assert 'code' in parser.broken[1][2]
+    assert parser.count == 4
+
+def test_trailing_comma_clip_is_still_valid():
+    """Tests that a trailing comma inside a clip object is tolerated."""
+    text = '{"clips": [' + json.dumps(_clip(0))[:-1] + ',}]}'
+    parser = ClipStreamParser()
+
+    assert parser.feed(text) == [(0, _clip(0))]
+
+def test_truncated_config_marks_the_partial_clip_broken():
+    """Tests a response cut off (e.g. by max_tokens) in the middle of a clip."""
+    partial = json.dumps(_clip(1))[:40]
+    parser = ClipStreamParser()
+
+    completed = parser.feed('{"clips": [' + json.dumps(_clip(0)) + ', ' + partial)
+    parser.close()
+
+    assert completed == [(0, _clip(0))]
+    assert parser.broken == [(1, partial, 'truncated clip object')]
+    assert parser.count == 2
+    assert parser.finished
+
+def test_over_long_clip_lists_keep_counting():
+    """Tests that clips past the expected four are still indexed (callers cap them)."""
+    text = json.dumps({"clips": [_clip(n) for n in range(7)]})
+    parser = ClipStreamParser()
+
+    completed = parser.feed(text)
+
+    assert [index for index, _ in completed] == list(range(7))
+    assert parser.count == 7
+
+def test_text_after_the_array_is_ignored():
+    """Tests that nothing is parsed once the clips array has closed."""
+    parser = ClipStreamParser()
+    parser.feed('{"clips": [' + json.dumps(_clip(0)) + ']')
+
+    assert parser.finished
+    assert parser.feed(', "extra": [{"code": "x"}]}') == []
+    assert parser.count == 1
+
+def test_no_clips_array():
+    """Tests that a response without a clips array yields nothing."""
+    parser = ClipStreamParser()
+
+    assert parser.feed('{"scenes": [{"code": "x"}]}') == []
+    parser.close()
+    assert parser.count == 0
+    assert parser.broken == []
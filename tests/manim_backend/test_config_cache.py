@@ -0,0 +1,76 @@
+import os
+import time
+import pytest
+import config_cache
+from config_cache import ConfigResponseCache, cache_key
+
+@pytest.fixture
+def cache(tmp_path):
+    return ConfigResponseCache(root=str(tmp_path / 'config_cache'), ttl_seconds=3600, max_bytes=10 ** 6)
+
+def _age(cache, key, seconds):
+    """Makes an entry look last used ``seconds`` ago."""
+    then = time.time() - seconds
+    os.utime(cache._path(key), (then, then))
+
+def test_put_then_get(cache):
+    """Tests that a stored response is returned and the key parts are kept with it."""
+    cache.put('k', '{"clips": []}', model='m')
+
+    assert cache.get('k') == '{"clips": []}'
+    assert cache.get('missing') is None
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    """Tests that get() ignores and removes an entry older than the TTL, even if recently used."""
+    cache.put('k', 'text')
+    now = time.time()
+    monkeypatch.setattr(config_cache.time, 'time', lambda: now + cache.ttl_seconds + 1)
+
+    assert cache.get('k') is None
+    assert not os.path.exists(cache._path('k'))
+
+def test_evict_drops_entries_unused_for_the_ttl(cache):
+    """Tests that eviction sweeps entries nobody read within the TTL."""
+    cache.put('old', 'text')
+    cache.put('new', 'text')
+    _age(cache, 'old', cache.ttl_seconds + 10)
+
+    cache.evict()
+
+    assert cache.get('old') is None
+    assert cache.get('new') == 'text'
+
+def test_least_recently_used_entries_are_evicted_at_capacity(tmp_path):
+    """Tests that going over max_bytes evicts by last use, not by age of creation."""
+    entry_size = len('{"created_at": 0.0, "parts": {}, "text": ""}') + 100
+    cache = ConfigResponseCache(root=str(tmp_path), ttl_seconds=3600, max_bytes=int(entry_size * 2.5))
+    cache.put('a', 'a' * 100)
+    cache.put('b', 'b' * 100)
+    _age(cache, 'a', 30)
+    _age(cache, 'b', 20)
+    assert cache.get('a') == 'a' * 100  # a is now the most recently used
+
+    cache.put('c', 'c' * 100)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'a' * 100
+    assert cache.get('c') == 'c' * 100
+
+def test_evict_ignores_temporary_files(cache):
+    """Tests that half-written files from other processes are left alone."""
+    tmp_file = os.path.join(cache.root, 'k.json.123.456.tmp')
+    with open(tmp_file, 'w') as f:
+        f.write('x' * 10)
+    cache.max_bytes = 0
+
+    cache.evict()
+
+    assert os.path.exists(tmp_file)
+
+def test_cache_key_is_stable_and_covers_every_part():
+    """Tests that key part order does not matter and every value changes the key."""
+    parts = {'pdf': 'hash', 'prompt': '', 'model': 'm', 'template_version': 2}
+
+    assert cache_key(**parts) == cache_key(**dict(reversed(parts.items())))
+    assert cache_key(**parts) != cache_key(**{**parts, 'template_version': 3})
+    assert cache_key(**parts) != cache_key(**{**parts, 'model': 'other'})
@@ -0,0 +1,88 @@
+import base64
+import json
+import pytest
+
+pytest.importorskip('weave')
+pytest.importorskip('dotenv')
+import config_gen
+from api.services.pdf_fetcher import PdfTooLargeError
+
+URL = 'https://example.com/paper.pdf'
+
+def _fake_fetch(size):
+    """Stands in for fetch_pdf, enforcing max_bytes like the real one."""
+    def fetch_pdf(url, max_bytes=None):
+        if max_bytes is not None and size > max_bytes:
+            raise PdfTooLargeError(f"PDF is larger than {max_bytes} bytes")
+        return b'%' * size
+    return fetch_pdf
+
+def test_largest_inlined_pdf_fits_in_a_request():
+    """Tests that a PDF at the limit still fits the request size limit once base64 encoded."""
+    encoded = len(base64.standard_b64encode(b'\0' * config_gen.MAX_DOCUMENT_BYTES))
+
+    assert encoded + 1024 * 1024 < config_gen.MAX_REQUEST_BYTES
+
+@pytest.mark.parametrize('size, source', [
+    (config_gen.MAX_DOCUMENT_BYTES, 'base64'),
+    (config_gen.MAX_DOCUMENT_BYTES + 1, 'url'),
+])
+def test_url_papers_over_the_limit_are_sent_by_url(mocker, size, source):
+    """Tests the boundary for URL papers: at the limit inlined, one byte over referenced by URL."""
+    mocker.patch.object(config_gen, 'fetch_pdf', side_effect=_fake_fetch(size))
+
+    content = config_gen.build_paper_content(URL, extract_text=False)
+
+    assert content[0]['source']['type'] == source
+    if source == 'url':
+        assert content[0]['source']['url'] == URL
+
+@pytest.mark.parametrize('size, source', [
+    (config_gen.MAX_DOCUMENT_BYTES, 'base64'),
+    (config_gen.MAX_DOCUMENT_BYTES + 1, 'url'),
+])
+def test_base64_mode_falls_back_to_the_url_over_the_limit(mocker, size, source):
+    """Tests that use_base64 never inlines a PDF the API would reject."""
+    mocker.patch.object(config_gen, 'read_pdf_bytes', return_value=b'%' * size)
+
+    content = config_gen.build_paper_content(URL, use_base64=True, extract_text=False)
+
+    assert content[0]['source']['type'] == source
+
+def test_oversized_local_pdf_is_an_error(tmp_path):
+    """Tests that a local PDF over the limit, which has no URL to fall back to, is rejected."""
+    path = tmp_path / 'paper.pdf'
+    path.write_bytes(b'%' * (config_gen.MAX_DOCUMENT_BYTES + 1))
+
+    with pytest.raises(ValueError):
+        config_gen.build_paper_content(str(path), use_base64=True, extract_text=False)
+
+def test_url_source_skips_the_download(mocker):
+    """Tests that batch requests reference URL papers without fetching them."""
+    fetch = mocker.patch.object(config_gen, 'fetch_pdf')
+
+    content = config_gen.build_paper_content(URL, extract_text=False, url_source=True)
+
+    assert json.loads(json.dumps(content)) == [{'type': 'document', 'source': {'type': 'url', 'url': URL}}]
+    fetch.assert_not_called()
+
+@pytest.mark.parametrize('attribute, value', [('PROMPT_TEMPLATE_VERSION', 999), ('CONFIG_MODEL', 'another-model')])
+def test_config_cache_key_changes_with_the_template_and_model(mocker, monkeypatch, attribute, value):
+    """Tests that bumping the prompt template or switching models does not reuse cached configs."""
+    mocker.patch.object(config_gen, 'read_pdf_bytes', return_value=b'%PDF')
+    before = config_gen.config_cache_key_parts(URL, 'prompt')
+
+    monkeypatch.setattr(config_gen, attribute, value)
+    after = config_gen.config_cache_key_parts(URL, 'prompt')
+
+    assert after != before
+    assert value in after.values()
+
+def test_config_cache_key_is_the_pdf_content_not_its_location(mocker):
+    """Tests that the same PDF at two URLs shares a key and different contents do not."""
+    mocker.patch.object(config_gen, 'read_pdf_bytes', side_effect=[b'%PDF-a', b'%PDF-a', b'%PDF-b'])
+
+    first, moved, changed = (config_gen.config_cache_key_parts(url) for url in (URL, URL + '?v=2', URL))
+
+    assert first == moved
+    assert first != changed
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip('fastapi')
+from file_delivery import file_etag, parse_range
+
+SIZE = 1000
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 99)),
+    ('bytes=0-0', (0, 0)),
+    ('bytes=999-999', (999, 999)),
+    (' bytes=10-20 ', (10, 20)),
+])
+def test_parse_range_closed_ranges(header, expected):
+    """Tests ordinary start-end ranges, which are inclusive."""
+    assert parse_range(header, SIZE) == expected
+
+def test_parse_range_clamps_the_end_to_the_file():
+    """Tests that an end past the last byte is served up to the last byte."""
+    assert parse_range('bytes=900-5000', SIZE) == (900, 999)
+
+def test_parse_range_open_ended():
+    """Tests bytes=N- (from an offset to the end), as sent when seeking."""
+    assert parse_range('bytes=500-', SIZE) == (500, 999)
+    assert parse_range('bytes=0-', SIZE) == (0, 999)
+
+def test_parse_range_suffix():
+    """Tests bytes=-N (the last N bytes), including suffixes longer than the file."""
+    assert parse_range('bytes=-100', SIZE) == (900, 999)
+    assert parse_range('bytes=-5000', SIZE) == (0, 999)
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=1000-1010', 'bytes=500-100', 'bytes=-0'])
+def test_parse_range_unsatisfiable(header):
+    """Tests ranges that start past the end, are reversed or empty (answered with a 416)."""
+    with pytest.raises(ValueError):
+        parse_range(header, SIZE)
+
+@pytest.mark.parametrize('header', ['bytes=0-1,5-6', 'bytes=0-1, 5-6', 'items=0-1', 'bytes=-', 'bytes=a-b', ''])
+def test_parse_range_unsupported_forms_are_ignored(header):
+    """Tests that multiple ranges, other units and junk fall back to the full file."""
+    assert parse_range(header, SIZE) is None
+
+def test_file_etag_is_strong_and_content_based(tmp_path):
+    """Tests that the ETag is quoted and changes exactly when the bytes do."""
+    first, same, other = tmp_path / 'a.mp4', tmp_path / 'b.mp4', tmp_path / 'c.mp4'
+    first.write_bytes(b'video' * 1000)
+    same.write_bytes(b'video' * 1000)
+    other.write_bytes(b'video' * 999)
+
+    etag = file_etag(str(first))
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert file_etag(str(same)) == etag
+    assert file_etag(str(other)) != etag
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from job_events import JobEventBus, report_progress
+
+async def _take(iterator, count):
+    """The next ``count`` items of an async iterator."""
+    return [await iterator.__anext__() for _ in range(count)]
+
+async def _started(bus, job_id, **kwargs):
+    """A subscription that is registered with the bus (generators only subscribe when first advanced)."""
+    subscription = bus.subscribe(job_id, **kwargs)
+    first = asyncio.ensure_future(subscription.__anext__())
+    await asyncio.sleep(0)
+    return subscription, first
+
+def test_events_fan_out_to_every_subscriber():
+    """Tests that all subscribers of a job get each event, and other jobs' events are not mixed in."""
+    async def scenario():
+        bus = JobEventBus()
+        first, first_next = await _started(bus, 'job')
+        second, second_next = await _started(bus, 'job')
+        bus.publish('other', 'queued')
+        bus.publish('job', 'processing')
+        bus.publish('job', 'completed', video_path='v.mp4')
+        received = [[await first_next] + await _take(first, 1), [await second_next] + await _take(second, 1)]
+        await first.aclose()
+        await second.aclose()
+        return received
+
+    for events in asyncio.run(scenario()):
+        assert [(e['id'], e['stage']) for e in events] == [(1, 'processing'), (2, 'completed')]
+        assert events[1]['video_path'] == 'v.mp4'
+
+def test_late_subscribers_replay_after_last_event_id():
+    """Tests that a reconnect with Last-Event-ID gets only the missed events, then live ones."""
+    async def scenario():
+        bus = JobEventBus()
+        for stage in ('queued', 'processing', 'clip_rendered'):
+            bus.publish('job', stage)
+        subscription, next_event = await _started(bus, 'job', last_event_id=1)
+        bus.publish('job', 'completed')
+        events = [await next_event] + await _take(subscription, 2)
+        await subscription.aclose()
+        return events
+
+    assert [(e['id'], e['stage']) for e in asyncio.run(scenario())] == [
+        (2, 'processing'), (3, 'clip_rendered'), (4, 'completed'),
+    ]
+
+def test_events_published_during_replay_are_not_duplicated():
+    """Tests that an event both buffered and queued live is yielded once."""
+    async def scenario():
+        bus = JobEventBus()
+        bus.publish('job', 'queued')
+        subscription, next_event = await _started(bus, 'job')
+        bus.publish('job', 'processing')  # lands in the queue while the backlog is replayed
+        events = [await next_event] + await _take(subscription, 1)
+        bus.publish('job', 'completed')
+        events += await _take(subscription, 1)
+        await subscription.aclose()
+        return events
+
+    assert [e['id'] for e in asyncio.run(scenario())] == [1, 2, 3]
+
+def test_history_is_a_bounded_ring_buffer():
+    """Tests that only the last history_size events of a job are replayed."""
+    async def scenario():
+        bus = JobEventBus(history_size=3)
+        for n in range(10):
+            bus.publish('job', 'clip_rendered', clip_index=n)
+        subscription = bus.subscribe('job')
+        events = await _take(subscription, 3)
+        await subscription.aclose()
+        return events
+
+    assert [e['clip_index'] for e in asyncio.run(scenario())] == [7, 8, 9]
+
+def test_oldest_jobs_are_forgotten_past_max_jobs():
+    """Tests that the buffers of at most max_jobs jobs are kept, least recently active first out."""
+    bus = JobEventBus(max_jobs=2)
+    bus.publish('a', 'queued')
+    bus.publish('b', 'queued')
+    bus.publish('a', 'processing')
+    bus.publish('c', 'queued')
+
+    assert list(bus._history) == ['a', 'c']
+    assert bus.publish('b', 'processing')['id'] == 1
+
+def test_subscribers_are_removed_when_they_disconnect():
+    """Tests that closing a subscription (client gone) unregisters it."""
+    async def scenario():
+        bus = JobEventBus()
+        subscription, next_event = await _started(bus, 'job')
+        assert len(bus._subscribers['job']) == 1
+        next_event.cancel()
+        await asyncio.gather(next_event, return_exceptions=True)
+        await subscription.aclose()
+        return bus
+
+    bus = asyncio.run(scenario())
+    assert bus._subscribers == {}
+
+def test_heartbeat_yields_none_when_idle():
+    """Tests keep-alive ticks on a quiet subscription."""
+    async def scenario():
+        bus = JobEventBus()
+        subscription = bus.subscribe('job', heartbeat=0.01)
+        ticks = await _take(subscription, 2)
+        await subscription.aclose()
+        return ticks
+
+    assert asyncio.run(scenario()) == [None, None]
+
+def test_publish_from_a_worker_thread():
+    """Tests that events published off the event loop still reach subscribers."""
+    async def scenario():
+        bus = JobEventBus()
+        subscription, next_event = await _started(bus, 'job')
+        thread = threading.Thread(target=bus.publish, args=('job', 'stitching'))
+        thread.start()
+        event = await asyncio.wait_for(next_event, timeout=5)
+        thread.join()
+        await subscription.aclose()
+        return event
+
+    assert asyncio.run(scenario())['stage'] == 'stitching'
+
+def test_report_progress_swallows_callback_errors():
+    """Tests that a failing progress callback never breaks the pipeline."""
+    calls = []
+
+    def on_progress(stage, **data):
+        calls.append((stage, data))
+        raise RuntimeError('subscriber gone')
+
+    report_progress(on_progress, 'clip_rendered', clip_index=1)
+    report_progress(None, 'clip_rendered')
+
+    assert calls == [('clip_rendered', {'clip_index': 1})]
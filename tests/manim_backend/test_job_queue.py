@@ -0,0 +1,151 @@
+import pytest
+from job_queue import MemoryJobQueue, SQLiteJobQueue, create_job_queue
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def queue(request, tmp_path):
+    """Runs every test against both queue backends."""
+    if request.param == 'memory':
+        queue = MemoryJobQueue()
+    else:
+        queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    yield queue
+    queue.close()
+
+def test_claim_orders_by_priority_then_age(queue):
+    """Tests that higher priorities are claimed first and equal priorities in FIFO order."""
+    queue.enqueue('a', {'n': 1})
+    queue.enqueue('b', {'n': 2}, priority=-10)
+    queue.enqueue('c', {'n': 3}, priority=5)
+    queue.enqueue('d', {'n': 4})
+
+    claimed = [queue.claim('w')['job_id'] for _ in range(4)]
+
+    assert claimed == ['c', 'a', 'd', 'b']
+    assert queue.claim('w') is None
+
+def test_claim_returns_payload_and_counts_attempts(queue):
+    """Tests the claimed job record and the leased/queued counts."""
+    queue.enqueue('a', {'pdf_source': 'x.pdf'})
+
+    job = queue.claim('w1')
+
+    assert job == {'job_id': 'a', 'payload': {'pdf_source': 'x.pdf'}, 'attempts': 1}
+    assert queue.counts() == {'queued': 0, 'leased': 1}
+
+def test_enqueue_is_a_no_op_for_queued_or_leased_jobs(queue):
+    """Tests that enqueueing the same job twice neither duplicates nor re-queues it."""
+    queue.enqueue('a', {'n': 1})
+    queue.enqueue('a', {'n': 2}, priority=10)
+    assert queue.counts() == {'queued': 1, 'leased': 0}
+
+    assert queue.claim('w')['payload'] == {'n': 1}
+    queue.enqueue('a', {'n': 3})
+    assert queue.claim('w2') is None
+
+def test_heartbeat_only_extends_the_holders_lease(queue):
+    """Tests that a heartbeat keeps an expiring lease alive for its holder only."""
+    queue.enqueue('a', {})
+    queue.claim('w1', lease_seconds=-1)
+
+    assert queue.heartbeat('a', 'w2') is False
+    assert queue.heartbeat('a', 'w1', lease_seconds=60) is True
+    assert queue.reclaim_expired() == ([], [])
+    assert queue.heartbeat('missing', 'w1') is False
+
+def test_reclaim_requeues_expired_leases(queue):
+    """Tests that a job whose lease expired goes back to the queue for another worker."""
+    queue.enqueue('a', {})
+    queue.claim('w1', lease_seconds=-1)
+
+    assert queue.reclaim_expired() == (['a'], [])
+    assert queue.position('a') == 1
+    assert queue.heartbeat('a', 'w1') is False
+
+    job = queue.claim('w2')
+    assert job['job_id'] == 'a'
+    assert job['attempts'] == 2
+
+def test_reclaim_abandons_jobs_after_max_attempts(queue):
+    """Tests that a job that keeps expiring is dropped once it used up its attempts."""
+    queue.enqueue('a', {})
+    for _ in range(2):
+        queue.claim('w', lease_seconds=-1)
+        queue.reclaim_expired(max_attempts=2)
+
+    assert queue.counts() == {'queued': 0, 'leased': 0}
+    queue.enqueue('b', {})
+    queue.claim('w', lease_seconds=-1)
+    assert queue.reclaim_expired(max_attempts=1) == ([], ['b'])
+
+def test_complete_requires_the_lease_holder(queue):
+    """Tests that only the worker holding the lease can remove the job."""
+    queue.enqueue('a', {})
+    queue.claim('w1')
+
+    queue.complete('a', 'w2')
+    assert queue.counts() == {'queued': 0, 'leased': 1}
+    queue.complete('a', 'w1')
+    assert queue.counts() == {'queued': 0, 'leased': 0}
+
+def test_cancel_and_position_only_cover_waiting_jobs(queue):
+    """Tests queue positions and that leased jobs cannot be cancelled."""
+    queue.enqueue('a', {})
+    queue.enqueue('b', {})
+    queue.enqueue('c', {}, priority=1)
+
+    assert [queue.position(job_id) for job_id in ('c', 'a', 'b')] == [1, 2, 3]
+    assert queue.claim('w')['job_id'] == 'c'
+    assert queue.position('c') is None
+    assert queue.cancel('c') is False
+    assert queue.cancel('a') is True
+    assert queue.position('b') == 1
+    assert queue.cancel('a') is False
+
+def test_waiting_lists_jobs_in_claim_order(queue):
+    """Tests that waiting() matches the positions and leaves leased jobs out."""
+    queue.enqueue('a', {})
+    queue.enqueue('b', {}, priority=-10)
+    queue.enqueue('c', {}, priority=1)
+
+    assert queue.waiting() == ['c', 'a', 'b']
+    queue.claim('w')
+    assert queue.waiting() == ['a', 'b']
+
+def test_events_are_read_in_order_after_an_id(queue):
+    """Tests the progress event log relayed by the API."""
+    assert queue.last_event_id() == 0
+    queue.publish_event('a', 'processing')
+    queue.publish_event('a', 'clip_rendered', clip_index=0)
+    queue.publish_event('b', 'completed')
+
+    events = queue.read_events()
+    assert [(e['job_id'], e['stage']) for e in events] == [('a', 'processing'), ('a', 'clip_rendered'), ('b', 'completed')]
+    assert events[1]['data'] == {'clip_index': 0}
+    assert queue.last_event_id() == events[-1]['id']
+    assert [e['stage'] for e in queue.read_events(after_id=events[0]['id'], limit=1)] == ['clip_rendered']
+
+def test_prune_events_drops_old_events(queue):
+    """Tests that relayed events older than the cutoff are removed."""
+    queue.publish_event('a', 'processing')
+
+    queue.prune_events(max_age_seconds=3600)
+    assert len(queue.read_events()) == 1
+    queue.prune_events(max_age_seconds=-1)
+    assert queue.read_events() == []
+
+def test_sqlite_queue_is_shared_between_instances(tmp_path):
+    """Tests that a second process (here: instance) on the same file sees and leases the same jobs."""
+    api = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    worker = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    api.enqueue('a', {'n': 1})
+
+    assert worker.claim('w')['job_id'] == 'a'
+    assert api.claim('w2') is None
+    assert api.counts() == {'queued': 0, 'leased': 1}
+
+def test_create_job_queue_from_url(tmp_path):
+    """Tests the queue factory."""
+    assert isinstance(create_job_queue('memory://'), MemoryJobQueue)
+    assert isinstance(create_job_queue(f"sqlite:///{tmp_path / 'q.db'}"), SQLiteJobQueue)
+    with pytest.raises(ValueError):
+        create_job_queue('redis://localhost')
@@ -0,0 +1,229 @@
+import json
+import sqlite3
+import threading
+import pytest
+from job_store import SQLiteJobStore, create_job_store, migrate_json_jobs
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / 'jobs.db'))
+    yield store
+    store.close()
+
+def _job(job_id, status='pending', created_at='2026-01-01T00:00:00', **fields):
+    return {'job_id': job_id, 'status': status, 'created_at': created_at, **fields}
+
+def test_create_get_update_delete(store):
+    """Tests the basic lifecycle of a job record."""
+    store.create_job(_job('a', pdf_source='x.pdf'))
+
+    assert store.update_job('a', status='completed', video_path='out.mp4') is True
+    assert store.get_job('a') == _job('a', status='completed', pdf_source='x.pdf', video_path='out.mp4')
+    assert store.delete_job('a')['status'] == 'completed'
+    assert store.get_job('a') is None
+    assert store.delete_job('a') is None
+    assert store.update_job('a', status='failed') is False
+
+def test_create_job_rejects_duplicate_ids(store):
+    """Tests that job ids are unique."""
+    store.create_job(_job('a'))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        store.create_job(_job('a'))
+
+def test_artifacts_are_only_loaded_on_request(store):
+    """Tests that large fields live outside the job row."""
+    store.create_job(_job('a', generation_metrics={'clips': [1, 2, 3]}))
+
+    assert 'generation_metrics' not in store.get_job('a', include_artifacts=False)
+    assert store.get_job('a')['generation_metrics'] == {'clips': [1, 2, 3]}
+    assert 'generation_metrics' not in store.list_jobs()[0]
+    assert store.list_jobs(include_artifacts=True)[0]['generation_metrics'] == {'clips': [1, 2, 3]}
+
+    store.update_job('a', generation_metrics=None)
+    assert 'generation_metrics' not in store.get_job('a')
+
+def test_list_jobs_filters_by_status_and_batch(store):
+    """Tests the status and batch filters."""
+    store.create_job(_job('a', status='pending'))
+    store.create_job(_job('b', status='completed', batch_id='B'))
+    store.create_job(_job('c', status='failed', batch_id='B'))
+
+    assert {job['job_id'] for job in store.list_jobs(statuses=['completed', 'failed'])} == {'b', 'c'}
+    assert {job['job_id'] for job in store.list_jobs(batch_id='B')} == {'b', 'c'}
+    assert [job['job_id'] for job in store.list_jobs(statuses=['failed'], batch_id='B')] == ['c']
+    assert store.list_jobs(statuses=['processing']) == []
+
+def test_list_jobs_pages_newest_first_with_a_keyset_cursor(store):
+    """Tests the (created_at, job_id) cursor used by GET /jobs, including ties on created_at."""
+    for job_id, created_at in [('a', '2026-01-01'), ('b', '2026-01-02'), ('c', '2026-01-02'), ('d', '2026-01-03')]:
+        store.create_job(_job(job_id, created_at=created_at))
+
+    first = store.list_jobs(limit=2)
+    last = first[-1]
+    second = store.list_jobs(limit=2, before=(last['created_at'], last['job_id']))
+    last = second[-1]
+    third = store.list_jobs(limit=2, before=(last['created_at'], last['job_id']))
+
+    assert [job['job_id'] for job in first] == ['d', 'c']
+    assert [job['job_id'] for job in second] == ['b', 'a']
+    assert third == []
+    assert store.count_jobs() == 4
+
+def test_revision_changes_on_every_write(store):
+    """Tests the revision counter behind the GET /jobs ETag."""
+    start = store.revision()
+    store.create_job(_job('a'))
+    store.update_job('a', status='processing')
+    store.delete_job('a')
+
+    assert store.revision() == start + 3
+    store.list_jobs()
+    assert store.revision() == start + 3
+
+def test_claim_job_reuses_active_jobs_with_the_same_content(store):
+    """Tests that a second submission of the same content attaches to the running job."""
+    first, created = store.claim_job(_job('a', content_key='k'))
+    second, created_again = store.claim_job(_job('b', content_key='k'))
+
+    assert created is True
+    assert created_again is False
+    assert second['job_id'] == 'a'
+    assert store.get_job('b') is None
+
+def test_claim_job_reuses_completed_jobs_only_when_asked(store):
+    """Tests reuse_completed and that failed jobs are never reused."""
+    store.create_job(_job('done', status='completed', content_key='k'))
+    store.create_job(_job('broken', status='failed', content_key='f'))
+
+    assert store.claim_job(_job('a', content_key='k'))[0]['job_id'] == 'done'
+    job, created = store.claim_job(_job('b', content_key='k'), reuse_completed=False)
+    assert (job['job_id'], created) == ('b', True)
+    assert store.claim_job(_job('c', content_key='f'))[1] is True
+
+def test_claim_job_prefers_a_finished_job(store):
+    """Tests that a completed match wins over one that is still running."""
+    store.create_job(_job('running', status='processing', content_key='k', created_at='2026-01-02'))
+    store.create_job(_job('done', status='completed', content_key='k', created_at='2026-01-01'))
+
+    assert store.claim_job(_job('new', content_key='k'))[0]['job_id'] == 'done'
+
+def test_claim_job_matches_idempotency_keys_in_any_status(store):
+    """Tests that a retried request with the same Idempotency-Key gets the original job."""
+    store.create_job(_job('a', status='failed', idempotency_key='req-1'))
+
+    job, created = store.claim_job(_job('b', idempotency_key='req-1', content_key='other'))
+
+    assert (job['job_id'], created) == ('a', False)
+    assert store.find_by_idempotency_key('req-1')['job_id'] == 'a'
+    assert store.find_by_idempotency_key('req-2') is None
+
+def test_concurrent_updates_are_not_lost(store):
+    """Tests that updates from several threads all land (no read-modify-write races)."""
+    store.create_job(_job('a'))
+
+    def update(n):
+        for i in range(20):
+            store.update_job('a', **{f'field_{n}_{i}': i})
+
+    threads = [threading.Thread(target=update, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    job = store.get_job('a')
+    assert sum(1 for key in job if key.startswith('field_')) == 80
+
+def test_batches_roundtrip(store):
+    """Tests batch records and their status filter."""
+    store.create_batch({'batch_id': 'B1', 'status': 'submitting', 'created_at': '2026-01-01'})
+    store.create_batch({'batch_id': 'B2', 'status': 'rendering', 'created_at': '2026-01-02'})
+
+    assert store.update_batch('B1', status='generating', llm_batches=[{'id': 'x', 'job_ids': ['a']}]) is True
+    assert store.update_batch('missing', status='failed') is False
+    assert store.get_batch('B1')['llm_batches'] == [{'id': 'x', 'job_ids': ['a']}]
+    assert [batch['batch_id'] for batch in store.list_batches()] == ['B1', 'B2']
+    assert [batch['batch_id'] for batch in store.list_batches(['rendering'])] == ['B2']
+
+def test_batch_and_its_jobs_are_created_together(store):
+    """Tests that a batch is stored with its jobs in one revision."""
+    revision = store.revision()
+
+    store.create_batch({'batch_id': 'B', 'status': 'submitting', 'created_at': '2026-01-01'},
+                       [_job('a', status='batched', batch_id='B'), _job('b', status='batched', batch_id='B')])
+
+    assert store.revision() == revision + 1
+    assert [job['job_id'] for job in store.list_jobs(batch_id='B')] == ['b', 'a']
+
+def test_failed_batch_creation_leaves_nothing_behind(store):
+    """Tests that a job insert failing partway rolls back the batch and the jobs before it."""
+    store.create_job(_job('taken'))
+    revision = store.revision()
+
+    with pytest.raises(sqlite3.IntegrityError):
+        store.create_batch({'batch_id': 'B', 'status': 'submitting', 'created_at': '2026-01-01'},
+                           [_job('a', status='batched', batch_id='B'), _job('taken', status='batched', batch_id='B')])
+
+    assert store.get_batch('B') is None
+    assert store.get_job('a') is None
+    assert store.list_jobs(batch_id='B') == []
+    assert store.revision() == revision
+
+def test_older_databases_gain_the_added_columns(tmp_path):
+    """Tests that a database from before the dedup/batch columns is migrated in place."""
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at TEXT NOT NULL,"
+                 " updated_at TEXT NOT NULL, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO jobs VALUES ('old', 'completed', '2026-01-01', '2026-01-01', ?)",
+                 (json.dumps(_job('old', status='completed')),))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteJobStore(path)
+
+    assert store.get_job('old')['status'] == 'completed'
+    assert store.claim_job(_job('new', content_key='k', batch_id='B'))[1] is True
+    assert [job['job_id'] for job in store.list_jobs(batch_id='B')] == ['new']
+    store.close()
+
+def test_migrate_json_jobs_imports_once(tmp_path, store):
+    """Tests the one-shot import of the legacy jobs.json."""
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps({'a': {'status': 'completed', 'created_at': '2026-01-01'}, 'b': {}}))
+    store.create_job(_job('a', status='failed'))
+
+    assert migrate_json_jobs(str(path), store) == 1
+    assert store.get_job('a')['status'] == 'failed'
+    assert store.get_job('b')['status'] == 'failed'
+    assert not path.exists()
+    assert (tmp_path / 'jobs.json.migrated').exists()
+    assert migrate_json_jobs(str(path), store) == 0
+
+def test_migrate_json_jobs_leaves_a_corrupt_file(tmp_path, store):
+    """Tests that an unreadable jobs.json is reported, not treated as empty."""
+    path = tmp_path / 'jobs.json'
+    path.write_text('{not json')
+
+    assert migrate_json_jobs(str(path), store) == 0
+    assert path.exists()
+
+def test_create_job_store_from_url(tmp_path):
+    """Tests the store factory."""
+    assert isinstance(create_job_store(f"sqlite:///{tmp_path / 'j.db'}"), SQLiteJobStore)
+    with pytest.raises(ValueError):
+        create_job_store('postgres://localhost/jobs')
+
+def test_store_is_usable_after_close(store):
+    """Tests that close() (which only closes the calling thread's connection) does not break later use."""
+    store.create_job(_job('a'))
+    store.close()
+    seen = {}
+
+    thread = threading.Thread(target=lambda: seen.update(job=store.get_job('a')))
+    thread.start()
+    thread.join()
+
+    assert seen['job']['job_id'] == 'a'
+    assert store.get_job('a')['job_id'] == 'a'
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+pytest.importorskip('weave')
+import manim_generator
+
+BROKEN = "class SimpleScene(Scene):\n    def construct(self):\n        self.play(Oops())"
+FIXED = "class SimpleScene(Scene):\n    def construct(self):\n        self.wait(1)"
+
+@pytest.fixture
+def render(mocker):
+    """Stubs the Manim subprocess: code containing ``Oops`` fails with a NameError, anything else renders."""
+    async def fake_render(code, output_dir, clip_name, quality, errors):
+        if 'Oops' in code:
+            errors.append("NameError: name 'Oops' is not defined")
+            return None
+        return f"{output_dir}/{clip_name}.mp4"
+    return mocker.patch.object(manim_generator, 'generate_manim_video', new=AsyncMock(side_effect=fake_render))
+
+def _render_clip(clip, repair_code, on_progress=None):
+    return asyncio.run(manim_generator.render_manim_clip(clip, 0, 1, 'clips', on_progress=on_progress,
+                                                         repair_code=repair_code))
+
+def test_repaired_code_replaces_the_clip_code(render):
+    """Tests that a failed render is repaired with its error and the code that rendered is kept."""
+    repair = AsyncMock(return_value=FIXED)
+    clip = {'code': BROKEN}
+    events = []
+
+    path = _render_clip(clip, repair, on_progress=lambda stage, **data: events.append((stage, data)))
+
+    assert path == 'clips/manim_clip_000.mp4'
+    assert clip['code'] == FIXED
+    repair.assert_awaited_once_with(BROKEN, "NameError: name 'Oops' is not defined")
+    assert [stage for stage, _ in events] == ['clip_rendering', 'clip_repairing', 'clip_rendered']
+    assert events[-1][1]['repairs'] == 1
+
+def test_repair_stops_after_the_attempt_limit(render, monkeypatch):
+    """Tests that at most RENDER_REPAIR_ATTEMPTS fixes are requested and the last error is reported."""
+    monkeypatch.setattr(manim_generator, 'RENDER_REPAIR_ATTEMPTS', 2)
+    fixes = iter([BROKEN + "\n        # try 1", BROKEN + "\n        # try 2", FIXED])
+    repair = AsyncMock(side_effect=lambda code, error: next(fixes))
+    clip = {'code': BROKEN}
+    events = []
+
+    path = _render_clip(clip, repair, on_progress=lambda stage, **data: events.append((stage, data)))
+
+    assert path is None
+    assert repair.await_count == 2
+    assert render.await_count == 3
+    assert clip['code'] == BROKEN
+    assert events[-1] == ('clip_failed', {'clip_index': 0, 'total_clips': 1,
+                                          'error': "NameError: name 'Oops' is not defined"})
+
+def test_repair_stops_at_the_deadline(render, monkeypatch):
+    """Tests that no fix is requested once RENDER_REPAIR_SECONDS have passed."""
+    monkeypatch.setattr(manim_generator, 'RENDER_REPAIR_SECONDS', 0)
+    repair = AsyncMock(return_value=FIXED)
+
+    assert _render_clip({'code': BROKEN}, repair) is None
+    repair.assert_not_awaited()
+    assert render.await_count == 1
+
+def test_slow_repair_is_cut_off_at_the_deadline(render, monkeypatch):
+    """Tests that a fix still being written when the time is up counts as a failure."""
+    monkeypatch.setattr(manim_generator, 'RENDER_REPAIR_SECONDS', 0.05)
+
+    async def slow_repair(code, error):
+        await asyncio.sleep(5)
+        return FIXED
+
+    assert _render_clip({'code': BROKEN}, slow_repair) is None
+    assert render.await_count == 1
+
+def test_failed_repair_request_keeps_the_render_error(render):
+    """Tests that an exception from the repair call ends the loop with the render error."""
+    repair = AsyncMock(side_effect=RuntimeError('API down'))
+    events = []
+
+    path = _render_clip({'code': BROKEN}, repair, on_progress=lambda stage, **data: events.append((stage, data)))
+
+    assert path is None
+    assert render.await_count == 1
+    assert events[-1][1]['error'] == "NameError: name 'Oops' is not defined"
+
+def test_without_repair_a_failure_is_final(render):
+    """Tests that clips are rendered once when no repair function is given."""
+    assert _render_clip({'code': BROKEN}, None) is None
+    assert render.await_count == 1
+
+def test_render_exceptions_are_repaired_too(render):
+    """Tests that an exception raised by the render is treated like a failed render."""
+    render.side_effect = [RuntimeError('manim crashed'), 'clips/manim_clip_000.mp4']
+    repair = AsyncMock(return_value=FIXED)
+
+    assert _render_clip({'code': BROKEN}, repair) == 'clips/manim_clip_000.mp4'
+    repair.assert_awaited_once_with(BROKEN, 'manim crashed')
@@ -0,0 +1,118 @@
+import os
+import fitz
+import pytest
+import pdf_compress
+from pdf_compress import compress_pdf, recompress_images
+
+TEXT = "Results of the experiment"
+
+def _image_pdf(path, pages=1, side=600):
+    """A PDF with text and a large, incompressible (noise) image drawn two inches wide on each page."""
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), TEXT, fontsize=12)
+        pix = fitz.Pixmap(fitz.csRGB, side, side, bytearray(os.urandom(side * side * 3)), False)
+        page.insert_image(fitz.Rect(72, 100, 216, 244), pixmap=pix)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def _size_mb(path):
+    return os.path.getsize(path) / (1024 * 1024)
+
+def test_recompress_images_shrinks_and_keeps_text(tmp_path):
+    """Tests that images are downsampled to their displayed size while the text layer survives."""
+    source = _image_pdf(tmp_path / 'in.pdf')
+    output = str(tmp_path / 'out.pdf')
+
+    replaced = recompress_images(source, output, max_dpi=150, jpeg_quality=75)
+
+    assert replaced == 1
+    assert os.path.getsize(output) < os.path.getsize(source) / 2
+    with fitz.open(output) as doc:
+        assert TEXT in doc[0].get_text()
+        xref = doc[0].get_images(full=True)[0][0]
+        assert fitz.Pixmap(doc, xref).width <= 2 * 150
+
+def test_compress_pdf_returns_a_smaller_readable_pdf(tmp_path):
+    """Tests the whole ladder: the result is smaller, opens and still has every page and its text."""
+    source = _image_pdf(tmp_path / 'in.pdf', pages=2)
+    output = str(tmp_path / 'out.pdf')
+    target = _size_mb(source) / 4
+
+    result = compress_pdf(source, output, target_size_mb=target)
+
+    assert result == output
+    assert _size_mb(result) <= target
+    with fitz.open(result) as doc:
+        assert len(doc) == 2
+        assert TEXT in doc[1].get_text()
+
+def test_compress_pdf_passes_small_inputs_through(tmp_path, mocker):
+    """Tests that a PDF already within the target is returned unchanged without any work."""
+    source = _image_pdf(tmp_path / 'in.pdf', side=50)
+    before = open(source, 'rb').read()
+    recompress = mocker.spy(pdf_compress, 'recompress_images')
+
+    result = compress_pdf(source, str(tmp_path / 'out.pdf'), target_size_mb=_size_mb(source) + 1)
+
+    assert result == source
+    assert open(source, 'rb').read() == before
+    assert not os.path.exists(tmp_path / 'out.pdf')
+    recompress.assert_not_called()
+
+def test_compress_pdf_falls_back_to_rasterizing(tmp_path, mocker):
+    """Tests that pages are rasterized when recompressing images is not enough."""
+    source = _image_pdf(tmp_path / 'in.pdf')
+    mocker.patch.object(pdf_compress, 'IMAGE_SETTINGS', [(150, 75)])
+    rasterize = mocker.spy(pdf_compress, 'rasterize_pdf')
+
+    result = compress_pdf(source, str(tmp_path / 'out.pdf'), target_size_mb=0.01)
+
+    rasterize.assert_called_once()
+    assert _size_mb(result) < _size_mb(source)
+    with fitz.open(result) as doc:
+        assert len(doc) == 1
+
+def _gray_pages_pdf(path, pages):
+    """A PDF whose page i is filled with gray level 10 * i, so page order can be read back from pixels."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=200, height=200)
+        level = 10 * number / 255
+        page.draw_rect(page.rect, color=(level, level, level), fill=(level, level, level))
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def _page_levels(path):
+    with fitz.open(path) as doc:
+        return [round(page.get_pixmap().pixel(100, 100)[0] / 10) for page in doc]
+
+@pytest.fixture
+def pool_sizes(mocker):
+    """Records the max_workers of every process pool rasterize_pdf starts."""
+    sizes = []
+    real_pool = pdf_compress.ProcessPoolExecutor
+
+    def pool(max_workers):
+        sizes.append(max_workers)
+        return real_pool(max_workers=max_workers)
+    mocker.patch.object(pdf_compress, 'ProcessPoolExecutor', side_effect=pool)
+    return sizes
+
+@pytest.mark.parametrize('workers, expected_pools', [(2, [2]), (8, [5]), (1, [])])
+def test_rasterize_pdf_keeps_page_order_across_workers(tmp_path, monkeypatch, pool_sizes, workers, expected_pools):
+    """Tests that parallel rasterization keeps pages in order and never uses more workers than allowed or useful."""
+    monkeypatch.setattr(pdf_compress, 'RASTER_PAGES_PER_TASK', 3)
+    monkeypatch.setattr(pdf_compress, 'RASTER_WORKERS', workers)
+    source = _gray_pages_pdf(tmp_path / 'in.pdf', pages=13)  # 5 batches of at most 3 pages
+    output = str(tmp_path / 'out.pdf')
+
+    pdf_compress.rasterize_pdf(source, output, target_size_mb=5)
+
+    assert pool_sizes == expected_pools
+    assert _page_levels(output) == list(range(13))
+    with fitz.open(output) as doc:
+        assert not doc[0].get_text()  # rasterized: no text layer left
@@ -0,0 +1,110 @@
+import pytest
+import scene_validator
+from scene_validator import validate_scene
+
+def _scene(body, header=''):
+    """A SimpleScene whose construct runs ``body``, which starts on line 3 after ``header``."""
+    lines = '\n'.join('        ' + line for line in body.splitlines())
+    return f"{header}class SimpleScene(Scene):\n    def construct(self):\n{lines}\n"
+
+@pytest.fixture
+def manim_exports(monkeypatch):
+    """Pretends manim is installed and exports a few names, enabling the names tier."""
+    monkeypatch.setattr(scene_validator, 'manim_names', lambda: frozenset({'Scene', 'Circle', 'Create', 'BLUE'}))
+
+def test_valid_scene_has_no_problems(manim_exports):
+    """Tests that an ordinary scene passes every tier."""
+    code = _scene("circle = Circle(color=BLUE)\nself.play(Create(circle))\nself.wait(np.pi)",
+                  header="import math\n\n")
+
+    assert validate_scene(code) == []
+
+def test_syntax_error_is_reported_with_its_line():
+    """Tests the syntax tier."""
+    problems = validate_scene("class SimpleScene(Scene):\n    def construct(self)\n        pass\n")
+
+    assert len(problems) == 1
+    assert problems[0].startswith('line 2: syntax error')
+
+@pytest.mark.parametrize('code, problem', [
+    ("class OtherScene(Scene):\n    def construct(self):\n        pass\n", 'no top-level class SimpleScene'),
+    ("class SimpleScene(Scene):\n    def setup(self):\n        pass\n", 'class SimpleScene has no construct method'),
+])
+def test_structure_problems(code, problem):
+    """Tests that the scene class and its construct method are required."""
+    assert validate_scene(code) == [problem]
+
+@pytest.mark.parametrize('header', ['import os\n', 'import subprocess as sp\n', 'from pathlib import Path\n',
+                                    'from . import helpers\n'])
+def test_imports_outside_the_allow_list_are_rejected(header):
+    """Tests that only ALLOWED_IMPORTS may be imported."""
+    problems = validate_scene(_scene('self.wait(1)', header=header))
+
+    assert len(problems) == 1
+    assert 'is not allowed' in problems[0]
+
+def test_allowed_submodule_imports_pass():
+    """Tests that submodules of allowed packages are accepted."""
+    assert validate_scene(_scene('self.wait(1)', header='import numpy.linalg\nfrom manim.utils import color\n')) == []
+
+@pytest.mark.parametrize('body, problem', [
+    ("eval('1')", 'call to eval() is not allowed'),
+    ("open('/etc/passwd')", 'call to open() is not allowed'),
+    ("().__class__.__bases__[0].__subclasses__()", 'access to __bases__ is not allowed'),
+    ("self.construct.__globals__['os']", 'access to __globals__ is not allowed'),
+    ("while True:\n    self.wait(1)", 'infinite while loop'),
+])
+def test_disallowed_constructs_are_rejected(body, problem):
+    """Tests the disallowed calls, introspection dunders and endless loops."""
+    problems = validate_scene(_scene(body))
+
+    assert any(problem in p for p in problems)
+
+def test_introspection_chain_reports_every_dunder():
+    """Tests that each dangerous attribute in a chain is reported."""
+    problems = validate_scene(_scene('().__class__.__bases__[0].__subclasses__()'))
+
+    assert [p.split(': ', 1)[1] for p in problems] == [
+        'access to __subclasses__ is not allowed',
+        'access to __bases__ is not allowed',
+    ]
+
+def test_while_true_with_break_is_allowed():
+    """Tests that a bounded ``while True`` loop passes."""
+    assert validate_scene(_scene('n = 0\nwhile True:\n    n += 1\n    if n > 3:\n        break')) == []
+
+def test_legitimate_dunders_are_allowed(manim_exports):
+    """Tests that super().__init__ and self.__class__ are not mistaken for introspection."""
+    code = (
+        "class Label(Circle):\n"
+        "    def __init__(self, **kwargs):\n"
+        "        super().__init__(**kwargs)\n"
+        "\n"
+        "class SimpleScene(Scene):\n"
+        "    def construct(self):\n"
+        "        name = self.__class__.__name__\n"
+        "        self.play(Create(Label(color=BLUE)))\n"
+    )
+
+    assert validate_scene(code) == []
+
+def test_undefined_names_are_reported_once(manim_exports):
+    """Tests the names tier: names not bound in the scene, builtins or manim are reported."""
+    problems = validate_scene(_scene('self.play(Write(Circle()))\nself.play(Write(Square()))'))
+
+    assert problems == [
+        'line 3: name Write is not defined in the scene or in manim',
+        'line 4: name Square is not defined in the scene or in manim',
+    ]
+
+def test_names_tier_is_skipped_without_manim(monkeypatch):
+    """Tests that unknown names are not reported when manim cannot be imported."""
+    monkeypatch.setattr(scene_validator, 'manim_names', lambda: None)
+
+    assert validate_scene(_scene('self.play(Write(Square()))')) == []
+
+def test_names_tier_runs_only_after_the_other_tiers(manim_exports):
+    """Tests that disallowed constructs are reported without also listing undefined names."""
+    problems = validate_scene(_scene("eval('x')\nself.play(Write(Square()))"))
+
+    assert problems == ['line 3: call to eval() is not allowed']
@@ -0,0 +1,117 @@
+import pytest
+
+def _add_jobs(server, count, status='completed'):
+    """Stores ``count`` jobs, oldest first, with distinct creation times."""
+    ids = []
+    for n in range(count):
+        job_id = f"job-{n:02d}"
+        server.job_store.create_job({
+            "job_id": job_id, "status": status, "created_at": f"2026-01-01T00:00:{n:02d}",
+            "pdf_source": f"paper-{n}.pdf", "generation_metrics": {"clips": n},
+        })
+        ids.append(job_id)
+    return ids
+
+def test_jobs_are_listed_newest_first_without_artifacts(server, client):
+    """Tests the default listing: newest first, generation_metrics left out."""
+    _add_jobs(server, 3)
+
+    body = client.get('/jobs').json()
+
+    assert [job['job_id'] for job in body['jobs']] == ['job-02', 'job-01', 'job-00']
+    assert 'generation_metrics' not in body['jobs'][0]
+    assert body['next_cursor'] is None
+
+def test_cursor_paging_visits_every_job_once(server, client):
+    """Tests that following next_cursor pages through all jobs without gaps or repeats."""
+    ids = _add_jobs(server, 7)
+    seen, cursor = [], None
+
+    while True:
+        params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+        body = client.get('/jobs', params=params).json()
+        seen += [job['job_id'] for job in body['jobs']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == ids[::-1]
+
+def test_bad_cursor_is_a_400(client):
+    """Tests that a cursor that does not decode is rejected."""
+    response = client.get('/jobs', params={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid cursor'
+
+@pytest.mark.parametrize('fields, keys', [
+    ('status', {'job_id', 'status'}),
+    ('status,generation_metrics', {'job_id', 'status', 'generation_metrics'}),
+    ('status,unknown', {'job_id', 'status'}),
+])
+def test_fields_projection(server, client, fields, keys):
+    """Tests that fields limits each job to job_id plus the requested keys, artifacts included on request."""
+    _add_jobs(server, 1)
+
+    job, = client.get('/jobs', params={'fields': fields}).json()['jobs']
+
+    assert set(job) == keys
+
+def test_star_projection_includes_artifacts(server, client):
+    """Tests that fields=* returns everything, including generation_metrics."""
+    _add_jobs(server, 1)
+
+    job, = client.get('/jobs', params={'fields': '*'}).json()['jobs']
+
+    assert job['generation_metrics'] == {'clips': 0}
+    assert job['pdf_source'] == 'paper-0.pdf'
+
+def test_status_filter(server, client):
+    """Tests the comma-separated status filter."""
+    _add_jobs(server, 2)
+    server.job_store.update_job('job-00', status='failed')
+
+    body = client.get('/jobs', params={'status': 'failed, pending'}).json()
+
+    assert [job['job_id'] for job in body['jobs']] == ['job-00']
+
+def test_unchanged_listing_is_a_304(server, client):
+    """Tests that If-None-Match with the current ETag gets an empty 304."""
+    _add_jobs(server, 2)
+    first = client.get('/jobs')
+
+    again = client.get('/jobs', headers={'If-None-Match': first.headers['etag']})
+
+    assert again.status_code == 304
+    assert again.content == b''
+    assert again.headers['etag'] == first.headers['etag']
+
+def test_etag_changes_with_the_store_and_the_query(server, client):
+    """Tests that a job update or a different query gets a new ETag."""
+    _add_jobs(server, 2)
+    etag = client.get('/jobs').headers['etag']
+
+    assert client.get('/jobs', params={'limit': 1}).headers['etag'] != etag
+    server.job_store.update_job('job-00', video_name='Renamed')
+    response = client.get('/jobs', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+def test_etag_changes_when_queue_positions_move(server, client):
+    """Tests that a pending job's queue_position is never served stale from a 304."""
+    _add_jobs(server, 2, status='pending')
+    queue = server.render_pool.queue
+    queue.enqueue('job-00', {})
+    queue.enqueue('job-01', {})
+    first = client.get('/jobs', params={'fields': 'queue_position'})
+    assert [job['queue_position'] for job in first.json()['jobs']] == [2, 1]
+
+    # A worker takes job-00; job-01 moves up without the job store changing
+    revision = server.job_store.revision()
+    queue.claim('worker')
+    assert server.job_store.revision() == revision
+
+    response = client.get('/jobs', params={'fields': 'queue_position'},
+                          headers={'If-None-Match': first.headers['etag']})
+    assert response.status_code == 200
+    assert response.json()['jobs'][0]['queue_position'] == 1
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+from types import SimpleNamespace
+
+pytest.importorskip('fastapi')
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+import upload_ingest
+from upload_ingest import UploadLimitMiddleware, UploadTooLargeError, save_upload
+
+class RecordingFile(io.BytesIO):
+    """In-memory upload that records the size of every read and can fail partway through."""
+
+    def __init__(self, data, fail_after=None):
+        super().__init__(data)
+        self.reads = []
+        self.fail_after = fail_after
+
+    def read(self, size=-1):
+        if self.fail_after is not None and len(self.reads) == self.fail_after:
+            raise OSError('client disconnected')
+        self.reads.append(size)
+        return super().read(size)
+
+def _save(data, dest, max_bytes=upload_ingest.MAX_UPLOAD_BYTES, fail_after=None):
+    source = RecordingFile(data, fail_after)
+    result = asyncio.run(save_upload(SimpleNamespace(file=source), str(dest), max_bytes))
+    return result, source
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(upload_ingest, 'UPLOAD_CHUNK_SIZE', 10)
+
+def test_save_upload_streams_in_chunks(small_chunks, tmp_path):
+    """Tests that the upload is copied chunk by chunk, never read whole."""
+    data = b'%PDF-' + b'x' * 95
+    dest = tmp_path / 'upload.pdf'
+
+    (size, digest), source = _save(data, dest)
+
+    assert size == 100
+    assert dest.read_bytes() == data
+    assert set(source.reads) == {10}
+    assert len(source.reads) == 11  # ten full chunks and the empty read at the end
+
+def test_save_upload_returns_the_content_hash(tmp_path):
+    """Tests the sha256 used to deduplicate jobs: same bytes, same hash; different bytes, different hash."""
+    (_, first), _ = _save(b'%PDF-same', tmp_path / 'a.pdf')
+    (_, again), _ = _save(b'%PDF-same', tmp_path / 'b.pdf')
+    (_, other), _ = _save(b'%PDF-other', tmp_path / 'c.pdf')
+
+    assert first == hashlib.sha256(b'%PDF-same').hexdigest()
+    assert first == again
+    assert first != other
+
+def test_save_upload_rejects_oversized_files_and_removes_them(small_chunks, tmp_path):
+    """Tests that the copy stops past max_bytes and leaves no partial file behind."""
+    dest = tmp_path / 'upload.pdf'
+
+    with pytest.raises(UploadTooLargeError):
+        _save(b'x' * 100, dest, max_bytes=35)
+
+    assert not dest.exists()
+
+def test_save_upload_at_the_limit_is_accepted(small_chunks, tmp_path):
+    """Tests that exactly max_bytes is still fine."""
+    (size, _), _ = _save(b'x' * 40, tmp_path / 'upload.pdf', max_bytes=40)
+
+    assert size == 40
+
+def test_aborted_upload_leaves_no_partial_file(small_chunks, tmp_path):
+    """Tests that a read failing midway removes what was written so far."""
+    dest = tmp_path / 'upload.pdf'
+
+    with pytest.raises(OSError):
+        _save(b'x' * 100, dest, fail_after=3)
+
+    assert not os.path.exists(dest)
+
+MAX_BODY = 100
+
+@pytest.fixture
+def limited_client():
+    """An app echoing the body size of POST /upload, limited to MAX_BODY bytes, and an unlimited /other."""
+    app = FastAPI()
+
+    @app.post('/upload')
+    async def upload(request: Request):
+        return {'size': len(await request.body())}
+
+    @app.post('/other')
+    async def other(request: Request):
+        return {'size': len(await request.body())}
+
+    app.add_middleware(UploadLimitMiddleware, paths=['/upload'], max_bytes=MAX_BODY)
+    return TestClient(app)
+
+def _chunked(total, chunk=30):
+    """A body without Content-Length, sent in pieces."""
+    def body():
+        for start in range(0, total, chunk):
+            yield b'x' * min(chunk, total - start)
+    return body()
+
+def test_body_within_the_limit_passes(limited_client):
+    """Tests that bodies up to the limit reach the app, with or without Content-Length."""
+    assert limited_client.post('/upload', content=b'x' * MAX_BODY).json() == {'size': MAX_BODY}
+    assert limited_client.post('/upload', content=_chunked(MAX_BODY)).json() == {'size': MAX_BODY}
+
+def test_oversized_body_with_content_length_is_a_413(limited_client):
+    """Tests that a declared oversized body is refused up front."""
+    response = limited_client.post('/upload', content=b'x' * (MAX_BODY + 1))
+
+    assert response.status_code == 413
+    assert 'File too large' in response.json()['detail']
+
+def test_oversized_chunked_body_is_a_413(limited_client):
+    """Tests that a body without Content-Length is cut off once it grows past the limit."""
+    response = limited_client.post('/upload', content=_chunked(MAX_BODY * 3))
+
+    assert response.status_code == 413
+
+def test_other_paths_are_not_limited(limited_client):
+    """Tests that the limit only applies to the configured paths."""
+    assert limited_client.post('/other', content=b'x' * (MAX_BODY * 3)).json() == {'size': MAX_BODY * 3}
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock
+
+pytest.importorskip('moviepy')
+pytest.importorskip('weave')
+import video_generator
+from config_cache import ConfigResponseCache
+from workspace import JobWorkspace
+
+def _clip(n):
+    return {"type": "manim", "code": f"class SimpleScene(Scene):\n    def construct(self):\n        self.wait({n})",
+            "voice_over": f"clip {n}"}
+
+@pytest.fixture
+def repair(mocker):
+    """Keeps the config stages offline and answers every repair request with a valid clip."""
+    mocker.patch.object(video_generator, 'config_cache_key_parts', return_value={'pdf': 'hash', 'prompt': ''})
+    mocker.patch.object(video_generator, 'ConfigResponseCache')
+    return mocker.patch.object(video_generator, 'repair_clip_config', new=AsyncMock(
+        side_effect=lambda fragment, error, index, user_prompt: json.dumps(_clip(index))
+    ))
+
+def _stream(config_text, workspace, metrics):
+    async def collect():
+        return [item async for item in video_generator._stream_config_clips(
+            'paper.pdf', '', False, workspace, metrics=metrics, batch_config=config_text
+        )]
+    return asyncio.run(collect())
+
+def test_only_broken_clips_within_the_limit_are_repaired(repair, tmp_path):
+    """Tests that each broken clip is re-requested on its own and clips past MAX_CLIPS are ignored."""
+    clips = [json.dumps(_clip(n)) for n in range(video_generator.MAX_CLIPS + 2)]
+    clips[1] = '{"type": "manim", "voice_over": "no code"}'
+    clips[video_generator.MAX_CLIPS + 1] = '{"type": "manim"}'
+    metrics = {}
+
+    streamed = _stream('{"clips": [' + ', '.join(clips) + ']}', JobWorkspace('job', root=str(tmp_path)), metrics)
+
+    assert [index for index, _ in streamed] == [0, 2, 3, 1]
+    assert streamed[-1][1] == _clip(1)
+    repair.assert_awaited_once()
+    assert repair.await_args.args[2] == 1
+    assert metrics['broken_clips'] == 1
+    assert metrics['repaired_clips'] == 1
+
+def test_unrepairable_clips_are_left_out(repair, tmp_path):
+    """Tests that a clip whose repairs keep failing is dropped while the others are kept."""
+    repair.side_effect = lambda fragment, error, index, user_prompt: '{"type": "manim"}'
+    config = {"clips": [_clip(0), {"type": "manim", "voice_over": "no code"}]}
+    metrics = {}
+
+    streamed = _stream(json.dumps(config), JobWorkspace('job', root=str(tmp_path)), metrics)
+
+    assert streamed == [(0, _clip(0))]
+    assert repair.await_count == video_generator.CLIP_REPAIR_ATTEMPTS
+    assert metrics['repaired_clips'] == 0
+
+def test_config_without_clips_fails(repair, tmp_path):
+    """Tests that a response with no clips array is an error rather than an empty video."""
+    with pytest.raises(ValueError):
+        _stream('{"scenes": []}', JobWorkspace('job', root=str(tmp_path)), {})
+
+@pytest.fixture
+def response_cache(mocker, tmp_path):
+    """A real config response cache in tmp_path, holding a response for the paper."""
+    cache = ConfigResponseCache(root=str(tmp_path / 'config_cache'))
+    mocker.patch.object(video_generator, 'ConfigResponseCache', return_value=cache)
+    mocker.patch.object(video_generator, 'config_cache_key_parts', return_value={'pdf': 'hash', 'prompt': ''})
+    cache.put(video_generator.cache_key(pdf='hash', prompt=''), json.dumps({"clips": [_clip(0)]}))
+    return cache
+
+@pytest.fixture
+def claude(mocker):
+    """Streams a one-clip config in place of Claude."""
+    async def stream(pdf_source, user_prompt, use_base64=False, on_start=None):
+        yield json.dumps({"clips": [_clip(7)]})
+    return mocker.patch.object(video_generator, 'stream_video_config_with_smart_docs', side_effect=stream)
+
+def _stream_source(workspace, use_cache=True):
+    metrics = {}
+    async def collect():
+        return [item async for item in video_generator._stream_config_clips(
+            'paper.pdf', '', False, workspace, use_cache=use_cache, metrics=metrics
+        )]
+    return asyncio.run(collect()), metrics
+
+def test_cached_response_is_reused(response_cache, claude, tmp_path):
+    """Tests that a cached config is used without asking Claude."""
+    streamed, metrics = _stream_source(JobWorkspace('job', root=str(tmp_path)))
+
+    assert streamed == [(0, _clip(0))]
+    assert metrics['source'] == 'response_cache'
+    claude.assert_not_called()
+
+@pytest.mark.parametrize('use_cache, bypass', [(False, False), (True, True)])
+def test_bypass_asks_claude_and_stores_the_fresh_response(response_cache, claude, monkeypatch, tmp_path,
+                                                          use_cache, bypass):
+    """Tests use_cache=False and CONFIG_CACHE_BYPASS: Claude is asked and its answer replaces the entry."""
+    monkeypatch.setattr(video_generator, 'CONFIG_CACHE_BYPASS', bypass)
+
+    streamed, metrics = _stream_source(JobWorkspace('job', root=str(tmp_path)), use_cache=use_cache)
+
+    assert streamed == [(0, _clip(7))]
+    assert metrics['source'] == 'claude'
+    claude.assert_called_once()
+    assert json.loads(response_cache.get(video_generator.cache_key(pdf='hash', prompt=''))) == {"clips": [_clip(7)]}
+
+def test_outro_asset_is_found_from_any_working_directory(mocker, monkeypatch, tmp_path):
+    """Tests that the pre-rendered outro is resolved from the backend directory, not the CWD."""
+    generate = mocker.patch.object(video_generator, 'generate_veo_thank_you_clip')
+    asset = tmp_path / 'backend' / 'clips' / 'thank_you_with_audio.mp4'
+    asset.parent.mkdir(parents=True)
+    asset.write_bytes(b'mp4')
+    monkeypatch.setattr(video_generator, 'THANK_YOU_CLIP', str(asset))
+    monkeypatch.chdir(tmp_path)
+
+    assert video_generator.thank_you_clip_path(str(tmp_path / 'job')) == str(asset)
+    generate.assert_not_called()
+
+def test_outro_is_generated_into_the_job_workspace_without_the_asset(mocker, monkeypatch, tmp_path):
+    """Tests that a missing asset makes a fresh outro inside the job's own directory."""
+    generate = mocker.patch.object(video_generator, 'generate_veo_thank_you_clip', side_effect=lambda path: path)
+    monkeypatch.setattr(video_generator, 'THANK_YOU_CLIP', str(tmp_path / 'missing.mp4'))
+    job_dir = tmp_path / 'job'
+
+    path = video_generator.thank_you_clip_path(str(job_dir))
+
+    assert path == str(job_dir / 'thank_you' / 'thank_you_veo.mp4')
+    assert (job_dir / 'thank_you').is_dir()
+    generate.assert_called_once_with(path)
+
+@pytest.mark.skipif('THANK_YOU_CLIP' in os.environ, reason='outro asset location overridden')
+def test_default_outro_asset_sits_next_to_the_module():
+    """Tests that the default asset location is absolute, under the backend's clips/ directory."""
+    backend_dir = os.path.dirname(os.path.abspath(video_generator.__file__))
+
+    assert video_generator.THANK_YOU_CLIP == os.path.join(backend_dir, 'clips', 'thank_you_with_audio.mp4')
+
+@pytest.fixture
+def pipeline(repair, mocker):
+    """Stubs rendering, voice-over, muxing and stitching with writers of small files."""
+    def write(path, data=b'data'):
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    async def render(clip_config, i, total, clips_dir, quality, on_progress, repair_code, render_slots):
+        return write(os.path.join(clips_dir, f"clip_{i}.mp4"))
+
+    return {
+        'render': mocker.patch.object(video_generator, 'render_manim_clip', new=AsyncMock(side_effect=render)),
+        'voice': mocker.patch.object(video_generator, 'generate_voice',
+                                     new=AsyncMock(side_effect=lambda text, path: write(path))),
+        'mux': mocker.patch.object(video_generator, 'combine_video_with_audio_sync',
+                                   side_effect=lambda video, audio, path: write(path)),
+        'stitch': mocker.patch.object(video_generator, 'stitch_videos',
+                                      side_effect=lambda paths, path, add_thank_you: write(path)),
+        'audio': mocker.patch.object(video_generator, 'clip_has_audio', return_value=True),
+    }
+
+def _generate(workspace, config_text):
+    return asyncio.run(video_generator._generate_summary_video(
+        'paper.pdf', '', False, workspace, batch_config=config_text
+    ))
+
+def test_rerun_resumes_after_the_last_finished_clip(pipeline, tmp_path):
+    """Tests that a job that died mid-clip redoes only the unfinished clip on the same workspace."""
+    config_text = json.dumps({"clips": [_clip(0), _clip(1)]})
+    workspace = JobWorkspace('job', root=str(tmp_path))
+    render = pipeline['render'].side_effect
+
+    async def crash_on_clip_1(clip_config, i, *args):
+        if i == 1:
+            while not workspace.restore('clip_0_muxed'):
+                await asyncio.sleep(0.01)
+            raise RuntimeError('worker killed')
+        return await render(clip_config, i, *args)
+
+    pipeline['render'].side_effect = crash_on_clip_1
+    with pytest.raises(RuntimeError):
+        _generate(workspace, config_text)
+
+    pipeline['render'].reset_mock()
+    pipeline['voice'].reset_mock()
+    pipeline['render'].side_effect = render
+    result = _generate(JobWorkspace('job', root=str(tmp_path)), json.dumps({"clips": [_clip(5)]}))
+
+    assert [call.args[1] for call in pipeline['render'].await_args_list] == [1]
+    pipeline['voice'].assert_not_awaited()  # clip 1's audio was checkpointed before the crash
+    assert result['clips_config'] == [_clip(0), _clip(1)]  # the saved config, not the new one
+    stitched_paths = pipeline['stitch'].call_args.args[0]
+    assert [os.path.basename(path) for path in stitched_paths] == ['final_0.mp4', 'final_1.mp4']
+    assert result['config_metrics']['source'] == 'checkpoint'
+
+def test_rerun_after_stitching_reuses_the_video(pipeline, tmp_path):
+    """Tests that a job that died after stitching (e.g. while moving the output) does no work again."""
+    config_text = json.dumps({"clips": [_clip(0)]})
+    first = _generate(JobWorkspace('job', root=str(tmp_path)), config_text)
+    for stub in pipeline.values():
+        stub.reset_mock()
+
+    again = _generate(JobWorkspace('job', root=str(tmp_path)), config_text)
+
+    assert again['video_path'] == first['video_path']
+    pipeline['render'].assert_not_awaited()
+    pipeline['voice'].assert_not_awaited()
+    pipeline['stitch'].assert_not_called()
@@ -0,0 +1,219 @@
+import asyncio
+import pytest
+from job_queue import MemoryJobQueue
+from worker_pool import QueueFullError, RenderWorkerPool
+
+async def _noop(job_id, payload):
+    pass
+
+def _pool(runner=_noop, **kwargs):
+    return RenderWorkerPool(MemoryJobQueue(), runner, **kwargs)
+
+async def _until(condition, timeout=5):
+    """Waits for ``condition()`` to hold, polling the event loop."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, 'condition not reached in time'
+        await asyncio.sleep(0.01)
+
+def test_submit_returns_queue_positions():
+    """Tests that submitted jobs are queued in order and report their position."""
+    pool = _pool(max_queue_depth=5)
+
+    positions = [pool.submit(job_id, {}) for job_id in ('a', 'b', 'c')]
+
+    assert positions == [1, 2, 3]
+    assert pool.position('b') == 2
+    assert pool.stats()['queued'] == 3
+
+def test_submit_past_the_depth_raises_queue_full():
+    """Tests that the pool is full at max_queue_depth and refuses further jobs without queueing them."""
+    pool = _pool(max_queue_depth=2)
+    pool.submit('a', {})
+    assert not pool.is_full()
+    pool.submit('b', {})
+
+    assert pool.is_full()
+    with pytest.raises(QueueFullError) as error:
+        pool.submit('c', {})
+    assert error.value.retry_after == pool.retry_after()
+    assert pool.position('c') is None
+
+def test_leased_jobs_do_not_count_towards_the_depth():
+    """Tests that only waiting jobs fill the queue."""
+    pool = _pool(max_queue_depth=1)
+    pool.submit('a', {})
+    pool.queue.claim('worker')
+
+    assert not pool.is_full()
+
+@pytest.mark.parametrize('queued, workers, expected', [
+    (0, 2, 50),    # a slot is one average job away, split across workers
+    (4, 2, 50),    # full: the next slot frees after one job
+    (6, 2, 150),   # over the depth (e.g. jobs queued by another process)
+    (4, 0, 100),   # no local workers still gives an estimate
+])
+def test_retry_after_estimate(queued, workers, expected):
+    """Tests that Retry-After scales with the jobs ahead and the average job duration."""
+    pool = _pool(max_workers=workers, max_queue_depth=4, initial_job_seconds=100)
+    for n in range(queued):
+        pool.queue.enqueue(f"job-{n}", {})
+
+    assert pool.retry_after() == expected
+
+def test_retry_after_is_at_least_a_second():
+    """Tests that very fast jobs never produce Retry-After: 0."""
+    pool = _pool(initial_job_seconds=0.01)
+
+    assert pool.retry_after() == 1
+
+def test_workers_run_jobs_and_complete_them():
+    """Tests that started workers drain the queue and remove finished jobs from it."""
+    ran = []
+
+    async def runner(job_id, payload):
+        ran.append((job_id, payload))
+
+    async def scenario():
+        pool = _pool(runner, max_workers=2, poll_interval=0.01)
+        pool.start()
+        pool.submit('a', {'n': 1})
+        pool.submit('b', {'n': 2})
+        await _until(lambda: pool.queue.counts() == {'queued': 0, 'leased': 0})
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+    assert sorted(ran) == [('a', {'n': 1}), ('b', {'n': 2})]
+
+def test_failing_jobs_do_not_stop_the_worker():
+    """Tests that a runner exception is contained and the next job still runs."""
+    ran = []
+
+    async def runner(job_id, payload):
+        ran.append(job_id)
+        if job_id == 'a':
+            raise RuntimeError('render failed')
+
+    async def scenario():
+        pool = _pool(runner, max_workers=1, poll_interval=0.01)
+        pool.start()
+        pool.submit('a', {})
+        pool.submit('b', {})
+        await _until(lambda: ran == ['a', 'b'] and pool.queue.counts()['leased'] == 0)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+def test_heartbeats_keep_the_lease_of_a_long_job():
+    """Tests that a job running for several lease periods is not reclaimed by another pool."""
+    release = None
+
+    async def runner(job_id, payload):
+        await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        pool = _pool(runner, max_workers=1, lease_seconds=0.06, poll_interval=0.01)
+        other = RenderWorkerPool(pool.queue, runner, max_workers=0)
+        pool.start()
+        pool.submit('a', {})
+        await _until(lambda: 'a' in pool._running)
+
+        await asyncio.sleep(0.3)
+        other._reclaim()
+        leased = pool.queue.counts()['leased']
+        release.set()
+        await _until(lambda: pool.queue.counts()['leased'] == 0)
+        await pool.stop()
+        return leased
+
+    assert asyncio.run(scenario()) == 1
+
+def test_lost_lease_cancels_the_job():
+    """Tests that a worker whose heartbeat is refused stops the job it no longer owns."""
+    cancelled = []
+
+    async def runner(job_id, payload):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(job_id)
+            raise
+
+    async def scenario():
+        pool = _pool(runner, max_workers=1, lease_seconds=0.06, poll_interval=0.01)
+        pool.queue.heartbeat = lambda job_id, worker_id, lease_seconds: False
+        pool.start()
+        pool.submit('a', {})
+        await _until(lambda: cancelled)
+        await _until(lambda: not pool._running)
+        running = bool(pool._workers) and not any(task.done() for task in pool._workers)
+        await pool.stop()
+        return running
+
+    assert asyncio.run(scenario())
+    assert cancelled == ['a']
+
+def test_expired_leases_of_dead_workers_are_reclaimed_and_rerun():
+    """Tests that a job leased by a worker that died is re-queued and run by a live worker."""
+    ran = []
+
+    async def runner(job_id, payload):
+        ran.append(job_id)
+
+    async def scenario():
+        pool = _pool(runner, max_workers=1, poll_interval=0.01)
+        pool.submit('a', {})
+        pool.queue.claim('dead-worker', lease_seconds=0)
+        pool.start()
+        await _until(lambda: pool.queue.counts() == {'queued': 0, 'leased': 0})
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+    assert ran == ['a']
+
+def test_jobs_past_max_attempts_are_abandoned():
+    """Tests that a job whose workers keep dying is dropped and reported to on_abandoned."""
+    abandoned = []
+    pool = _pool(max_attempts=2, on_abandoned=abandoned.append)
+    pool.submit('a', {})
+    pool.queue.claim('dead-1', lease_seconds=0)
+    pool._reclaim()
+    pool.queue.claim('dead-2', lease_seconds=0)
+
+    pool._reclaim()
+
+    assert abandoned == ['a']
+    assert pool.queue.counts() == {'queued': 0, 'leased': 0}
+
+def test_full_queue_is_a_429_with_retry_after(server, client, mocker):
+    """Tests that submissions over the queue depth get 429 plus Retry-After and leave no job behind."""
+    fetch = mocker.patch.object(server, 'fetch_url_validators')
+    for n in range(server.render_pool.max_queue_depth):
+        server.render_pool.submit(f"queued-{n}", {})
+
+    response = client.post('/generate-video-url', json={'pdf_url': 'https://example.com/paper.pdf'})
+
+    assert response.status_code == 429
+    assert int(response.headers['retry-after']) == server.render_pool.retry_after()
+    fetch.assert_not_called()
+    assert server.job_store.count_jobs() == 0
+
+def test_queue_filling_during_admission_is_a_429(server, client, mocker):
+    """Tests that a job claimed while the queue filled up is removed again and answered with 429."""
+    async def fill_queue(url):
+        for n in range(server.render_pool.max_queue_depth):
+            server.render_pool.submit(f"queued-{n}", {})
+        return {}
+
+    mocker.patch.object(server, 'fetch_url_validators', side_effect=fill_queue)
+
+    response = client.post('/generate-video-url', json={'pdf_url': 'https://example.com/paper.pdf'})
+
+    assert response.status_code == 429
+    assert 'retry-after' in response.headers
+    assert server.job_store.count_jobs() == 0
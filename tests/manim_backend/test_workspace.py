@@ -0,0 +1,110 @@
+import json
+import os
+import time
+import workspace as workspace_module
+from workspace import MANIFEST_NAME, JobWorkspace, sweep_expired_workspaces
+
+def _write(path, data=b'data'):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def _age(path, seconds):
+    """Makes a file or directory look last written ``seconds`` ago."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def test_checkpoint_round_trip(tmp_path):
+    """Tests that a checkpoint written by one run is restored, with its data, by a later one."""
+    first = JobWorkspace('job', root=str(tmp_path))
+    video = _write(first.path('clips', 'clip_0.mp4'))
+    first.checkpoint('clip_0_video', video, duration=4.5)
+
+    restored = JobWorkspace('job', root=str(tmp_path)).restore('clip_0_video')
+
+    assert restored == {'path': video, 'duration': 4.5}
+    manifest = json.loads((tmp_path / 'job' / MANIFEST_NAME).read_text())
+    assert manifest['clip_0_video']['path'] == os.path.join('clips', 'clip_0.mp4')  # relative, so the root can move
+
+def test_checkpoints_accumulate_and_overwrite(tmp_path):
+    """Tests that each stage keeps its own entry and a stage checkpointed again keeps the latest."""
+    workspace = JobWorkspace('job', root=str(tmp_path))
+    workspace.checkpoint('config', _write(workspace.path('config.json')))
+    workspace.checkpoint('clip_0_video', _write(workspace.path('a.mp4')))
+    workspace.checkpoint('clip_0_video', _write(workspace.path('b.mp4')))
+
+    assert set(workspace.load_manifest()) == {'config', 'clip_0_video'}
+    assert workspace.restore('clip_0_video')['path'] == workspace.path('b.mp4')
+    assert not os.path.exists(workspace.path(MANIFEST_NAME + '.tmp'))
+
+def test_restore_ignores_missing_stages_and_files(tmp_path):
+    """Tests that a stage never checkpointed, or whose file is gone, is not restored."""
+    workspace = JobWorkspace('job', root=str(tmp_path))
+    video = _write(workspace.path('clip.mp4'))
+    workspace.checkpoint('clip_0_video', video)
+    os.remove(video)
+
+    assert workspace.restore('clip_0_video') is None
+    assert workspace.restore('stitched') is None
+
+def test_unreadable_manifest_starts_over(tmp_path):
+    """Tests that a corrupt manifest is treated as no checkpoints rather than failing the job."""
+    workspace = JobWorkspace('job', root=str(tmp_path))
+    _write(workspace.path(MANIFEST_NAME), b'{"config": ')
+
+    assert workspace.load_manifest() == {}
+    assert workspace.restore('config') is None
+
+def test_workspace_is_removed_on_exit_unless_kept(tmp_path):
+    """Tests the context manager: cleaned up by default, kept with cleanup=False for retries."""
+    with JobWorkspace('scratch', root=str(tmp_path)) as scratch:
+        _write(scratch.path('file'))
+    with JobWorkspace('kept', root=str(tmp_path), cleanup=False) as kept:
+        _write(kept.path('file'))
+
+    assert not os.path.exists(scratch.root)
+    assert os.path.exists(kept.path('file'))
+
+def test_sweep_removes_workspaces_unused_for_the_ttl(tmp_path):
+    """Tests that old workspaces go, recent ones and those of running jobs stay."""
+    for job_id in ('old', 'recent', 'running'):
+        workspace = JobWorkspace(job_id, root=str(tmp_path))
+        workspace.checkpoint('config', _write(workspace.path('config.json')))
+    _age(tmp_path / 'old' / MANIFEST_NAME, 7200)
+    _age(tmp_path / 'running' / MANIFEST_NAME, 7200)
+
+    removed = sweep_expired_workspaces(str(tmp_path), ttl_seconds=3600, keep={'running'})
+
+    assert removed == ['old']
+    assert sorted(os.listdir(tmp_path)) == ['recent', 'running']
+
+def test_sweep_ages_workspaces_by_their_last_checkpoint(tmp_path):
+    """Tests that a recent checkpoint keeps an old directory, and a workspace without one ages by the directory."""
+    checkpointed = JobWorkspace('checkpointed', root=str(tmp_path))
+    checkpointed.checkpoint('config', _write(checkpointed.path('config.json')))
+    JobWorkspace('empty', root=str(tmp_path))
+    _age(checkpointed.root, 7200)
+    _age(tmp_path / 'empty', 7200)
+
+    assert sweep_expired_workspaces(str(tmp_path), ttl_seconds=3600) == ['empty']
+
+def test_sweep_of_a_missing_root_is_a_no_op(tmp_path):
+    """Tests that sweeping before any job ran does not fail."""
+    assert sweep_expired_workspaces(str(tmp_path / 'nothing'), ttl_seconds=0) == []
+
+def test_server_sweep_keeps_workspaces_of_jobs_that_may_still_run(server, monkeypatch, tmp_path):
+    """Tests that the server sweeps failed and deleted jobs' workspaces but not active or batched ones."""
+    root = tmp_path / 'workspaces'
+    for job_id, status in [('failed', 'failed'), ('pending', 'pending'), ('batched', 'batched')]:
+        server.job_store.create_job({'job_id': job_id, 'status': status, 'created_at': '2026-01-01T00:00:00',
+                                     'pdf_source': 'paper.pdf'})
+    for job_id in ('failed', 'pending', 'batched', 'deleted'):
+        workspace = JobWorkspace(job_id, root=str(root))
+        workspace.checkpoint('config', _write(workspace.path('config.json')))
+        _age(workspace.path(MANIFEST_NAME), workspace_module.WORKSPACE_TTL_SECONDS + 60)
+    monkeypatch.setattr(server, 'sweep_expired_workspaces',
+                        lambda keep: sweep_expired_workspaces(str(root), keep=keep))
+
+    server.sweep_workspaces()
+
+    assert sorted(os.listdir(root)) == ['batched', 'pending']
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from api.services.ai_content_generator import generate_and_parse_script
 
 # A mock response from the Claude API
@@ -26,14 +26,15 @@ MALFORMED_CLAUDE_RESPONSE = """
 
 @pytest.fixture
 def mock_anthropic_client(mocker):
-    """Mocks the Anthropic client and its messages.create method."""
+    """Mocks the shared async Anthropic client and its messages.create method."""
     mock_client = MagicMock()
+    mock_client.messages.create = AsyncMock()
     mock_message = MagicMock()
     mock_content = MagicMock()
     mock_content.text = FAKE_CLAUDE_RESPONSE
     mock_message.content = [mock_content]
     mock_client.messages.create.return_value = mock_message
-    mocker.patch('anthropic.Anthropic', return_value=mock_client)
+    mocker.patch('api.services.llm_client.get_async_client', return_value=mock_client)
     return mock_client
 
 def test_generate_and_parse_script_success(mock_anthropic_client):
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from api.services import llm_batch
+
+def test_local_batch_answers_every_request():
+    """Tests that the local stand-in runs each request and reports per-request results."""
+    async def responder(**params):
+        if params['messages'] == 'boom':
+            raise RuntimeError('bad request')
+        await asyncio.sleep(0)
+        return f"answer to {params['messages']}"
+
+    async def run():
+        batches = llm_batch.LocalMessageBatches(responder=responder, concurrency=1)
+        batch_id = await batches.submit({'a': {'messages': 'one'}, 'b': {'messages': 'boom'}})
+        results = await batches.results(batch_id)
+        return await batches.status(batch_id), results
+
+    status, results = asyncio.run(run())
+
+    assert results == {'a': {'text': 'answer to one'}, 'b': {'error': 'bad request'}}
+    assert status['ended'] is True
+    assert status['counts']['succeeded'] == 1
+    assert status['counts']['errored'] == 1
+
+def test_local_batch_in_progress_status():
+    """Tests that a batch with unanswered requests has not ended."""
+    release = asyncio.Event()
+
+    async def responder(**params):
+        await release.wait()
+        return 'done'
+
+    async def run():
+        batches = llm_batch.LocalMessageBatches(responder=responder)
+        batch_id = await batches.submit({'a': {}})
+        status = await batches.status(batch_id)
+        release.set()
+        await batches.results(batch_id)
+        return status
+
+    status = asyncio.run(run())
+
+    assert status['ended'] is False
+    assert status['counts']['processing'] == 1
+
+def test_anthropic_batch_maps_requests_and_results(mocker):
+    """Tests the Message Batches API calls and the normalized results."""
+    client = MagicMock()
+    client.messages.batches.create = AsyncMock(return_value=SimpleNamespace(id='msgbatch_1'))
+
+    async def entries():
+        yield SimpleNamespace(custom_id='a', result=SimpleNamespace(
+            type='succeeded', message=SimpleNamespace(content=[SimpleNamespace(text='{"clips": []}')])))
+        yield SimpleNamespace(custom_id='b', result=SimpleNamespace(type='expired'))
+
+    client.messages.batches.results = AsyncMock(return_value=entries())
+    mocker.patch('api.services.llm_client.get_async_client', return_value=client)
+    batches = llm_batch.AnthropicMessageBatches()
+
+    batch_id = asyncio.run(batches.submit({'a': {'model': 'm'}}))
+    results = asyncio.run(batches.results(batch_id))
+
+    assert batch_id == 'msgbatch_1'
+    client.messages.batches.create.assert_called_once_with(requests=[{'custom_id': 'a', 'params': {'model': 'm'}}])
+    assert results == {'a': {'text': '{"clips": []}'}, 'b': {'error': 'expired'}}
+
+def test_create_message_batches_rejects_unknown_backend():
+    """Tests the backend factory."""
+    assert isinstance(llm_batch.create_message_batches('local'), llm_batch.LocalMessageBatches)
+    with pytest.raises(ValueError):
+        llm_batch.create_message_batches('carrier-pigeon')
@@ -0,0 +1,139 @@
+import asyncio
+import anthropic
+import httpx
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from api.services import llm_client
+
+_REQUEST = httpx.Request('POST', 'https://api.anthropic.com/v1/messages')
+
+def _connection_error():
+    return anthropic.APIConnectionError(request=_REQUEST)
+
+def _status_error(status_code):
+    response = httpx.Response(status_code, request=_REQUEST, json={'type': 'error', 'error': {'type': 'overloaded_error'}})
+    return anthropic.AsyncAnthropic(api_key='test')._make_status_error('error', body=None, response=response)
+
+@pytest.fixture
+def mock_client(mocker):
+    """Mocks the shared client and removes retry delays."""
+    client = MagicMock()
+    client.messages.create = AsyncMock()
+    mocker.patch('api.services.llm_client.get_async_client', return_value=client)
+    mocker.patch.object(llm_client.Config, 'LLM_RETRY_BASE_DELAY', 0)
+    return client
+
+def test_create_message_retries_transient_errors(mock_client):
+    """Tests that connection errors are retried until a response arrives."""
+    mock_client.messages.create.side_effect = [_connection_error(), _connection_error(), 'message']
+
+    assert llm_client.create_message_sync(model='m', max_tokens=10, messages=[]) == 'message'
+    assert mock_client.messages.create.call_count == 3
+
+def test_create_message_gives_up_after_max_retries(mock_client):
+    """Tests that the last transient error is raised once retries are used up."""
+    mock_client.messages.create.side_effect = _connection_error()
+
+    with pytest.raises(anthropic.APIConnectionError):
+        llm_client.create_message_sync(max_retries=2, model='m', max_tokens=10, messages=[])
+    assert mock_client.messages.create.call_count == 3
+
+def test_create_message_retries_overloaded(mock_client):
+    """Tests that a 529 overloaded response is retried."""
+    overloaded = _status_error(529)
+    assert not isinstance(overloaded, anthropic.InternalServerError)
+    mock_client.messages.create.side_effect = [overloaded, 'message']
+
+    assert llm_client.create_message_sync(model='m', max_tokens=10, messages=[]) == 'message'
+    assert mock_client.messages.create.call_count == 2
+
+def test_create_message_does_not_retry_client_errors(mock_client):
+    """Tests that 4xx responses other than 429 fail immediately."""
+    mock_client.messages.create.side_effect = _status_error(400)
+
+    with pytest.raises(anthropic.BadRequestError):
+        llm_client.create_message_sync(model='m', max_tokens=10, messages=[])
+    assert mock_client.messages.create.call_count == 1
+
+def test_create_message_does_not_retry_other_errors(mock_client):
+    """Tests that non-transient errors fail immediately."""
+    mock_client.messages.create.side_effect = ValueError('bad request')
+
+    with pytest.raises(ValueError):
+        llm_client.create_message_sync(model='m', max_tokens=10, messages=[])
+    assert mock_client.messages.create.call_count == 1
+
+def test_get_async_client_is_shared_per_event_loop():
+    """Tests that one client is reused within a loop and not across loops."""
+    async def two_clients():
+        return llm_client.get_async_client(), llm_client.get_async_client()
+
+    first, second = asyncio.run(two_clients())
+    other, _ = asyncio.run(two_clients())
+
+    assert first is second
+    assert first is not other
+
+class FakeStream:
+    """Stands in for the SDK's MessageStream context manager."""
+
+    def __init__(self, texts, error=None):
+        self.texts = texts
+        self.error = error
+
+    async def __aenter__(self):
+        if self.error:
+            raise self.error
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self):
+        for text in self.texts:
+            yield text
+
+    @property
+    def current_message_snapshot(self):
+        return 'message snapshot'
+
+    async def get_final_message(self):
+        return 'final message'
+
+async def _collect(iterator):
+    return [text async for text in iterator]
+
+def test_stream_text_yields_deltas_and_reports_final_message(mock_client):
+    """Tests that text deltas are yielded and the final message is passed on."""
+    mock_client.messages.stream = MagicMock(side_effect=[FakeStream([], error=_connection_error()), FakeStream(['{"a"', ': 1}'])])
+    messages = []
+
+    texts = llm_client.run_sync(_collect(llm_client.stream_text(on_message=messages.append, model='m')))
+
+    assert texts == ['{"a"', ': 1}']
+    assert messages == ['final message']
+    assert mock_client.messages.stream.call_count == 2
+
+def test_stream_text_reports_start_once(mock_client):
+    """Tests that on_start gets the message snapshot once, when the first text arrives."""
+    mock_client.messages.stream = MagicMock(return_value=FakeStream(['a', 'b', 'c']))
+    starts = []
+
+    texts = llm_client.run_sync(_collect(llm_client.stream_text(on_start=starts.append, model='m')))
+
+    assert texts == ['a', 'b', 'c']
+    assert starts == ['message snapshot']
+
+def test_cache_usage_hit_rate():
+    """Tests the prompt-cache accounting, including usage without cache fields."""
+    usage = SimpleNamespace(input_tokens=200, cache_read_input_tokens=600, cache_creation_input_tokens=200)
+
+    assert llm_client.cache_usage(usage) == {
+        'input_tokens': 200,
+        'cache_read_input_tokens': 600,
+        'cache_creation_input_tokens': 200,
+        'cache_hit_rate': 0.6,
+    }
+    assert llm_client.cache_usage(SimpleNamespace(input_tokens=10, cache_read_input_tokens=None))['cache_hit_rate'] == 0.0
@@ -0,0 +1,69 @@
+import fitz
+import pytest
+from api.services import paper_model
+from api.services.paper_model import get_paper_model, iter_page_results, paper_text
+
+def _page_number(page):
+    return page.number
+
+@pytest.fixture
+def paper_pdf():
+    """A two page paper with a title, abstract, sections, an equation, a caption and references."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 60), "A Study of Things", fontsize=20)
+    page.insert_text((72, 100), "Abstract", fontsize=13)
+    y = 120
+    for i in range(20):
+        page.insert_text((72, y), f"We study things and report what we found about them, line {i}.", fontsize=10)
+        y += 14
+    page.insert_text((72, y + 10), "1 Introduction", fontsize=13)
+    page.insert_text((72, y + 30), "E = mc^2 (1)", fontsize=10)
+    page = doc.new_page()
+    page.insert_text((72, 72), "Figure 1: Things over time", fontsize=10)
+    page.insert_text((72, 100), "References", fontsize=13)
+    page.insert_text((72, 120), "[1] Someone. Something else. 2020", fontsize=10)
+    return doc.tobytes()
+
+def test_build_paper_model_structure(paper_pdf):
+    """Tests headings, abstract, equations, captions and back matter detection."""
+    model = paper_model.build_paper_model(paper_pdf)
+
+    assert model['title'] == "A Study of Things"
+    assert [s['heading'] for s in model['sections']] == ["Abstract", "1 Introduction", "References"]
+    assert model['abstract'].startswith("We study things")
+    assert model['equations'] == [{'page': 1, 'text': "E = mc^2 (1)"}]
+    assert model['captions'] == [{'page': 2, 'text': "Figure 1: Things over time"}]
+    assert [s['back_matter'] for s in model['sections']] == [False, False, True]
+    assert model['body_pages'] == 2
+    assert [entry['page'] for entry in model['page_map']] == [1, 2]
+    assert model['tokens']['body'] < model['tokens']['total']
+
+def test_paper_text_omits_back_matter(paper_pdf):
+    """Tests that references are left out of the rendered text unless asked for."""
+    model = paper_model.build_paper_model(paper_pdf)
+
+    assert "Someone" not in paper_text(model)
+    assert "Someone" in paper_text(model, include_back_matter=True)
+    assert len(paper_text(model, max_chars=10)) == 10
+
+def test_get_paper_model_is_cached_by_content_hash(paper_pdf, mocker):
+    """Tests that a PDF is parsed once and then loaded from disk."""
+    build = mocker.spy(paper_model, 'build_paper_model')
+
+    first = get_paper_model(paper_pdf)
+    second = get_paper_model(paper_pdf)
+
+    assert build.call_count == 1
+    assert first == second
+    assert first['content_hash'] == paper_model.content_hash(paper_pdf)
+
+def test_iter_page_results_in_parallel(mocker):
+    """Tests that pages processed in a process pool come back in order."""
+    mocker.patch.object(paper_model.Config, 'PAPER_PARALLEL_MIN_PAGES', 2)
+    mocker.patch.object(paper_model.Config, 'PAPER_PAGES_PER_TASK', 3)
+    doc = fitz.open()
+    for _ in range(10):
+        doc.new_page()
+
+    assert list(iter_page_results(doc.tobytes(), _page_number, workers=2)) == list(range(10))
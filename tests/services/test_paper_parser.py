@@ -1,6 +1,8 @@
+import fitz
 import pytest
 import requests
-from api.services.paper_parser import parse_paper_from_url
+from api.services import paper_parser
+from api.services.paper_parser import extract_pages, parse_paper_from_url
 
 # A minimal, valid PDF content containing the text "Hello World"
 FAKE_PDF_CONTENT = b"""%PDF-1.4
@@ -43,11 +45,12 @@ startxref
 
 def test_parse_paper_from_url_success(mocker):
     """Tests successful fetching and parsing of a PDF from a URL."""
-    # Mock the requests.get call
+    # Mock the pooled session used by the PDF fetcher
     mock_response = mocker.Mock()
     mock_response.raise_for_status.return_value = None
-    mock_response.content = FAKE_PDF_CONTENT
-    mocker.patch('requests.get', return_value=mock_response)
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [FAKE_PDF_CONTENT]
+    mocker.patch('requests.Session.get', return_value=mock_response)
 
     result = parse_paper_from_url('http://fakeurl.com/paper.pdf')
 
@@ -56,7 +59,7 @@ def test_parse_paper_from_url_success(mocker):
 
 def test_parse_paper_from_url_network_error(mocker):
     """Tests handling of a network error when fetching the PDF."""
-    mocker.patch('requests.get', side_effect=requests.exceptions.RequestException('Network Error'))
+    mocker.patch('requests.Session.get', side_effect=requests.exceptions.RequestException('Network Error'))
 
     result = parse_paper_from_url('http://fakeurl.com/paper.pdf')
 
@@ -67,10 +70,108 @@ def test_parse_paper_from_url_invalid_pdf(mocker):
     """Tests handling of invalid PDF content."""
     mock_response = mocker.Mock()
     mock_response.raise_for_status.return_value = None
-    mock_response.content = b"this is not a pdf"
-    mocker.patch('requests.get', return_value=mock_response)
+    mock_response.headers = {}
+    mock_response.iter_content.return_value = [b"this is not a pdf"]
+    mocker.patch('requests.Session.get', return_value=mock_response)
 
     result = parse_paper_from_url('http://fakeurl.com/paper.pdf')
 
     assert 'error' in result
     assert 'Failed to parse PDF' in result['error']
+
+def _streamed_response(mocker, chunks, headers=None):
+    mock_response = mocker.Mock()
+    mock_response.raise_for_status.return_value = None
+    mock_response.headers = headers or {}
+    mock_response.iter_content.return_value = chunks
+    return mock_response
+
+def test_parse_paper_from_url_stops_at_byte_limit(mocker):
+    """Tests that a body growing past the limit is reported as a fetch error."""
+    mocker.patch('requests.Session.get', return_value=_streamed_response(mocker, [b"x" * 60, b"x" * 60]))
+    mocker.patch.object(paper_parser.pdf_fetcher.Config, 'PAPER_MAX_BYTES', 100)
+
+    result = parse_paper_from_url('http://fakeurl.com/paper.pdf')
+
+    assert 'Failed to fetch paper' in result['error']
+
+def test_parse_paper_from_url_max_chars(mocker):
+    """Tests that the text is truncated to max_chars and the paper model is returned."""
+    mocker.patch('requests.Session.get', return_value=_streamed_response(mocker, [FAKE_PDF_CONTENT]))
+
+    result = parse_paper_from_url('http://fakeurl.com/paper.pdf', max_chars=5)
+
+    assert len(result['text_content']) == 5
+    assert result['paper']['total_pages'] == 1
+
+def test_parse_paper_from_url_reuses_paper_model(mocker):
+    """Tests that the same PDF is only parsed once."""
+    mocker.patch('requests.Session.get', return_value=_streamed_response(mocker, [FAKE_PDF_CONTENT]))
+    build = mocker.spy(paper_parser.paper_model, 'build_paper_model')
+
+    first = parse_paper_from_url('http://fakeurl.com/paper.pdf')
+    second = parse_paper_from_url('http://fakeurl.com/other.pdf')
+
+    assert build.call_count == 1
+    assert first['text_content'] == second['text_content']
+
+def _long_pdf(pages=5):
+    """A PDF whose every page carries about 1000 characters of text."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        for line in range(20):
+            page.insert_text((72, 72 + line * 14), f"Page {number} line {line}: " + "words " * 6, fontsize=10)
+    return doc.tobytes()
+
+def test_extract_pages_stops_before_the_last_page(mocker):
+    """Tests that pages past max_chars are never extracted."""
+    page_data = mocker.spy(paper_parser.paper_model, '_page_data')
+
+    pages, complete = extract_pages(_long_pdf(), max_chars=1500)
+
+    assert len(pages) == 2
+    assert complete is False
+    assert page_data.call_count == 2
+
+def test_extract_pages_reads_everything_without_a_limit():
+    """Tests that all pages are extracted when max_chars is not given or not reached."""
+    for pages, complete in (extract_pages(_long_pdf()), extract_pages(_long_pdf(), max_chars=10 ** 6)):
+        assert len(pages) == 5
+        assert complete is True
+
+def test_parse_paper_from_url_stops_early_without_caching_a_model(mocker):
+    """Tests that a long paper is only read up to max_chars and no partial model is cached."""
+    mocker.patch('requests.Session.get', return_value=_streamed_response(mocker, [_long_pdf()]))
+    page_data = mocker.spy(paper_parser.paper_model, '_page_data')
+    build = mocker.spy(paper_parser.paper_model, 'build_paper_model')
+
+    result = parse_paper_from_url('http://fakeurl.com/paper.pdf', max_chars=1500)
+
+    assert result['paper'] is None
+    assert len(result['text_content']) == 1500
+    assert result['text_content'].startswith('Page 0 line 0')
+    assert page_data.call_count == 2
+    build.assert_not_called()
+
+def test_parse_paper_from_url_builds_the_model_from_the_extracted_pages(mocker):
+    """Tests that when every page was read, the model is built from them without extracting again."""
+    mocker.patch('requests.Session.get', return_value=_streamed_response(mocker, [_long_pdf()]))
+    page_data = mocker.spy(paper_parser.paper_model, '_page_data')
+
+    result = parse_paper_from_url('http://fakeurl.com/paper.pdf', max_chars=10 ** 6)
+
+    assert result['paper']['total_pages'] == 5
+    assert page_data.call_count == 5
+
+def test_parse_paper_from_url_prefers_a_cached_model(mocker):
+    """Tests that a paper parsed before is rendered from its model even with max_chars."""
+    mocker.patch('requests.Session.get', return_value=_streamed_response(mocker, [_long_pdf()]))
+    parse_paper_from_url('http://fakeurl.com/paper.pdf')
+    page_data = mocker.spy(paper_parser.paper_model, '_page_data')
+
+    result = parse_paper_from_url('http://fakeurl.com/paper.pdf', max_chars=1500)
+
+    assert result['paper']['total_pages'] == 5
+    assert len(result['text_content']) == 1500
+    page_data.assert_not_called()
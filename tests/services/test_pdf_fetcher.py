@@ -0,0 +1,95 @@
+import os
+import time
+import pytest
+from api.services import pdf_fetcher
+from api.services.pdf_fetcher import PdfCache, PdfTooLargeError, fetch_pdf
+
+URL = 'http://fakeurl.com/paper.pdf'
+
+def _response(mocker, chunks=(), status_code=200, headers=None):
+    mock_response = mocker.Mock()
+    mock_response.status_code = status_code
+    mock_response.raise_for_status.return_value = None
+    mock_response.headers = headers or {}
+    mock_response.iter_content.return_value = list(chunks)
+    return mock_response
+
+def test_fetch_pdf_streams_with_timeout_and_caches(mocker):
+    """Tests that the first fetch streams the body and later fetches hit the cache."""
+    mock_get = mocker.patch('requests.Session.get', return_value=_response(mocker, [b"%PDF", b"-1.4"]))
+
+    assert fetch_pdf(URL) == b"%PDF-1.4"
+    assert fetch_pdf(URL) == b"%PDF-1.4"
+
+    assert mock_get.call_count == 1
+    _, kwargs = mock_get.call_args
+    assert kwargs['stream'] is True
+    assert kwargs['timeout']
+
+def test_fetch_pdf_revalidates_stale_entries(mocker):
+    """Tests that stale entries are revalidated with their ETag and reused on 304."""
+    mocker.patch.object(pdf_fetcher.Config, 'PDF_CACHE_FRESH_SECONDS', 0)
+    mock_get = mocker.patch('requests.Session.get', side_effect=[
+        _response(mocker, [b"%PDF-1.4"], headers={'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+        _response(mocker, status_code=304),
+    ])
+
+    fetch_pdf(URL)
+    assert fetch_pdf(URL) == b"%PDF-1.4"
+
+    _, kwargs = mock_get.call_args
+    assert kwargs['headers'] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+def test_fetch_pdf_replaces_changed_entries(mocker):
+    """Tests that a 200 on revalidation replaces the cached copy."""
+    mocker.patch.object(pdf_fetcher.Config, 'PDF_CACHE_FRESH_SECONDS', 0)
+    mocker.patch('requests.Session.get', side_effect=[
+        _response(mocker, [b"old"], headers={'ETag': '"v1"'}),
+        _response(mocker, [b"new"], headers={'ETag': '"v2"'}),
+    ])
+
+    fetch_pdf(URL)
+
+    assert fetch_pdf(URL) == b"new"
+    assert PdfCache().get(URL)['etag'] == '"v2"'
+
+def test_fetch_pdf_rejects_large_content_length(mocker):
+    """Tests that an oversized Content-Length is rejected before reading the body."""
+    mock_response = _response(mocker, [b"x" * 10], headers={'Content-Length': '1000'})
+    mocker.patch('requests.Session.get', return_value=mock_response)
+
+    with pytest.raises(PdfTooLargeError):
+        fetch_pdf(URL, max_bytes=100)
+    mock_response.iter_content.assert_not_called()
+    mock_response.close.assert_called_once()
+
+def test_fetch_pdf_rejects_large_streamed_body(mocker):
+    """Tests that a body growing past the limit is cut off and not cached."""
+    mocker.patch('requests.Session.get', return_value=_response(mocker, [b"x" * 60, b"x" * 60]))
+
+    with pytest.raises(PdfTooLargeError):
+        fetch_pdf(URL, max_bytes=100)
+    assert PdfCache().get(URL) is None
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Tests that the byte budget evicts the least recently used entries first."""
+    cache = PdfCache(str(tmp_path), max_bytes=25)
+    cache.put('http://a', b"a" * 10, None, None)
+    cache.put('http://b', b"b" * 10, None, None)
+    past = time.time() - 60
+    os.utime(cache._paths('http://b')[1], (past, past))
+    cache.touch('http://a')
+
+    cache.put('http://c', b"c" * 10, None, None)
+
+    assert cache.get('http://a') is not None
+    assert cache.get('http://b') is None
+    assert cache.get('http://c') is not None
+
+def test_cache_keeps_new_entry_larger_than_budget(tmp_path):
+    """Tests that an entry larger than the whole budget is still returned."""
+    cache = PdfCache(str(tmp_path), max_bytes=5)
+
+    path = cache.put('http://a', b"a" * 10, None, None)
+
+    assert os.path.exists(path)